@@ -47,9 +47,39 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         # 'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
         "rest_framework.permissions.IsAuthenticated",
-    ]
+    ],
+    # orjson-backed when it is installed, see Tracker.renderers
+    "DEFAULT_RENDERER_CLASSES": [
+        "Tracker.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
+# Responses below this many bytes are sent uncompressed by
+# Tracker.middleware.CompressionMiddleware. Brotli needs the brotli package.
+# Against BREACH, gzip pads its output with random bytes and responses that
+# set the CSRF cookie, and so may render a token, are never brotli-compressed.
+COMPRESSION_MIN_SIZE = 1024
+
+# Seconds cashflow series stay in the cache. Writes invalidate them anyway,
+# the timeout only bounds how long unused entries take up memory.
+CASHFLOW_CACHE_TIMEOUT = 300
+
+# Number of rows written per bulk_create call when importing CSV files.
+CSV_IMPORT_BATCH_SIZE = 1000
+
+# Uploaded CSV files are processed by in-process worker threads that poll the
+# ImportJob table. Set IMPORT_JOBS_EAGER to run imports inside the request.
+# Jobs left over by a restart need `manage.py run_import_workers`.
+IMPORT_JOBS_WORKERS = 2
+IMPORT_JOBS_POLL_SECONDS = 5
+IMPORT_JOBS_STALE_SECONDS = 600
+IMPORT_JOBS_EAGER = False
+
+# Processes used to parse the files of a ZIP or multi-file upload in parallel.
+# Writes still go through a single writer.
+IMPORT_PARSE_WORKERS = 2
+
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080",
@@ -68,6 +98,7 @@ CSRF_COOKIE_HTTPONLY = False  # We need to access the CSRF token from the fronte
 # CSRF_USE_SESSIONS = False  # We set it to False to use CSRF cookies. If True, CSRF tokens will be stored in the session.
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "Tracker.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -150,6 +181,9 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files (queued CSV imports)
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
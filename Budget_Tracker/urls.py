@@ -28,6 +28,8 @@ router.register(r"transactionsubtypes", views.TransactionSubtypeViewSet)
 router.register(r"transactiontypes", views.TransactionTypeViewSet)
 router.register(r"bankaccounts", views.BankAccountViewSet)
 router.register(r"budgets", views.BudgetViewSet)
+router.register(r"categorization-rules", views.CategorizationRuleViewSet)
+router.register(r"import-jobs", views.ImportJobViewSet)
 
 
 urlpatterns = [
@@ -1,4 +1,4 @@
 from django.contrib import admin
-from .models import Transaction,TransactionSubType, TransactionType, BankAccount, UserProvidedSymbol
+from .models import Transaction,TransactionSubType, TransactionType, BankAccount, UserProvidedSymbol, ImportJob, CategorizationRule, MonthlyRollup, BalanceSnapshot
 # Register your models here.
-admin.site.register([Transaction, TransactionType, TransactionSubType, BankAccount, UserProvidedSymbol])
+admin.site.register([Transaction, TransactionType, TransactionSubType, BankAccount, UserProvidedSymbol, ImportJob, CategorizationRule, MonthlyRollup, BalanceSnapshot])
@@ -0,0 +1,342 @@
+"""
+Dashboard figures aggregated in the database.
+
+The dashboard's totals, its per-subtype table and pie charts and its income,
+expense and investment bars are grouped with SQL ``GROUP BY`` here, so the
+client receives a few rows per subtype and period instead of every
+transaction it would otherwise have to sum itself. Cashflow series are
+bucketed the same way and cached until the user's data changes.
+"""
+
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, DateField, DecimalField, Sum, Value, When
+from django.db.models.functions import Abs, Trunc
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import SyncVersion, next_month
+
+PERIODS = ("day", "week", "month")
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+# Series per value of the split, with the column holding its name
+SPLITS = {
+    "account": ("bank_account_id", "bank_account__name"),
+    "subtype": ("transaction_subtype_id", "transaction_subtype__name"),
+}
+# Ten years of days, more is no chart anyone can read
+MAX_CASHFLOW_PERIODS = 3660
+DEFAULT_CASHFLOW_CACHE_TIMEOUT = 300
+
+ZERO = Decimal("0.00")
+SUMS = ("amount", "fees", "taxes")
+
+
+def format_amount(value):
+    """Cents as a string, like the serializers' decimal fields."""
+    return str(value.quantize(ZERO))
+
+
+def format_sums(row):
+    return {
+        key: format_amount(value) if key in SUMS else value
+        for key, value in row.items()
+    }
+
+
+class TransactionSummary:
+    """
+    Totals of a transaction queryset by subtype, by type and by period.
+
+    Per subtype the count and the signed sums of amount, fee and tax are
+    returned, the types and the grand total add those rows up. Periods
+    (``day``, ``week`` starting Monday, or ``month`` in the current
+    timezone) carry the sum of absolute amounts per transaction type, which
+    is what the overview bars show.
+
+    ``rollups`` are the MonthlyRollups of the same transactions, if the
+    filters allow them (see TransactionFilter.filter_rollups). Absolute
+    amounts are not rolled up, so periods always read the transactions.
+    """
+
+    def __init__(self, queryset, period="month", rollups=None):
+        if period not in PERIODS:
+            raise ValidationError({"period": f"Choose one of {', '.join(PERIODS)}."})
+        self.queryset = queryset.order_by()
+        self.period = period
+        self.rollups = rollups
+
+    def get_subtypes(self):
+        """
+        Read from the MonthlyRollups matching the same filters if they were
+        given, the transactions are only grouped otherwise.
+        """
+        if self.rollups is None:
+            source = self.queryset
+            sums = {
+                "row_count": Count("id"),
+                "amount_sum": Sum("amount"),
+                "fee_sum": Sum("fee"),
+                "tax_sum": Sum("tax"),
+            }
+        else:
+            source = self.rollups.order_by()
+            sums = {
+                "row_count": Sum("count"),
+                "amount_sum": Sum("amount"),
+                "fee_sum": Sum("fees"),
+                "tax_sum": Sum("taxes"),
+            }
+        rows = (
+            source.values(
+                "transaction_subtype_id",
+                "transaction_subtype__name",
+                "transaction_subtype__transaction_type__name",
+            )
+            .annotate(**sums)
+            .order_by(
+                "transaction_subtype__transaction_type__name",
+                "transaction_subtype__name",
+                "transaction_subtype_id",
+            )
+        )
+        return [
+            {
+                "id": row["transaction_subtype_id"],
+                "name": row["transaction_subtype__name"],
+                "transaction_type": row["transaction_subtype__transaction_type__name"],
+                "count": row["row_count"],
+                # Fees and taxes are null on most rows, and on all of some
+                "amount": row["amount_sum"] or ZERO,
+                "fees": row["fee_sum"] or ZERO,
+                "taxes": row["tax_sum"] or ZERO,
+            }
+            for row in rows
+        ]
+
+    def get_periods(self):
+        rows = (
+            self.queryset.annotate(
+                period=Trunc("created_at", self.period, output_field=DateField())
+            )
+            .values("period", "transaction_subtype__transaction_type__name")
+            .annotate(amount=Sum(Abs("amount")))
+            .order_by("period", "transaction_subtype__transaction_type__name")
+        )
+        periods = {}
+        for row in rows:
+            totals = periods.setdefault(row["period"], {})
+            type_name = row["transaction_subtype__transaction_type__name"]
+            totals[type_name] = format_amount(row["amount"])
+        return [
+            {"period": period, "totals": totals} for period, totals in periods.items()
+        ]
+
+    def as_dict(self):
+        subtypes = self.get_subtypes()
+        types = {}
+        totals = {"count": 0, "amount": ZERO, "fees": ZERO, "taxes": ZERO}
+        for subtype in subtypes:
+            type_totals = types.setdefault(
+                subtype["transaction_type"],
+                {"count": 0, "amount": ZERO, "fees": ZERO, "taxes": ZERO},
+            )
+            for summed in (type_totals, totals):
+                for key in summed:
+                    summed[key] += subtype[key]
+        return {
+            **format_sums(totals),
+            "period": self.period,
+            "types": [
+                format_sums({"name": name, **sums}) for name, sums in types.items()
+            ],
+            "subtypes": [format_sums(subtype) for subtype in subtypes],
+            "periods": self.get_periods(),
+        }
+
+
+def truncate(day, granularity):
+    """The first day of the period ``day`` falls in, like SQL's Trunc."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=day.month - (day.month - 1) % 3, day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def following(period, granularity):
+    """The first day of the period after ``period``."""
+    if granularity == "day":
+        return period + timedelta(days=1)
+    if granularity == "week":
+        return period + timedelta(weeks=1)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    for _ in range(months):
+        period = next_month(period)
+    return period
+
+
+def get_cashflow_cache_timeout():
+    return getattr(
+        settings, "CASHFLOW_CACHE_TIMEOUT", DEFAULT_CASHFLOW_CACHE_TIMEOUT
+    )
+
+
+class CashflowSeries:
+    """
+    Money in, money out and net per period, as columnar arrays.
+
+    Transactions are bucketed by ``granularity`` (``day``, ``week`` starting
+    Monday, ``month``, ``quarter`` or ``year`` in the current timezone) in
+    SQL. Positive amounts count as income, negative ones as expense, both
+    returned as positive sums; transfers between accounts show up on both
+    sides. Periods without transactions are filled with zeros, from the
+    ``start`` to the ``end`` date if given and the first to the last
+    transaction otherwise. ``split`` adds a series per ``account`` or
+    ``subtype`` next to the totals.
+    """
+
+    def __init__(self, queryset, granularity="month", split=None, start=None, end=None):
+        if granularity not in GRANULARITIES:
+            raise ValidationError(
+                {"granularity": f"Choose one of {', '.join(GRANULARITIES)}."}
+            )
+        if split is not None and split not in SPLITS:
+            raise ValidationError({"split": f"Choose one of {', '.join(SPLITS)}."})
+        self.queryset = queryset.order_by()
+        self.granularity = granularity
+        self.split = split
+        self.start = start
+        self.end = end
+
+    def get_rows(self):
+        fields = ["bucket"]
+        if self.split:
+            fields.extend(SPLITS[self.split])
+        money = DecimalField(max_digits=14, decimal_places=2)
+        return (
+            self.queryset.annotate(
+                bucket=Trunc("created_at", self.granularity, output_field=DateField())
+            )
+            .values(*fields)
+            .annotate(
+                income=Sum(
+                    Case(When(amount__gt=0, then="amount"), default=Value(ZERO)),
+                    output_field=money,
+                ),
+                expense=Sum(
+                    Case(When(amount__lt=0, then=Abs("amount")), default=Value(ZERO)),
+                    output_field=money,
+                ),
+            )
+            .order_by(*fields)
+        )
+
+    def get_periods(self, rows):
+        buckets = [row["bucket"] for row in rows]
+        first = truncate(self.start, self.granularity) if self.start else None
+        last = truncate(self.end, self.granularity) if self.end else None
+        if first is None:
+            first = min(buckets) if buckets else last
+        if last is None:
+            last = max(buckets) if buckets else first
+        periods = []
+        period = first
+        while period is not None and period <= last:
+            periods.append(period)
+            if len(periods) > MAX_CASHFLOW_PERIODS:
+                raise ValidationError(
+                    {
+                        "granularity": f"More than {MAX_CASHFLOW_PERIODS} periods, "
+                        "choose a coarser granularity or a shorter range."
+                    }
+                )
+            period = following(period, self.granularity)
+        return periods
+
+    def as_dict(self):
+        rows = list(self.get_rows())
+        periods = self.get_periods(rows)
+        positions = {period: position for position, period in enumerate(periods)}
+
+        def empty_series(**fields):
+            return {
+                **fields,
+                "income": [ZERO] * len(periods),
+                "expense": [ZERO] * len(periods),
+            }
+
+        totals = empty_series()
+        series = {}
+        for row in rows:
+            position = positions[row["bucket"]]
+            targets = [totals]
+            if self.split:
+                key_field, name_field = SPLITS[self.split]
+                targets.append(
+                    series.setdefault(
+                        row[key_field],
+                        empty_series(id=row[key_field], name=row[name_field]),
+                    )
+                )
+            for target in targets:
+                target["income"][position] += row["income"] or ZERO
+                target["expense"][position] += row["expense"] or ZERO
+
+        data = {
+            "granularity": self.granularity,
+            "periods": periods,
+            **self.format_series(totals),
+        }
+        if self.split:
+            data["split"] = self.split
+            data["series"] = [
+                self.format_series(values)
+                for values in sorted(
+                    series.values(), key=lambda values: (values["name"] or "")
+                )
+            ]
+        return data
+
+    @staticmethod
+    def format_series(values):
+        income, expense = values.pop("income"), values.pop("expense")
+        return {
+            **values,
+            "income": [format_amount(value) for value in income],
+            "expense": [format_amount(value) for value in expense],
+            "net": [format_amount(i - e) for i, e in zip(income, expense)],
+        }
+
+    def cached_as_dict(self, user_id, key_parts):
+        """
+        ``as_dict``, cached under the user's data version.
+
+        Every write to the user's transactions bumps the data version, so
+        entries of older versions are never read again and expire.
+        """
+        data_version = SyncVersion.objects.data_version(user_id)
+        if data_version is None:
+            return self.as_dict()
+        key = "|".join(
+            [
+                str(user_id),
+                str(data_version),
+                str(timezone.get_current_timezone()),
+                *map(str, key_parts),
+            ]
+        )
+        cache_key = "cashflow:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.as_dict()
+            cache.set(cache_key, data, get_cashflow_cache_timeout())
+        return data
@@ -0,0 +1,404 @@
+"""
+Registry of the CSV export formats of the supported banks.
+
+A BankFormat only describes an export: which column holds which field, how
+dates and decimals are written, the delimiter and the encoding. Registering
+it compiles it into a ColumnarDecoder, which parses whole chunks of columns
+with pandas/NumPy instead of calling float() and datetime.fromisoformat()
+once per row.
+
+Like parsers.py this module does not import Django, so the decoders can run
+in parser worker processes.
+"""
+
+import csv
+import io
+import warnings
+import zipfile
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .parsers import Fingerprinter, ParsedRow, make_aware
+
+FIELDS = ["created_at", "amount", "note", "isin", "quantity", "fee", "tax"]
+TEXT_FIELDS = ["note", "isin"]
+NUMERIC_FIELDS = ["amount", "quantity", "fee", "tax"]
+REQUIRED_FIELDS = ["created_at", "amount"]
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class BankFormat:
+    """
+    Describes the CSV export of one bank.
+
+    ``columns`` maps the fields of a ParsedRow to a column, given by position
+    or by header name. A tuple of columns takes the first non-empty value,
+    e.g. the counterparty name and, if it is missing, the purpose.
+    ``date_format`` is a strftime format or "ISO8601"; ``decimal`` and
+    ``thousands`` are the separators used for amounts.
+    """
+
+    def __init__(
+        self,
+        name,
+        columns,
+        header=None,
+        delimiter=";",
+        encoding="utf-8",
+        date_format="ISO8601",
+        decimal=".",
+        thousands="",
+    ):
+        self.name = name
+        self.columns = columns
+        self.header = header or []
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.date_format = date_format
+        self.decimal = decimal
+        self.thousands = thousands
+
+    def compile(self):
+        return ColumnarDecoder(self)
+
+    def format_date(self, value):
+        """Write a datetime the way this bank does, used for sample files."""
+        if self.date_format != "ISO8601":
+            return value.strftime(self.date_format)
+        if value.time():
+            return value.isoformat(sep=" ")
+        return value.date().isoformat()
+
+    def format_decimal(self, value):
+        """Write a number the way this bank does, used for sample files."""
+        text = f"{value:.2f}"
+        return text.replace(".", self.decimal) if self.decimal != "." else text
+
+
+class ColumnarDecoder:
+    """
+    Parses CSV exports of one BankFormat column by column.
+
+    The header row is read once to resolve named columns to positions. The
+    remaining rows are read in chunks with pandas, so memory stays bounded
+    by the chunk size however large the file is.
+    """
+
+    def __init__(self, bank_format):
+        self.bank_format = bank_format
+        self.encoding = bank_format.encoding
+        self.delimiter = bank_format.delimiter
+
+    def resolve_columns(self, header):
+        """Map every field to a tuple of column positions for ``header``."""
+        names = [name.strip().lower() for name in header]
+        positions = {}
+        for field in FIELDS:
+            references = self.bank_format.columns.get(field, ())
+            if not isinstance(references, tuple):
+                references = (references,)
+            resolved = []
+            for reference in references:
+                if isinstance(reference, int):
+                    resolved.append(reference)
+                elif reference.strip().lower() in names:
+                    resolved.append(names.index(reference.strip().lower()))
+            if field in REQUIRED_FIELDS and not resolved:
+                raise ValueError(
+                    f"{self.bank_format.name} export has no column for {field}: "
+                    f"expected {' or '.join(map(str, references))}"
+                )
+            positions[field] = tuple(resolved)
+        return positions
+
+    def read_header(self, text_stream, delimiter=None):
+        line = text_stream.readline()
+        return next(csv.reader([line], delimiter=delimiter or self.delimiter), [])
+
+    def read_frames(self, text_stream, header, chunk_size=None, delimiter=None):
+        """
+        Yield DataFrames for the rows after ``header``.
+
+        Numeric columns are parsed by pandas' C parser with the format's
+        separators while reading; every other column stays a string.
+        """
+        positions = self.resolve_columns(header)
+        width = max(
+            [len(header)] + [p + 1 for columns in positions.values() for p in columns]
+        )
+        numeric = {positions[field][0] for field in NUMERIC_FIELDS if positions[field]}
+        with warnings.catch_warnings():
+            # Extra trailing columns are dropped, like parse_row ignores them
+            warnings.simplefilter("ignore", pd.errors.ParserWarning)
+            try:
+                reader = pd.read_csv(
+                    text_stream,
+                    sep=delimiter or self.delimiter,
+                    header=None,
+                    names=list(range(width)),
+                    index_col=False,
+                    dtype={p: object for p in range(width) if p not in numeric},
+                    keep_default_na=False,
+                    na_values={p: [""] for p in numeric},
+                    decimal=self.bank_format.decimal,
+                    thousands=self.bank_format.thousands or None,
+                    # Same results as float(), which the fingerprints rely on
+                    float_precision="round_trip",
+                    skip_blank_lines=True,
+                    chunksize=chunk_size or DEFAULT_CHUNK_SIZE,
+                )
+            except pd.errors.EmptyDataError:
+                return
+            with reader:
+                for frame in reader:
+                    yield frame.reset_index(drop=True)
+
+    def decode_columns(self, frame, header, tzinfo):
+        """
+        Decode a frame from read_frames into one array per field.
+
+        ``created_at`` is a Series of aware datetimes and ``day`` the local
+        dates as datetime64[D]. Numbers are float arrays and texts object
+        arrays. Invalid dates or amounts raise ValueError.
+        """
+        positions = self.resolve_columns(header)
+        created_at, days = self.parse_dates(
+            self.first_non_empty(frame, positions["created_at"]), tzinfo
+        )
+        columns = {"created_at": created_at, "day": days}
+        for field in TEXT_FIELDS:
+            columns[field] = self.first_non_empty(frame, positions[field])
+        for field in NUMERIC_FIELDS:
+            columns[field] = self.parse_decimals(
+                frame, positions[field], strict=field in REQUIRED_FIELDS
+            )
+        return columns
+
+    @staticmethod
+    def first_non_empty(frame, positions):
+        values = np.full(len(frame), "", dtype=object)
+        for position in reversed(positions):
+            cells = frame[position].fillna("").to_numpy(dtype=object)
+            values = np.where(cells != "", cells, values)
+        return values
+
+    def parse_dates(self, values, tzinfo):
+        """
+        Vectorized datetime parsing plus make_aware in ``tzinfo``.
+
+        Returns the aware datetimes and the local dates.
+        """
+        date_format = self.bank_format.date_format
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format=date_format)
+        if parsed.isna().any():
+            raise ValueError(f"Invalid date '{values[parsed.isna().to_numpy()][0]}'")
+        if parsed.dt.tz is not None:
+            raise ValueError("make_aware expects naive datetimes in the export")
+        days = parsed.to_numpy().astype("datetime64[D]")
+
+        # Ambiguous local times resolve to the first occurrence (DST), like
+        # datetime.replace(tzinfo=...); the rare non-existent ones go through
+        # make_aware one by one.
+        localized = parsed.dt.tz_localize(
+            tzinfo, ambiguous=np.ones(len(parsed), dtype=bool), nonexistent="NaT"
+        )
+        gaps = localized.isna().to_numpy()
+        if gaps.any():
+            localized = pd.Series(list(localized.dt.to_pydatetime()), dtype=object)
+            for position in np.flatnonzero(gaps):
+                localized.iat[position] = make_aware(
+                    parsed.iat[position].to_pydatetime(), tzinfo
+                )
+        return localized, days
+
+    def parse_decimals(self, frame, positions, strict=False):
+        """
+        Return a numeric column as floats, with empty cells as 0.0.
+
+        Columns the C parser could not read as numbers (stray text) are
+        parsed here: with ``strict`` invalid values raise ValueError,
+        otherwise they become 0.0 like parsers.safe_float.
+        """
+        if not positions:
+            return np.zeros(len(frame))
+        column = frame[positions[0]]
+        if column.dtype.kind == "f" or column.dtype.kind == "i":
+            return column.fillna(0.0).to_numpy(dtype=float)
+
+        values = column.fillna("").to_numpy(dtype=object).astype(str)
+        if self.bank_format.thousands:
+            values = np.char.replace(values, self.bank_format.thousands, "")
+        if self.bank_format.decimal != ".":
+            values = np.char.replace(values, self.bank_format.decimal, ".")
+        values = values.astype(object)
+        if strict:
+            return np.where(values == "", "0", values).astype(float)
+        return (
+            pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+            .fillna(0.0)
+            .to_numpy(dtype=float)
+        )
+
+    @staticmethod
+    def to_rows(columns):
+        """Build unfingerprinted ParsedRows from decoded columns."""
+        created_at = to_pydatetimes(columns["created_at"])
+        # _make skips the Python-level __new__ of the namedtuple
+        return list(
+            map(
+                ParsedRow._make,
+                zip(
+                    created_at,
+                    columns["amount"].tolist(),
+                    columns["note"].tolist(),
+                    columns["isin"].tolist(),
+                    columns["quantity"].tolist(),
+                    columns["fee"].tolist(),
+                    columns["tax"].tolist(),
+                    repeat(""),
+                ),
+            )
+        )
+
+    def iter_chunks(self, text_stream, tzinfo, chunk_size=None, delimiter=None):
+        """Yield lists of unfingerprinted ParsedRows, one list per chunk."""
+        header = self.read_header(text_stream, delimiter)
+        for frame in self.read_frames(text_stream, header, chunk_size, delimiter):
+            yield self.to_rows(self.decode_columns(frame, header, tzinfo))
+
+    def iter_rows(
+        self, text_stream, bank_account_id, tzinfo, chunk_size=None, delimiter=None
+    ):
+        """Decode a whole export and fingerprint its rows, in file order."""
+        fingerprinter = Fingerprinter(bank_account_id)
+        for rows in self.iter_chunks(text_stream, tzinfo, chunk_size, delimiter):
+            for parsed in rows:
+                yield fingerprinter.assign(parsed)
+
+    def decode_lines(self, header, data, tzinfo, delimiter=None):
+        """Decode a block of lines without a header, see iter_line_segments."""
+        rows = []
+        for frame in self.read_frames(
+            io.StringIO(data, newline=""), header, delimiter=delimiter
+        ):
+            rows.extend(self.to_rows(self.decode_columns(frame, header, tzinfo)))
+        return rows
+
+
+def to_pydatetimes(created_at):
+    """Turn a created_at column from decode_columns into a list of datetimes."""
+    if not isinstance(created_at.dtype, pd.DatetimeTZDtype):
+        return created_at.tolist()
+    # Exports repeat timestamps a lot (Volksbank only has dates), so only
+    # build one datetime object per distinct value.
+    codes, uniques = pd.factorize(created_at.array)
+    return uniques.to_pydatetime()[codes].tolist()
+
+
+# Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax, as exported by Trade Republic
+# and used by the example data.
+TRADE_REPUBLIC = BankFormat(
+    "Trade Republic",
+    columns={
+        "created_at": 0,
+        "amount": 2,
+        "note": 3,
+        "isin": 4,
+        "quantity": 5,
+        "fee": 6,
+        "tax": 7,
+    },
+    header=["Date", "Type", "Amount", "Note", "ISIN", "Quantity", "Fee", "Tax"],
+)
+
+# Umsatzexport of the Volksbank/Raiffeisenbank online banking
+VOLKSBANK = BankFormat(
+    "Volksbank",
+    columns={
+        "created_at": "Buchungstag",
+        "amount": "Betrag",
+        "note": ("Name Zahlungsbeteiligter", "Verwendungszweck", "Buchungstext"),
+    },
+    header=[
+        "Bezeichnung Auftragskonto",
+        "IBAN Auftragskonto",
+        "BIC Auftragskonto",
+        "Bankname Auftragskonto",
+        "Buchungstag",
+        "Valutadatum",
+        "Name Zahlungsbeteiligter",
+        "IBAN Zahlungsbeteiligter",
+        "BIC (SWIFT-Code) Zahlungsbeteiligter",
+        "Buchungstext",
+        "Verwendungszweck",
+        "Betrag",
+        "Waehrung",
+        "Saldo nach Buchung",
+        "Bemerkung",
+        "Kategorie",
+        "Steuerrelevant",
+        "Glaeubiger ID",
+        "Mandatsreferenz",
+    ],
+    encoding="utf-8-sig",
+    date_format="%d.%m.%Y",
+    decimal=",",
+    thousands=".",
+)
+
+BANK_FORMATS = {}
+DECODERS = {}
+
+
+def register_bank_format(account_type, bank_format):
+    """Register the export format used by accounts of ``account_type``."""
+    BANK_FORMATS[account_type] = bank_format
+    DECODERS[account_type] = bank_format.compile()
+
+
+def get_bank_format(account_type):
+    return BANK_FORMATS.get(account_type or "", BANK_FORMATS[""])
+
+
+def get_decoder(account_type):
+    """Return the compiled decoder for an account type, or the default one."""
+    return DECODERS.get(account_type or "", DECODERS[""])
+
+
+register_bank_format("", TRADE_REPUBLIC)
+register_bank_format("trade_republic", TRADE_REPUBLIC)
+register_bank_format("volksbank", VOLKSBANK)
+
+
+def parse_file(path, member, bank_account_id, account_type, tzinfo):
+    """
+    Parse one CSV file, or one member of a ZIP archive, into a list of rows.
+
+    This is the unit of work handed to the parser process pool, so it only
+    takes and returns picklable values.
+    """
+    decoder = get_decoder(account_type)
+    if member is None:
+        with open(path, "r", encoding=decoder.encoding, newline="") as text_stream:
+            return list(decoder.iter_rows(text_stream, bank_account_id, tzinfo))
+
+    with zipfile.ZipFile(path) as archive, archive.open(member) as binary_stream:
+        text_stream = io.TextIOWrapper(
+            binary_stream, encoding=decoder.encoding, newline=""
+        )
+        return list(decoder.iter_rows(text_stream, bank_account_id, tzinfo))
+
+
+def parse_segment(account_type, header, data, tzinfo, delimiter=None, encoding=None):
+    """
+    Parse a segment from iter_line_segments into ParsedRows without fingerprints.
+
+    Fingerprints depend on the rows before the segment, so they are assigned
+    by the caller, in file order.
+    """
+    decoder = get_decoder(account_type)
+    return decoder.decode_lines(
+        header, data.decode(encoding or decoder.encoding), tzinfo, delimiter
+    )
@@ -0,0 +1,805 @@
+"""
+Benchmarks for the import and listing paths, run with ``python manage.py benchmark``.
+
+Every suite returns a list of flat result dicts, so reports of two versions
+can be diffed key by key.
+"""
+
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .bank_formats import BANK_FORMATS, DECODERS, get_bank_format
+from .categorization import RuleMatcher, apply_rules
+from .generators import (
+    MERCHANTS,
+    SECURITIES,
+    generate_transactions,
+    has_isin,
+    write_csv,
+)
+from .importers import (
+    SubtypeClassifier,
+    TransactionImporter,
+    get_import_batch_size,
+    open_csv_stream,
+)
+from .middleware import COMPRESSORS
+from .models import (
+    BankAccount,
+    CategorizationRule,
+    Transaction,
+    TransactionSubType,
+    TransactionType,
+)
+from .parsers import iter_csv_rows, parse_row
+from .renderers import dumps, orjson
+from .serializers import TransactionListWriter, TransactionSerializer
+from .views import CSVUploadView, TransactionViewSet, export_transactions
+
+User = get_user_model()
+
+def sample_csv_text(bank_format, count, seed=0):
+    """Return a generated export of ``count`` rows in ``bank_format``."""
+    text_stream = io.StringIO(newline="")
+    rows = generate_transactions(count, seed, with_trades=has_isin(bank_format))
+    write_csv(text_stream, bank_format, rows)
+    return text_stream.getvalue()
+
+
+def timed(func):
+    """Run ``func`` and return ``(result, elapsed seconds)``."""
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def traced_peak(func):
+    """Run ``func`` under tracemalloc and return the peak traced bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def result_entry(suite, case, rows, elapsed_seconds, **extra):
+    return {
+        "suite": suite,
+        "case": case,
+        "rows": rows,
+        "elapsed_seconds": round(elapsed_seconds, 4),
+        "rows_per_second": round(rows / elapsed_seconds, 1) if elapsed_seconds else 0,
+        **extra,
+    }
+
+
+def benchmark_parsers(sizes, trace_memory=True):
+    """Decode sample exports of every registered bank format."""
+    tzinfo = timezone.get_current_timezone()
+    results = []
+    for account_type, bank_format in BANK_FORMATS.items():
+        if not account_type:
+            continue  # the default format is registered under its own name too
+        decoder = DECODERS[account_type]
+        for size in sizes:
+            text = sample_csv_text(bank_format, size)
+
+            def columnar():
+                stream = io.StringIO(text, newline="")
+                return sum(len(rows) for rows in decoder.iter_chunks(stream, tzinfo))
+
+            parsed, elapsed = timed(columnar)
+            results.append(
+                result_entry(
+                    "parsers",
+                    f"{account_type}/columnar",
+                    parsed,
+                    elapsed,
+                    peak_memory_bytes=traced_peak(columnar) if trace_memory else None,
+                )
+            )
+
+            if bank_format.columns.get("amount") == 2:
+                # The positional layout also has the old row-by-row parser
+                def row_by_row():
+                    stream = io.StringIO(text, newline="")
+                    rows = iter_csv_rows(stream, bank_format.delimiter)
+                    return sum(1 for row in rows if row and parse_row(row, tzinfo))
+
+                parsed, elapsed = timed(row_by_row)
+                results.append(
+                    result_entry(
+                        "parsers",
+                        f"{account_type}/row",
+                        parsed,
+                        elapsed,
+                        peak_memory_bytes=(
+                            traced_peak(row_by_row) if trace_memory else None
+                        ),
+                    )
+                )
+    return results
+
+
+IMPORT_STAGES = ("parse", "classify", "write")
+
+
+class StageClock:
+    """
+    Accumulate wall time, queries and peak traced memory per named stage.
+
+    Install it with ``connection.execute_wrapper`` to count the queries of
+    the active stage. Peak memory is only recorded while tracemalloc runs.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.queries = defaultdict(int)
+        self.peak_memory = defaultdict(int)
+        self.current = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries[self.current] += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def stage(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        previous, self.current = self.current, name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+            self.current = previous
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.peak_memory[name] = max(self.peak_memory[name], peak)
+
+
+def run_clocked(func, trace_memory=False):
+    """Run ``func(clock)`` with query counting and return the StageClock."""
+    clock = StageClock()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with connection.execute_wrapper(clock):
+            func(clock)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return clock
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run on a throwaway database with the current schema, never on real data.
+
+    SQLite gets a temporary file instead of the in-memory test database so
+    writes cost what they cost in production. Under the test runner, which
+    sets up mail.outbox with its test database, that database is used as it
+    is. Uploaded files go to a temporary MEDIA_ROOT in both cases.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        # In-process requests come from APIRequestFactory's "testserver"
+        with override_settings(
+            MEDIA_ROOT=scratch, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            if hasattr(mail, "outbox"):
+                yield
+                return
+
+            test_settings = dict(connection.settings_dict["TEST"])
+            old_config = None
+            try:
+                if connection.vendor == "sqlite" and not test_settings.get("NAME"):
+                    connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                        scratch, "benchmark.sqlite3"
+                    )
+                old_config = setup_databases(
+                    verbosity=0,
+                    interactive=False,
+                    aliases={connection.alias},
+                    serialized_aliases=set(),
+                )
+                yield
+            finally:
+                if old_config is not None:
+                    teardown_databases(old_config, verbosity=0)
+                connection.settings_dict["TEST"] = test_settings
+
+
+def create_benchmark_account(account_type):
+    """A new user and account, so earlier runs neither dedupe nor classify rows."""
+    for (_, sign), name in SubtypeClassifier.DEFAULT_SUBTYPE_NAMES.items():
+        if not TransactionSubType.objects.filter(name=name).exists():
+            transaction_type, _ = TransactionType.objects.get_or_create(
+                name="Income" if sign > 0 else "Expense",
+                defaults={"expense_factor": sign},
+            )
+            TransactionSubType.objects.create(
+                transaction_type=transaction_type, name=name
+            )
+
+    user = User.objects.create_user(
+        username=f"benchmark-{uuid.uuid4().hex[:12]}", password=None
+    )
+    return BankAccount.objects.create(
+        user=user, name="Benchmark", account_type=account_type
+    )
+
+
+def import_stages(bank_account, data, batch_size):
+    """
+    The TransactionImporter pipeline with a clock around every stage.
+
+    Rows are pulled one batch at a time through the same parse, classify
+    and write calls as ``import_csv``, so the per-stage numbers add up to
+    a real import.
+    """
+
+    def run(clock):
+        with clock.stage("classify"):
+            importer = TransactionImporter(
+                bank_account.user, bank_account, batch_size=batch_size
+            )
+        upload = SimpleUploadedFile("benchmark.csv", data)
+        with open_csv_stream(upload, importer.decoder.encoding) as stream:
+            parsed_rows = importer.decoder.iter_rows(
+                stream,
+                bank_account.id,
+                timezone.get_current_timezone(),
+                chunk_size=batch_size,
+            )
+            with transaction.atomic():
+                while True:
+                    with clock.stage("parse"):
+                        rows = list(islice(parsed_rows, batch_size))
+                    if not rows:
+                        break
+                    with clock.stage("classify"):
+                        batch = [importer.build_transaction(row) for row in rows]
+                    with clock.stage("write"):
+                        importer.write_batch(batch)
+
+    return run
+
+
+def upload_csv(bank_account, data):
+    """Post the file to CSVUploadView with the import run inside the request."""
+
+    def run(clock):
+        request = APIRequestFactory().post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile("benchmark.csv", data),
+                "bank_account": bank_account.id,
+            },
+            format="multipart",
+        )
+        force_authenticate(request, user=bank_account.user)
+        with clock.stage("upload"), override_settings(IMPORT_JOBS_EAGER=True):
+            response = CSVUploadView.as_view()(request)
+        if response.status_code != 202 or response.data["status"] != "completed":
+            raise RuntimeError(f"Benchmark upload failed: {response.data}")
+
+    return run
+
+
+def benchmark_import(sizes, account_type="trade_republic", trace_memory=True):
+    """
+    Import generated exports stage by stage and through the upload view.
+
+    Every case runs on a fresh account. Timings and query counts come from
+    a plain run; with ``trace_memory`` a second run under tracemalloc
+    records the peak memory, which would otherwise skew the timings. The
+    traced run is several times slower than the plain one.
+    """
+    bank_format = get_bank_format(account_type)
+    batch_size = get_import_batch_size()
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            data = sample_csv_text(bank_format, size).encode(bank_format.encoding)
+            for make_run, stages in [
+                (partial(import_stages, data=data, batch_size=batch_size), IMPORT_STAGES),
+                (partial(upload_csv, data=data), ("upload",)),
+            ]:
+                clock = run_clocked(make_run(create_benchmark_account(account_type)))
+                memory = None
+                if trace_memory:
+                    memory = run_clocked(
+                        make_run(create_benchmark_account(account_type)),
+                        trace_memory=True,
+                    )
+                measurements = [
+                    (
+                        stage,
+                        clock.seconds[stage],
+                        clock.queries[stage],
+                        memory.peak_memory[stage] if memory else None,
+                    )
+                    for stage in stages
+                ]
+                if len(stages) > 1:
+                    measurements.append(
+                        (
+                            "total",
+                            sum(clock.seconds.values()),
+                            sum(clock.queries.values()),
+                            max(memory.peak_memory.values()) if memory else None,
+                        )
+                    )
+                for stage, seconds, queries, peak_memory in measurements:
+                    results.append(
+                        result_entry(
+                            "import",
+                            f"{account_type}/{stage}",
+                            size,
+                            seconds,
+                            queries=queries,
+                            peak_memory_bytes=peak_memory,
+                            batch_size=batch_size,
+                        )
+                    )
+    return results
+
+
+def create_benchmark_transactions(bank_account, count):
+    """Insert ``count`` generated transactions for the account."""
+    subtype_id = SubtypeClassifier(bank_account.user).get_transaction_subtype_id(
+        False, -1
+    )
+    tzinfo = timezone.get_current_timezone()
+    rows = generate_transactions(count)
+    while True:
+        batch = [
+            Transaction(
+                user=bank_account.user,
+                bank_account=bank_account,
+                transaction_subtype_id=subtype_id,
+                created_at=row["created_at"].replace(tzinfo=tzinfo),
+                amount=row["amount"],
+                note=row["note"],
+                isin=row["isin"],
+                quantity=row["quantity"] or None,
+                fee=row["fee"],
+                tax=row["tax"],
+            )
+            for row in islice(rows, 5000)
+        ]
+        if not batch:
+            break
+        Transaction.objects.bulk_create(batch)
+
+
+def serialize_with_drf(user):
+    """The generic ModelSerializer path, with the bank account joined."""
+
+    def run(clock):
+        queryset = (
+            Transaction.objects.filter(user=user)
+            .select_related("bank_account")
+            .order_by("created_at", "id")
+        )
+        with clock.stage("drf"):
+            JSONRenderer().render(TransactionSerializer(queryset, many=True).data)
+
+    return run
+
+
+def serialize_with_values(user):
+    """The ``.values_list()`` list mode of TransactionViewSet."""
+
+    def run(clock):
+        with clock.stage("values"):
+            writer = TransactionListWriter()
+            queryset = (
+                Transaction.objects.filter(user=user)
+                .order_by("created_at", "id")
+                .values_list(*writer.columns)
+            )
+            account_names = dict(
+                BankAccount.objects.filter(user=user).values_list("id", "name")
+            )
+            writer.render(
+                writer.to_representation(writer.fetch_raw(queryset), account_names)
+            )
+
+    return run
+
+
+def benchmark_serializers(sizes, trace_memory=True):
+    """Serialize a user's transaction list to JSON with DRF and list mode."""
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            bank_account = create_benchmark_account("trade_republic")
+            create_benchmark_transactions(bank_account, size)
+            for make_run in (serialize_with_drf, serialize_with_values):
+                clock = run_clocked(make_run(bank_account.user))
+                memory = None
+                if trace_memory:
+                    memory = run_clocked(make_run(bank_account.user), True)
+                for case, seconds in clock.seconds.items():
+                    results.append(
+                        result_entry(
+                            "serializers",
+                            f"transactions/{case}",
+                            size,
+                            seconds,
+                            queries=clock.queries[case],
+                            peak_memory_bytes=(
+                                memory.peak_memory[case] if memory else None
+                            ),
+                        )
+                    )
+    return results
+
+
+FILTER_CASES = {
+    "page": {},
+    "date_range": {"start_date": "2020-03-01", "end_date": "2020-03-31"},
+    "account": {"bank_account": "{bank_account}"},
+    "isin": {"isin": "IE00B4L5Y983"},
+    "amount_note": {"min_amount": "-50", "max_amount": "-10", "note": "rewe"},
+    "combined": {
+        "bank_account": "{bank_account}",
+        "start_date": "2018-01-01",
+        "max_amount": "0",
+    },
+}
+
+
+def benchmark_filters(sizes, trace_memory=True, repeat=20):
+    """
+    Fetch filtered first pages of the transaction list through the view.
+
+    Each case is requested ``repeat`` times and the median is reported,
+    as single page fetches are too quick to time one by one.
+    """
+    view = TransactionViewSet.as_view({"get": "list"})
+    factory = APIRequestFactory()
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            bank_account = create_benchmark_account("trade_republic")
+            create_benchmark_transactions(bank_account, size)
+            for case, params in FILTER_CASES.items():
+                params = {
+                    name: value.format(bank_account=bank_account.id)
+                    for name, value in params.items()
+                }
+
+                def fetch_page(clock):
+                    request = factory.get("/api/transactions/", params)
+                    force_authenticate(request, user=bank_account.user)
+                    with clock.stage(case):
+                        response = view(request)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"Benchmark request failed: {response}")
+
+                timings = []
+                for _ in range(repeat):
+                    clock = run_clocked(fetch_page)
+                    timings.append(clock.seconds[case])
+                memory = run_clocked(fetch_page, True) if trace_memory else None
+                results.append(
+                    result_entry(
+                        "filters",
+                        f"transactions/{case}",
+                        size,
+                        statistics.median(timings),
+                        queries=clock.queries[case],
+                        peak_memory_bytes=(
+                            memory.peak_memory[case] if memory else None
+                        ),
+                    )
+                )
+    return results
+
+
+EXPORT_CASES = {
+    "csv": {},
+    "ndjson": {},
+    "csv.gz": {"HTTP_ACCEPT_ENCODING": "gzip"},
+}
+
+
+def benchmark_export(sizes, trace_memory=True):
+    """
+    Stream whole exports through the export view.
+
+    The peak memory should not depend on the number of rows.
+    """
+    factory = RequestFactory()
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            bank_account = create_benchmark_account("trade_republic")
+            create_benchmark_transactions(bank_account, size)
+            for case, headers in EXPORT_CASES.items():
+                content_length = 0
+
+                def export(clock):
+                    nonlocal content_length
+                    request = factory.get(
+                        "/api/transactions/export",
+                        {"format": case.split(".")[0]},
+                        **headers,
+                    )
+                    request.user = bank_account.user
+                    with clock.stage(case):
+                        response = export_transactions(request)
+                        content_length = sum(map(len, response.streaming_content))
+
+                clock = run_clocked(export)
+                memory = run_clocked(export, True) if trace_memory else None
+                results.append(
+                    result_entry(
+                        "export",
+                        f"transactions/{case}",
+                        size,
+                        clock.seconds[case],
+                        queries=clock.queries[case],
+                        peak_memory_bytes=(
+                            memory.peak_memory[case] if memory else None
+                        ),
+                        content_bytes=content_length,
+                    )
+                )
+    return results
+
+
+def create_benchmark_rules(user, count):
+    """
+    Create ``count`` rules; only the last ones match the generated merchants.
+
+    Rules that never match come first, the worst case for RuleMatcher, which
+    has to try every one of them before finding a match.
+    """
+    subtype_id = SubtypeClassifier(user).get_transaction_subtype_id(False, -1)
+    unmatched = [
+        ("substring", "Haendler {}"),
+        ("prefix", "Lastschrift {}"),
+        ("regex", r"Vertrag\s+{}\b"),
+    ]
+    rules = [
+        CategorizationRule(
+            user=user,
+            match_type=unmatched[i % 3][0],
+            pattern=unmatched[i % 3][1].format(i),
+            transaction_subtype_id=subtype_id,
+            priority=i,
+        )
+        for i in range(max(count - len(MERCHANTS), 0))
+    ]
+    rules.extend(
+        CategorizationRule(
+            user=user,
+            pattern=name,
+            transaction_subtype_id=subtype_id,
+            priority=count,
+        )
+        for name, _, _ in MERCHANTS
+    )
+    CategorizationRule.objects.bulk_create(rules)
+
+
+def benchmark_rules(sizes, trace_memory=True, rule_count=300):
+    """
+    Categorize generated transactions against ``rule_count`` rules.
+
+    ``notes/match`` classifies the notes in memory like an import does,
+    ``transactions/apply`` re-categorizes stored transactions.
+    """
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            bank_account = create_benchmark_account("volksbank")
+            user = bank_account.user
+            create_benchmark_rules(user, rule_count)
+            notes = [row["note"] for row in generate_transactions(size)]
+
+            def match(clock):
+                with clock.stage("match"):
+                    matcher = RuleMatcher.for_user(user)
+                    for note in notes:
+                        matcher.match(note)
+
+            create_benchmark_transactions(bank_account, size)
+
+            def apply(clock):
+                # Rolled back so every run updates the same rows
+                with transaction.atomic():
+                    with clock.stage("apply"):
+                        apply_rules(user)
+                    transaction.set_rollback(True)
+
+            for case, stage, func in [
+                ("notes/match", "match", match),
+                ("transactions/apply", "apply", apply),
+            ]:
+                clock = run_clocked(func)
+                memory = run_clocked(func, True) if trace_memory else None
+                results.append(
+                    result_entry(
+                        "rules",
+                        case,
+                        size,
+                        clock.seconds[stage],
+                        rules=rule_count,
+                        queries=clock.queries[stage],
+                        peak_memory_bytes=(
+                            memory.peak_memory[stage] if memory else None
+                        ),
+                    )
+                )
+    return results
+
+
+def portfolio_payload(points):
+    """A portfolio response with ``points`` daily prices spread over the holdings."""
+    per_holding = points // len(SECURITIES)
+    start = 1420070400000  # 2015-01-01 in ms
+    return {
+        "holdings": [
+            {
+                "isin": isin,
+                "current_price": price,
+                "history": [
+                    [start + day * 86400000, round(price * (1 + (day % 97) / 500), 4)]
+                    for day in range(per_holding)
+                ],
+            }
+            for isin, price in SECURITIES
+        ],
+        "holdings_count": len(SECURITIES),
+    }
+
+
+def timed_cpu(func):
+    """Run ``func`` and return ``(result, wall seconds, CPU seconds)``."""
+    started, cpu_started = time.perf_counter(), time.process_time()
+    result = func()
+    return (
+        result,
+        time.perf_counter() - started,
+        time.process_time() - cpu_started,
+    )
+
+
+def benchmark_renderers(sizes, trace_memory=True):
+    """
+    Encode the transaction list and a portfolio payload, then compress them.
+
+    ``json`` is the standard library encoder the views used before,
+    ``dumps`` the renderer's (orjson when installed). Compression cases
+    take the ``dumps`` output; ``content_bytes`` is what goes over the wire.
+    """
+    fast_encoder = "dumps/orjson" if orjson else "dumps/json"
+    encoders = {
+        "json": lambda data: json.dumps(data, separators=(",", ":")).encode(),
+        fast_encoder: dumps,
+    }
+    results = []
+    with benchmark_database():
+        for size in sizes:
+            bank_account = create_benchmark_account("trade_republic")
+            create_benchmark_transactions(bank_account, size)
+            writer = TransactionListWriter()
+            rows = Transaction.objects.filter(user=bank_account.user).values_list(
+                *writer.columns
+            )
+            payloads = {
+                "transactions": writer.to_representation(
+                    writer.fetch_raw(rows), {bank_account.id: bank_account.name}
+                ),
+                "portfolio": portfolio_payload(size),
+            }
+            for payload, data in payloads.items():
+                for encoder, encode in encoders.items():
+                    content, elapsed, cpu = timed_cpu(partial(encode, data))
+                    results.append(
+                        result_entry(
+                            "renderers",
+                            f"{payload}/{encoder}",
+                            size,
+                            elapsed,
+                            cpu_seconds=round(cpu, 4),
+                            content_bytes=len(content),
+                            peak_memory_bytes=(
+                                traced_peak(partial(encode, data))
+                                if trace_memory
+                                else None
+                            ),
+                        )
+                    )
+                for coding, compress in COMPRESSORS.items():
+                    compressed, elapsed, cpu = timed_cpu(partial(compress, content))
+                    results.append(
+                        result_entry(
+                            "renderers",
+                            f"{payload}/{coding}",
+                            size,
+                            elapsed,
+                            cpu_seconds=round(cpu, 4),
+                            content_bytes=len(compressed),
+                        )
+                    )
+    return results
+
+
+SUITES = {
+    "parsers": benchmark_parsers,
+    "import": benchmark_import,
+    "serializers": benchmark_serializers,
+    "filters": benchmark_filters,
+    "export": benchmark_export,
+    "rules": benchmark_rules,
+    "renderers": benchmark_renderers,
+}
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+
+def run_benchmarks(suites=None, sizes=DEFAULT_SIZES, trace_memory=True):
+    """Run the named suites (all by default) and return the report dict."""
+    suites = suites or list(SUITES)
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark suite(s): {', '.join(unknown)}")
+
+    results = []
+    for name in suites:
+        results.extend(SUITES[name](list(sizes), trace_memory=trace_memory))
+    return {
+        "created_at": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "sizes": list(sizes),
+        "results": results,
+    }
+
+
+def compare_reports(baseline, report):
+    """
+    Pair up the results of two reports by suite, case and size.
+
+    Returns ``(result, baseline_result)`` tuples for every result of
+    ``report``; the baseline is None for cases it did not run.
+    """
+    baseline_results = {
+        (result["suite"], result["case"], result["rows"]): result
+        for result in baseline["results"]
+    }
+    return [
+        (result, baseline_results.get((result["suite"], result["case"], result["rows"])))
+        for result in report["results"]
+    ]
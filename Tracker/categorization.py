@@ -0,0 +1,140 @@
+"""
+Categorization rules: note patterns that pick a transaction's subtype.
+
+All rules of a user are compiled into one regular expression, so a note is
+checked against every rule in one pass of the regex engine instead of one
+search per rule, and every distinct note is matched only once.
+
+Rules apply to transactions without an ISIN; trades keep being classified
+by their ISIN, see SubtypeClassifier.
+"""
+
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CategorizationRule, SyncVersion, Transaction
+
+APPLY_CHUNK_SIZE = 500
+
+
+class RuleMatcher:
+    """
+    Matches notes against a list of CategorizationRules in priority order.
+
+    Each rule becomes one branch of an alternation that is searched for in
+    the note (see CategorizationRule.get_expression). The search returns
+    the leftmost match, of the first rule matching there. A rule of higher
+    priority can only match further right, so the note is searched again
+    after that position for the rules before the one found; usually the
+    first search already finds the first rule, or none.
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            (rule.get_expression(), rule.transaction_subtype_id) for rule in rules
+        ]
+        # rule count -> alternation of the first rules, compiled on demand
+        self.expressions = {}
+        # note -> subtype id or None, notes repeat a lot within an account
+        self.matches = {}
+        self.expression = None
+        self.positions_by_group = {}
+        if not self.rules:
+            return
+
+        self.expression = self.get_expression(len(self.rules))
+        # Rule groups enclose any groups of a regex rule, so the group
+        # closed last by a match is always the rule's own. The alternations
+        # of fewer rules number their groups the same way.
+        for position in range(len(self.rules)):
+            group = self.expression.groupindex[f"rule{position}"]
+            self.positions_by_group[group] = position
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(
+            CategorizationRule.objects.filter(user=user)
+            .order_by("priority", "id")
+            .only("match_type", "pattern", "transaction_subtype_id")
+        )
+
+    def __bool__(self):
+        return self.expression is not None
+
+    def get_expression(self, count):
+        """The alternation of the first ``count`` rules."""
+        try:
+            return self.expressions[count]
+        except KeyError:
+            pass
+        expression = re.compile(
+            "|".join(
+                f"(?P<rule{position}>{source})"
+                for position, (source, _) in enumerate(self.rules[:count])
+            ),
+            re.IGNORECASE | re.DOTALL,
+        )
+        self.expressions[count] = expression
+        return expression
+
+    def match(self, note):
+        """Return the subtype id of the first rule matching ``note``, or None."""
+        try:
+            return self.matches[note]
+        except KeyError:
+            pass
+        subtype_id = None
+        if self.expression is not None and note:
+            found = self.expression.search(note)
+            while found:
+                position = self.positions_by_group[found.lastindex]
+                subtype_id = self.rules[position][1]
+                if position == 0:
+                    break
+                found = self.get_expression(position).search(note, found.start() + 1)
+        self.matches[note] = subtype_id
+        return subtype_id
+
+
+def apply_rules(user, chunk_size=APPLY_CHUNK_SIZE):
+    """
+    Re-categorize the user's transactions by their rules.
+
+    Only distinct notes are read and matched, then every subtype is set
+    with one UPDATE per chunk of notes. Rows already in the right subtype
+    are left alone, and all changed rows share one change version.
+    Returns the number of updated transactions.
+    """
+    matcher = RuleMatcher.for_user(user)
+    if not matcher:
+        return 0
+
+    transactions = Transaction.objects.filter(user=user, isin="").exclude(note="")
+    notes_by_subtype = defaultdict(list)
+    notes = transactions.order_by().values_list("note", flat=True).distinct()
+    for note in notes.iterator(chunk_size=2000):
+        subtype_id = matcher.match(note)
+        if subtype_id is not None:
+            notes_by_subtype[subtype_id].append(note)
+
+    updated = 0
+    with transaction.atomic():
+        version = None
+        for subtype_id, notes in notes_by_subtype.items():
+            for start in range(0, len(notes), chunk_size):
+                changed = transactions.filter(
+                    note__in=notes[start : start + chunk_size]
+                ).exclude(transaction_subtype_id=subtype_id)
+                if version is None:
+                    if not changed.exists():
+                        continue
+                    version = SyncVersion.objects.next_version(user.id)
+                updated += changed.update(
+                    transaction_subtype_id=subtype_id,
+                    version=version,
+                    updated_at=timezone.now(),
+                )
+    return updated
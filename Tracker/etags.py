@@ -0,0 +1,77 @@
+"""
+Conditional GET for the list endpoints.
+
+List ETags are derived from the user's data version (SyncVersion.data_version),
+which every write to their transactions, accounts and budgets bumps. A request
+whose If-None-Match still matches is answered with 304 Not Modified before
+any queryset or serializer work runs, at the cost of one primary key lookup.
+"""
+
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import SyncVersion
+
+
+def list_etag(request, *parts):
+    """
+    Return the ETag of a list response for the user's current data.
+
+    The path with its query string and the negotiated media type are part of
+    the tag, so filtered lists, pages and formats are validated separately.
+    Returns None if the user has no data version yet.
+    """
+    data_version = SyncVersion.objects.data_version(request.user.id)
+    if data_version is None:
+        return None
+    key = "|".join(
+        [
+            str(request.user.id),
+            str(data_version),
+            request.get_full_path(),
+            request.accepted_media_type or "",
+            *map(str, parts),
+        ]
+    )
+    return quote_etag(hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+
+def etag_matches(etag, if_none_match):
+    """Weak comparison of ``etag`` against an If-None-Match header."""
+    tags = parse_etags(if_none_match)
+    if tags == ["*"]:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
+
+class ConditionalListMixin:
+    """
+    Adds ETags to a viewset's list responses and answers matching requests
+    with 304 Not Modified.
+
+    Viewsets with their own list override ``get_list_response`` instead of
+    ``list``; ``get_etag_parts`` adds whatever else the list depends on.
+    """
+
+    def get_etag_parts(self, request):
+        return []
+
+    def list(self, request, *args, **kwargs):
+        etag = list_etag(request, *self.get_etag_parts(request))
+        if etag and etag_matches(etag, request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.get_list_response(request, *args, **kwargs)
+            if etag is None or response.status_code != status.HTTP_200_OK:
+                return response
+        response["ETag"] = etag
+        # Stored by the browser, but revalidated on every request
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_list_response(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
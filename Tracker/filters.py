@@ -0,0 +1,152 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import month_start, rollup_month
+
+
+class TransactionFilter:
+    """
+    Applies the query parameters of the transaction list as SQL filters.
+
+    ``start_date`` and ``end_date`` take a date (the end date counts as a
+    whole day) or a datetime. ``bank_account``, ``transaction_subtype``,
+    ``transaction_type`` and ``isin`` take one value or a comma-separated
+    list, ``min_amount`` and ``max_amount`` bound the signed amount and
+    ``note`` matches case-insensitively anywhere in the note.
+
+    Every parameter narrows the result, so they combine freely. Account,
+    subtype and ISIN filters are answered by the ``(user, <column>,
+    created_at, id)`` indexes in list order; date bounds seek in the
+    ``(user, created_at, id)`` index; amount and note are checked on the
+    rows the other filters leave.
+    """
+
+    LIST_FILTERS = {
+        "bank_account": "bank_account_id__in",
+        "transaction_subtype": "transaction_subtype_id__in",
+        "transaction_type": "transaction_subtype__transaction_type_id__in",
+    }
+
+    # Filters MonthlyRollups cannot answer, they add up whole months
+    TRANSACTION_FILTERS = ("isin", "min_amount", "max_amount", "note")
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def filter_queryset(self, queryset):
+        filters = self.get_list_filters()
+
+        isins = self.get_list("isin", lambda value: value.upper())
+        if isins is not None:
+            filters["isin__in"] = isins
+
+        start = self.get_datetime("start_date")
+        if start is not None:
+            filters["created_at__gte"] = start
+        end = self.get_datetime("end_date", end_of_day=True)
+        if end is not None:
+            filters["created_at__lt"] = end
+
+        min_amount = self.get_decimal("min_amount")
+        if min_amount is not None:
+            filters["amount__gte"] = min_amount
+        max_amount = self.get_decimal("max_amount")
+        if max_amount is not None:
+            filters["amount__lte"] = max_amount
+
+        note = self.query_params.get("note", "").strip()
+        if note:
+            filters["note__icontains"] = note
+
+        return queryset.filter(**filters)
+
+    def filter_rollups(self, queryset):
+        """
+        Apply the filters to a MonthlyRollup queryset instead.
+
+        Returns None if the rollups cannot answer them: for ISIN, amount and
+        note filters and for date bounds that do not fall on the start of a
+        month (an ``end_date`` on the last day of one does).
+        """
+        if any(
+            self.query_params.get(name, "").strip()
+            for name in self.TRANSACTION_FILTERS
+        ):
+            return None
+        filters = self.get_list_filters()
+        for name, end_of_day, lookup in [
+            ("start_date", False, "month__gte"),
+            ("end_date", True, "month__lt"),
+        ]:
+            bound = self.get_datetime(name, end_of_day=end_of_day)
+            if bound is None:
+                continue
+            month = rollup_month(bound)
+            if month_start(month) != bound:
+                return None
+            filters[lookup] = month
+        return queryset.filter(**filters)
+
+    def get_list_filters(self):
+        filters = {}
+        for name, lookup in self.LIST_FILTERS.items():
+            ids = self.get_list(name, int)
+            if ids is not None:
+                filters[lookup] = ids
+        return filters
+
+    def get_list(self, name, convert):
+        value = self.query_params.get(name)
+        if value is None or not value.strip():
+            return None
+        try:
+            return [convert(item.strip()) for item in value.split(",") if item.strip()]
+        except ValueError:
+            raise ValidationError({name: "Enter a number or a list of numbers."})
+
+    def get_decimal(self, name):
+        value = self.query_params.get(name)
+        if value is None or not value.strip():
+            return None
+        try:
+            number = Decimal(value.strip())
+        except InvalidOperation:
+            number = None
+        if number is None or not number.is_finite():
+            raise ValidationError({name: "Enter a valid number."})
+        return number
+
+    def get_datetime(self, name, end_of_day=False):
+        """
+        Parse a date or datetime bound as an aware datetime.
+
+        Dates are midnight in the current timezone; for ``end_of_day`` the
+        following midnight, so the exclusive bound covers the whole day.
+        A datetime end bound is made exclusive by adding a microsecond.
+        """
+        value = self.query_params.get(name)
+        if value is None or not value.strip():
+            return None
+        value = value.strip()
+        try:
+            # Dates first, parse_datetime would read them as midnight
+            date = parse_date(value)
+            parsed = None if date else parse_datetime(value)
+        except ValueError:
+            parsed = date = None
+        if parsed is None and date is None:
+            raise ValidationError({name: "Enter a valid date or datetime."})
+
+        if parsed is None:
+            if end_of_day:
+                date += timedelta(days=1)
+            parsed = datetime.combine(date, time.min)
+        elif end_of_day:
+            parsed += timedelta(microseconds=1)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
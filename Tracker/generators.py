@@ -0,0 +1,137 @@
+"""
+Synthetic bank exports for benchmarks and manual testing.
+
+The generated history looks like a real account: monthly salary, rent and
+subscriptions, daily card payments at a small set of merchants, and, for
+brokerage formats, savings plan buys, occasional sells and dividends.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta
+
+from .bank_formats import FIELDS
+
+EMPLOYERS = ["Muster GmbH", "Beispiel AG", "Stadtwerke"]
+LANDLORDS = ["Hausverwaltung Nord", "Wohnbau eG", "Immobilien Schmidt"]
+SUBSCRIPTIONS = [
+    ("Netflix", -12.99, 3),
+    ("Spotify", -9.99, 5),
+    ("Fitnessstudio", -29.90, 10),
+    ("Telekom", -39.95, 20),
+]
+MERCHANTS = [
+    ("REWE", 5, 80),
+    ("EDEKA", 5, 70),
+    ("ALDI", 5, 60),
+    ("dm", 3, 40),
+    ("Tankstelle", 30, 90),
+    ("Apotheke", 5, 40),
+    ("Baeckerei", 2, 12),
+    ("Amazon", 10, 150),
+    ("Restaurant", 15, 90),
+]
+SECURITIES = [
+    ("IE00B4L5Y983", 80.0),  # MSCI World ETF
+    ("US0378331005", 180.0),  # Apple
+    ("DE0005140008", 12.0),  # Deutsche Bank
+    ("IE00BK5BQT80", 110.0),  # FTSE All-World ETF
+]
+TRADE_FEE = 1.0
+
+
+def generate_transactions(
+    count, seed=0, start=datetime(2015, 1, 1), with_trades=True, years=10
+):
+    """
+    Yield ``count`` transactions as dicts with the fields of a ParsedRow.
+
+    Rows are in date order. The daily number of card payments grows with
+    ``count`` so the history spans about ``years`` years.
+    """
+    rng = random.Random(seed)
+    employer = rng.choice(EMPLOYERS)
+    landlord = rng.choice(LANDLORDS)
+    rent = -round(rng.uniform(600, 1400), 0)
+    salary = round(rng.uniform(2200, 4200), 2)
+    payments_per_day = max(1.0, count / (years * 365) - 0.3)
+
+    produced = 0
+    day = start
+    while produced < count:
+        rows = []
+        if day.day == 1:
+            rows.append(("Gehalt " + employer, salary, "", 0.0))
+            rows.append(("Miete " + landlord, rent, "", 0.0))
+        for name, amount, day_of_month in SUBSCRIPTIONS:
+            if day.day == day_of_month:
+                rows.append((name, amount, "", 0.0))
+        if with_trades:
+            rows.extend(generate_trades(rng, day))
+
+        payments = int(payments_per_day) + (rng.random() < payments_per_day % 1)
+        for _ in range(payments):
+            name, low, high = rng.choice(MERCHANTS)
+            rows.append((name, -round(rng.uniform(low, high), 2), "", 0.0))
+
+        minutes = sorted(rng.randint(6 * 60, 22 * 60) for _ in rows)
+        for (note, amount, isin, quantity), minute in zip(rows, minutes):
+            if produced >= count:
+                return
+            yield {
+                "created_at": day + timedelta(minutes=minute),
+                "amount": amount,
+                "note": note,
+                "isin": isin,
+                "quantity": quantity,
+                "fee": TRADE_FEE if isin and quantity else 0.0,
+                "tax": 0.0,
+            }
+            produced += 1
+        day += timedelta(days=1)
+
+
+def generate_trades(rng, day):
+    """Savings plan on the 15th, some discretionary trades and dividends."""
+    trades = []
+    if day.day == 15:
+        isin, price = SECURITIES[0]
+        trades.append(("Sparplan", -100.0, isin, round(100.0 / price, 4)))
+    if rng.random() < 0.02:
+        isin, price = rng.choice(SECURITIES)
+        quantity = rng.randint(1, 10)
+        trades.append(("Kauf", -round(quantity * price, 2), isin, float(quantity)))
+    if rng.random() < 0.005:
+        isin, price = rng.choice(SECURITIES)
+        quantity = rng.randint(1, 5)
+        trades.append(("Verkauf", round(quantity * price, 2), isin, float(quantity)))
+    if day.day == 20 and day.month in (3, 6, 9, 12):
+        for isin, price in SECURITIES[:2]:
+            trades.append(("Dividende", round(price * 0.05, 2), isin, 0.0))
+    return trades
+
+
+def write_csv(text_stream, bank_format, rows):
+    """Write rows as a CSV export in ``bank_format``, dropping unmapped fields."""
+    header = bank_format.header
+    positions = bank_format.compile().resolve_columns(header)
+    writer = csv.writer(text_stream, delimiter=bank_format.delimiter)
+    writer.writerow(header)
+    for row in rows:
+        cells = [""] * len(header)
+        for field in FIELDS:
+            columns = positions[field]
+            if not columns:
+                continue
+            value = row[field]
+            if field == "created_at":
+                value = bank_format.format_date(value)
+            elif isinstance(value, float):
+                value = bank_format.format_decimal(value)
+            cells[columns[0]] = value
+        writer.writerow(cells)
+
+
+def has_isin(bank_format):
+    """Whether exports in ``bank_format`` carry securities trades."""
+    return bank_format.columns.get("isin") is not None
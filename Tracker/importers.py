@@ -0,0 +1,552 @@
+import io
+import json
+import multiprocessing
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import BalanceSnapshot, BankAccount, Transaction, TransactionSubType
+from .bank_formats import get_decoder, parse_file
+from .categorization import RuleMatcher
+from .parsers import iter_parsed_rows
+
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+
+
+def get_import_batch_size():
+    """Return the configured number of rows written per bulk_create call."""
+    return getattr(settings, "CSV_IMPORT_BATCH_SIZE", DEFAULT_IMPORT_BATCH_SIZE)
+
+
+@contextmanager
+def open_csv_stream(uploaded_file, encoding="utf-8"):
+    """
+    Decode an uploaded file lazily instead of reading it into memory.
+
+    The wrapper is detached afterwards so closing it does not close the
+    underlying UploadedFile, which Django cleans up itself.
+    """
+    uploaded_file.seek(0)
+    text_stream = io.TextIOWrapper(uploaded_file, encoding=encoding, newline="")
+    try:
+        yield text_stream
+    finally:
+        text_stream.detach()
+
+
+class ImportResult:
+    """Summary of a finished import run."""
+
+    def __init__(self, created_count, elapsed_seconds, skipped_count=0):
+        self.created_count = created_count
+        self.skipped_count = skipped_count
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def rows_processed(self):
+        return self.created_count + self.skipped_count
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed_seconds <= 0:
+            return float(self.rows_processed)
+        return self.rows_processed / self.elapsed_seconds
+
+    def as_dict(self):
+        status = f"Imported {self.created_count} rows"
+        if self.skipped_count:
+            status += f", skipped {self.skipped_count} already imported"
+        return {
+            "status": status,
+            "created_count": self.created_count,
+            "skipped_count": self.skipped_count,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class SubtypeClassifier:
+    """
+    Assigns subtypes to imported rows without touching the database.
+
+    The subtype-by-name table, the user's categorization rules and the
+    ``(isin, sign) -> subtype`` and ``note -> subtype`` maps are loaded once
+    up front. Every classified row is added to the maps, so later rows of the
+    same file see earlier ones just as if they had already been saved.
+    """
+
+    DEFAULT_SUBTYPE_NAMES = {
+        (False, -1): "Outflow",  # Regular expense
+        (False, 1): "Inflow",  # Regular income
+        (True, -1): "Stock/ETF/Bond Purchase",  # Savings for stocks
+        (True, 1): "Investment Returns",  # Income from Stocks
+    }
+    FALLBACK_SUBTYPE_NAME = "Not assigned"
+
+    def __init__(self, user):
+        self.user = user
+        self.subtype_ids_by_name = self.load_subtype_ids_by_name()
+        self.isin_subtype_ids = self.load_isin_subtype_ids(user)
+        self.note_subtype_ids = self.load_note_subtype_ids(user)
+        self.rules = RuleMatcher.for_user(user)
+
+    @staticmethod
+    def load_subtype_ids_by_name():
+        subtype_ids = {}
+        for subtype_id, name in TransactionSubType.objects.order_by("pk").values_list(
+            "id", "name"
+        ):
+            subtype_ids.setdefault(name, subtype_id)
+        return subtype_ids
+
+    @staticmethod
+    def load_isin_subtype_ids(user):
+        """Map (isin, sign) to the subtype of the first matching transaction."""
+        subtype_ids = {}
+        rows = (
+            Transaction.objects.filter(user=user)
+            .exclude(isin="")
+            .exclude(amount=0)
+            .order_by("pk")
+            .values_list("isin", "amount", "transaction_subtype_id")
+        )
+        for isin, amount, subtype_id in rows.iterator(chunk_size=2000):
+            subtype_ids.setdefault((isin, 1 if amount > 0 else -1), subtype_id)
+        return subtype_ids
+
+    @staticmethod
+    def load_note_subtype_ids(user):
+        """Map note to the subtype of the first transaction using it."""
+        subtype_ids = {}
+        rows = (
+            Transaction.objects.filter(user=user)
+            .exclude(note="")
+            .order_by("pk")
+            .values_list("note", "transaction_subtype_id")
+        )
+        for note, subtype_id in rows.iterator(chunk_size=2000):
+            subtype_ids.setdefault(note, subtype_id)
+        return subtype_ids
+
+    def get_transaction_subtype_id(self, is_stock: bool, amount: float):
+        name = self.DEFAULT_SUBTYPE_NAMES[(is_stock, -1 if amount < 0 else 1)]
+        subtype_id = self.subtype_ids_by_name.get(name)
+        if subtype_id is None:
+            # Fallback to "Not assigned" subtype if specific ones don't exist
+            subtype_id = self.subtype_ids_by_name.get(self.FALLBACK_SUBTYPE_NAME)
+        if subtype_id is None:
+            raise TransactionSubType.DoesNotExist(
+                f"Subtype '{self.FALLBACK_SUBTYPE_NAME}' does not exist"
+            )
+        return subtype_id
+
+    def classify(self, isin, amount, note):
+        """
+        Return the subtype id for a row.
+
+        Trades reuse the subtype of the same ISIN and direction. Other rows
+        take the subtype of the first matching rule, else the one already
+        used for the same note.
+        """
+        subtype_id = None
+
+        # For stock transactions, reuse the subtype of the same ISIN and direction
+        if isin:
+            subtype_id = self.isin_subtype_ids.get((isin, 1 if amount > 0 else -1))
+        elif note:
+            subtype_id = self.rules.match(note)
+            if subtype_id is None:
+                subtype_id = self.note_subtype_ids.get(note)
+
+        if subtype_id is None:
+            subtype_id = self.get_transaction_subtype_id(bool(isin), amount)
+
+        self.remember(isin, amount, note, subtype_id)
+        return subtype_id
+
+    def remember(self, isin, amount, note, subtype_id):
+        """Record a classified row so later rows of the same import can match it."""
+        if isin and amount != 0:
+            self.isin_subtype_ids.setdefault(
+                (isin, 1 if amount > 0 else -1), subtype_id
+            )
+        if note:
+            self.note_subtype_ids.setdefault(note, subtype_id)
+
+
+class TransactionImporter:
+    """
+    Turns CSV rows into unsaved Transaction objects and writes them with
+    chunked bulk_create calls inside a single atomic block.
+
+    The import is a generator pipeline (parse -> classify -> batch -> write),
+    so peak memory depends on the batch size, not on the file size.
+
+    With ``commit_per_batch`` every batch is committed on its own instead,
+    which makes progress visible to other connections while a long import
+    is running. Fingerprints make re-running a partially imported file safe.
+
+    CSV files are decoded with the registered format of the account type,
+    see bank_formats. ``import_rows`` takes already split rows in the
+    Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax layout.
+    """
+
+    def __init__(
+        self,
+        user,
+        bank_account,
+        batch_size=None,
+        classifier=None,
+        commit_per_batch=False,
+    ):
+        self.user = user
+        self.bank_account = bank_account
+        self.batch_size = batch_size or get_import_batch_size()
+        self.commit_per_batch = commit_per_batch
+        self.classifier = classifier or SubtypeClassifier(user)
+        self.decoder = get_decoder(bank_account.account_type)
+
+    def parse(self, rows):
+        """Parse stage: turn raw CSV rows into fingerprinted ParsedRow tuples."""
+        return iter_parsed_rows(
+            rows, self.bank_account.id, timezone.get_current_timezone()
+        )
+
+    def classify(self, parsed_rows):
+        """Classify stage: attach a subtype and build unsaved Transactions."""
+        for parsed in parsed_rows:
+            yield self.build_transaction(parsed)
+
+    def batches(self, transactions):
+        """Batch stage: group transactions into lists of ``batch_size``."""
+        batch = []
+        for obj in transactions:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def build_transaction(self, parsed):
+        """Build an unsaved Transaction from a parsed row."""
+        transaction_subtype_id = self.classifier.classify(
+            parsed.isin, parsed.amount, parsed.note
+        )
+        return Transaction(
+            user=self.user,
+            bank_account=self.bank_account,
+            created_at=parsed.created_at,
+            transaction_subtype_id=transaction_subtype_id,
+            amount=parsed.amount,
+            note=parsed.note,
+            isin=parsed.isin,
+            quantity=parsed.quantity,
+            fee=parsed.fee,
+            tax=parsed.tax,
+            fingerprint=parsed.fingerprint,
+        )
+
+    def write_batch(self, batch):
+        """Write stage: insert the rows not imported before, return how many."""
+        existing = set(
+            Transaction.objects.filter(
+                user=self.user,
+                bank_account=self.bank_account,
+                fingerprint__in=[obj.fingerprint for obj in batch],
+            )
+            # Matches the condition of the unique constraint, so its partial
+            # index answers the lookup
+            .exclude(fingerprint="")
+            .values_list("fingerprint", flat=True)
+        )
+        new_transactions = []
+        for obj in batch:
+            if obj.fingerprint in existing:
+                continue
+            new_transactions.append(obj)
+            # A second row with the same fingerprint would break the unique
+            # constraint and roll back the whole batch
+            if obj.fingerprint:
+                existing.add(obj.fingerprint)
+        Transaction.objects.bulk_create(new_transactions, batch_size=self.batch_size)
+        return len(new_transactions)
+
+    def import_rows(self, rows, on_progress=None):
+        """Import an iterable of already split CSV rows (header excluded)."""
+        return self.import_parsed(self.parse(rows), on_progress=on_progress)
+
+    def import_parsed(self, parsed_rows, on_progress=None):
+        """
+        Classify and write rows that went through the parse stage already.
+
+        ``on_progress`` is called with the running ImportResult after every
+        written batch, inside the same transaction as the batch itself.
+        """
+        started = time.perf_counter()
+        created_count = 0
+        skipped_count = 0
+
+        if self.commit_per_batch:
+            import_block, batch_block = nullcontext, transaction.atomic
+        else:
+            import_block, batch_block = transaction.atomic, nullcontext
+
+        with import_block():
+            # Each stage pulls from the previous one, so only the batch
+            # currently being written is held in memory.
+            for batch in self.batches(self.classify(parsed_rows)):
+                with batch_block():
+                    written = self.write_batch(batch)
+                    created_count += written
+                    skipped_count += len(batch) - written
+                    if on_progress:
+                        on_progress(
+                            ImportResult(
+                                created_count,
+                                time.perf_counter() - started,
+                                skipped_count,
+                            )
+                        )
+
+        # Backdated rows dropped the snapshots after them, put them back
+        if created_count:
+            BalanceSnapshot.objects.refresh([self.bank_account])
+
+        return ImportResult(
+            created_count, time.perf_counter() - started, skipped_count
+        )
+
+    def import_csv(
+        self, csv_file, delimiter=None, encoding=None, on_progress=None
+    ):
+        """
+        Import an uploaded CSV export of the account's bank.
+
+        The file is decoded column by column in chunks of ``batch_size``
+        rows; ``delimiter`` and ``encoding`` override the bank format.
+        """
+        with open_csv_stream(csv_file, encoding or self.decoder.encoding) as stream:
+            parsed_rows = self.decoder.iter_rows(
+                stream,
+                self.bank_account.id,
+                timezone.get_current_timezone(),
+                chunk_size=self.batch_size,
+                delimiter=delimiter,
+            )
+            return self.import_parsed(parsed_rows, on_progress=on_progress)
+
+
+ARCHIVE_MANIFEST_NAME = "manifest.json"
+DEFAULT_IMPORT_PARSE_WORKERS = 2
+
+
+def get_parse_workers():
+    """Return the configured number of parser processes for archive imports."""
+    return getattr(settings, "IMPORT_PARSE_WORKERS", DEFAULT_IMPORT_PARSE_WORKERS)
+
+
+def find_bank_account(accounts, reference):
+    """Find an account by id, name or IBAN as used in archive manifests."""
+    reference = str(reference).strip()
+    for account in accounts:
+        if reference == str(account.id):
+            return account
+    for account in accounts:
+        if reference.lower() == account.name.lower():
+            return account
+    compact = reference.replace(" ", "").upper()
+    for account in accounts:
+        if account.iban and compact == account.iban.replace(" ", "").upper():
+            return account
+    return None
+
+
+def match_bank_account_by_filename(accounts, filename):
+    """
+    Apply the filename convention for archive members.
+
+    A file belongs to the account whose slugified name starts the slugified
+    file name (``checking-2024-01.csv`` -> "Checking"), or whose IBAN appears
+    in it. The longest matching name wins.
+    """
+    stem = slugify(PurePosixPath(filename).stem)
+    compact_name = filename.replace(" ", "").upper()
+    for account in accounts:
+        if account.iban and account.iban.replace(" ", "").upper() in compact_name:
+            return account
+
+    best_match = None
+    for account in accounts:
+        account_slug = slugify(account.name)
+        if not account_slug or not stem.startswith(account_slug):
+            continue
+        rest = stem[len(account_slug) :]
+        if rest and rest[0] not in "-_":
+            continue
+        if best_match is None or len(account_slug) > len(slugify(best_match.name)):
+            best_match = account
+    return best_match
+
+
+def plan_archive_import(archive_file, user, default_account=None):
+    """
+    Map every CSV member of a ZIP archive to one of the user's bank accounts.
+
+    The archive manifest wins, then the filename convention, then the
+    default account. Returns a list of ``(member_name, bank_account)`` and
+    raises ValueError when a member cannot be mapped.
+    """
+    accounts = list(BankAccount.objects.filter(user=user))
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile:
+        raise ValueError("File is not a valid ZIP archive")
+
+    with archive:
+        names = archive.namelist()
+        manifest = {}
+        if ARCHIVE_MANIFEST_NAME in names:
+            try:
+                manifest = json.loads(archive.read(ARCHIVE_MANIFEST_NAME))
+            except ValueError:
+                raise ValueError(f"{ARCHIVE_MANIFEST_NAME} is not valid JSON")
+            if not isinstance(manifest, dict):
+                raise ValueError(
+                    f"{ARCHIVE_MANIFEST_NAME} must map file names to bank accounts"
+                )
+
+    plan = []
+    for name in sorted(names):
+        if name.endswith("/") or not name.lower().endswith(".csv"):
+            continue
+        basename = PurePosixPath(name).name
+        reference = manifest.get(name, manifest.get(basename))
+        if reference is not None:
+            account = find_bank_account(accounts, reference)
+            if account is None:
+                raise ValueError(f"Unknown bank account '{reference}' for {name}")
+        else:
+            account = match_bank_account_by_filename(accounts, basename)
+            account = account or default_account
+        if account is None:
+            raise ValueError(f"No bank account found for {name}")
+        plan.append((name, account))
+
+    if not plan:
+        raise ValueError("The archive does not contain any CSV files")
+    return plan
+
+
+def bundle_uploads(uploaded_files):
+    """Pack several uploaded CSV files into one ZIP archive for a single job."""
+    buffer = io.BytesIO()
+    used_names = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for index, uploaded_file in enumerate(uploaded_files):
+            name = PurePosixPath(uploaded_file.name).name
+            if name in used_names:
+                name = f"{index}-{name}"
+            used_names.add(name)
+            with archive.open(name, "w") as member:
+                for chunk in uploaded_file.chunks():
+                    member.write(chunk)
+    return ContentFile(buffer.getvalue(), name="upload-bundle.zip")
+
+
+class ArchiveImporter:
+    """
+    Imports every CSV file of a ZIP archive.
+
+    Files are parsed in a process pool, while a single writer in this process
+    classifies the parsed rows and writes them, one file after the other in
+    archive order. SQLite only allows one writer at a time, and classifying
+    in order keeps subtypes learned from earlier files consistent.
+    """
+
+    def __init__(
+        self,
+        user,
+        default_account=None,
+        batch_size=None,
+        workers=None,
+        commit_per_batch=False,
+    ):
+        self.user = user
+        self.default_account = default_account
+        self.batch_size = batch_size
+        self.workers = get_parse_workers() if workers is None else workers
+        self.commit_per_batch = commit_per_batch
+
+    def parse_all(self, path, plan):
+        """Yield the parsed rows of each planned member, in plan order."""
+        tzinfo = timezone.get_current_timezone()
+        if self.workers <= 1 or len(plan) == 1:
+            for member, account in plan:
+                yield parse_file(
+                    path, member, account.id, account.account_type, tzinfo
+                )
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(plan)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    parse_file,
+                    path,
+                    member,
+                    account.id,
+                    account.account_type,
+                    tzinfo,
+                )
+                for member, account in plan
+            ]
+            for future in futures:
+                yield future.result()
+
+    def import_archive(self, path, on_progress=None):
+        started = time.perf_counter()
+        plan = plan_archive_import(path, self.user, self.default_account)
+        classifier = SubtypeClassifier(self.user)
+        created_count = 0
+        skipped_count = 0
+
+        def file_progress(result):
+            if on_progress:
+                on_progress(
+                    ImportResult(
+                        created_count + result.created_count,
+                        time.perf_counter() - started,
+                        skipped_count + result.skipped_count,
+                    )
+                )
+
+        import_block = nullcontext if self.commit_per_batch else transaction.atomic
+        with import_block():
+            for (member, account), parsed_rows in zip(
+                plan, self.parse_all(path, plan)
+            ):
+                importer = TransactionImporter(
+                    self.user,
+                    account,
+                    batch_size=self.batch_size,
+                    classifier=classifier,
+                    commit_per_batch=self.commit_per_batch,
+                )
+                result = importer.import_parsed(parsed_rows, on_progress=file_progress)
+                created_count += result.created_count
+                skipped_count += result.skipped_count
+
+        return ImportResult(
+            created_count, time.perf_counter() - started, skipped_count
+        )
@@ -0,0 +1,210 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .importers import ArchiveImporter, TransactionImporter
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_JOB_WORKERS = 2
+DEFAULT_IMPORT_JOB_POLL_SECONDS = 5
+DEFAULT_IMPORT_JOB_STALE_SECONDS = 600
+
+
+def enqueue_import_job(user, bank_account, uploaded_file, batch_size=None):
+    """
+    Store an uploaded CSV and queue it for import.
+
+    With the IMPORT_JOBS_EAGER setting the job is run right away in the
+    calling thread, which is what tests and single-process setups want.
+    """
+    job = ImportJob.objects.create(
+        user=user,
+        bank_account=bank_account,
+        file=uploaded_file,
+        original_name=uploaded_file.name,
+        batch_size=batch_size,
+    )
+
+    if getattr(settings, "IMPORT_JOBS_EAGER", False):
+        if claim_job(job.pk):
+            run_import_job(ImportJob.objects.get(pk=job.pk))
+        job.refresh_from_db()
+    else:
+        get_worker_pool().notify()
+
+    return job
+
+
+def claim_job(job_id):
+    """Atomically move a queued job to running; False if someone else got it."""
+    now = timezone.now()
+    return bool(
+        ImportJob.objects.filter(pk=job_id, status=ImportJob.QUEUED).update(
+            status=ImportJob.RUNNING, started_at=now, updated_at=now
+        )
+    )
+
+
+def claim_next_job():
+    """Take the oldest queued job off the DB-backed queue, if any."""
+    while True:
+        job_id = (
+            ImportJob.objects.filter(status=ImportJob.QUEUED)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        if claim_job(job_id):
+            return ImportJob.objects.get(pk=job_id)
+
+
+def requeue_stale_jobs(stale_after=None):
+    """Put jobs back in the queue whose worker stopped reporting progress."""
+    if stale_after is None:
+        stale_after = getattr(
+            settings, "IMPORT_JOBS_STALE_SECONDS", DEFAULT_IMPORT_JOB_STALE_SECONDS
+        )
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return ImportJob.objects.filter(
+        status=ImportJob.RUNNING, updated_at__lt=cutoff
+    ).update(status=ImportJob.QUEUED)
+
+
+def run_import_job(job):
+    """Import the file of a claimed job, recording progress after every batch."""
+
+    def record_progress(result):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=result.rows_processed,
+            created_count=result.created_count,
+            skipped_count=result.skipped_count,
+            updated_at=timezone.now(),
+        )
+
+    try:
+        if job.is_archive():
+            importer = ArchiveImporter(
+                job.user,
+                job.bank_account,
+                batch_size=job.batch_size,
+                commit_per_batch=True,
+            )
+            result = importer.import_archive(
+                job.file.path, on_progress=record_progress
+            )
+        else:
+            importer = TransactionImporter(
+                job.user,
+                job.bank_account,
+                batch_size=job.batch_size,
+                commit_per_batch=True,
+            )
+            with job.file.open("rb") as csv_file:
+                result = importer.import_csv(csv_file, on_progress=record_progress)
+    except Exception as e:
+        logger.exception("Import job %s failed", job.pk)
+        # Failed jobs are not retried, a retry is a new upload
+        job.file.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.FAILED,
+            file="",
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        return
+
+    # The stored upload is only needed until the job went through.
+    job.file.delete(save=False)
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=ImportJob.COMPLETED,
+        file="",
+        rows_processed=result.rows_processed,
+        created_count=result.created_count,
+        skipped_count=result.skipped_count,
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+class ImportWorkerPool:
+    """
+    In-process worker threads that drain the ImportJob queue.
+
+    The queue lives in the database, so no external broker is needed and
+    jobs queued by any process are picked up by whichever pool polls first.
+    """
+
+    def __init__(self, workers=None, poll_seconds=None):
+        self.workers = workers or getattr(
+            settings, "IMPORT_JOBS_WORKERS", DEFAULT_IMPORT_JOB_WORKERS
+        )
+        self.poll_seconds = poll_seconds or getattr(
+            settings, "IMPORT_JOBS_POLL_SECONDS", DEFAULT_IMPORT_JOB_POLL_SECONDS
+        )
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            requeue_stale_jobs()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"import-worker-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Wake the workers up after a job was queued."""
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        """Let the workers finish their current job and exit."""
+        with self._lock:
+            self._stopping.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = claim_next_job()
+                if job is not None:
+                    run_import_job(job)
+                    continue
+            except Exception:
+                logger.exception("Import worker crashed while polling the queue")
+            finally:
+                close_old_connections()
+
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = ImportWorkerPool()
+        return _worker_pool
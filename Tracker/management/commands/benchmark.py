@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Tracker.benchmarks import DEFAULT_SIZES, SUITES, compare_reports, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Run the import benchmarks and print or save a JSON report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "suites",
+            nargs="*",
+            help=f"Suites to run (default: all of {', '.join(SUITES)})",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help=(
+                "Row count to benchmark, can be given several times "
+                f"(default: {', '.join(map(str, DEFAULT_SIZES))})"
+            ),
+        )
+        parser.add_argument(
+            "--skip-memory",
+            action="store_true",
+            help="Skip the tracemalloc runs that measure peak memory",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument(
+            "--compare",
+            help="Print the change in rows/sec against this earlier JSON report",
+        )
+
+    def handle(self, *args, **options):
+        sizes = options["rows"] or DEFAULT_SIZES
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        try:
+            report = run_benchmarks(
+                options["suites"], sizes, trace_memory=not options["skip_memory"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for result, previous in compare_reports(baseline or {"results": []}, report):
+            line = (
+                f"{result['suite']:<10} {result['case']:<28} {result['rows']:>9} rows "
+                f"{result['elapsed_seconds']:>9.4f}s "
+                f"{result['rows_per_second']:>12.0f} rows/sec"
+            )
+            if result.get("queries") is not None:
+                line += f" {result['queries']:>7} queries"
+            if result.get("peak_memory_bytes") is not None:
+                line += f" {result['peak_memory_bytes'] / 2**20:>8.1f} MiB"
+            if previous and previous["rows_per_second"]:
+                change = result["rows_per_second"] / previous["rows_per_second"] - 1
+                line += f" {change:>+8.1%}"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Report written to {options['output']}")
+            )
@@ -0,0 +1,80 @@
+import io
+import os
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import slugify
+
+from Tracker.bank_formats import BANK_FORMATS
+from Tracker.generators import generate_transactions, has_isin, write_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Write synthetic bank exports with salaries, recurring payments, card "
+        "payments and securities trades, one file per account"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Number of transactions per account (default: 10000)",
+        )
+        parser.add_argument(
+            "--format",
+            default="trade_republic",
+            choices=[name for name in BANK_FORMATS if name],
+            help="Bank export format (default: trade_republic)",
+        )
+        parser.add_argument(
+            "--accounts",
+            nargs="+",
+            default=["Depot"],
+            help=(
+                "Account names; files are named after them so archive uploads "
+                "map them to accounts of the same name"
+            ),
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            default=".",
+            help="Directory for the CSV files, or a .zip file to pack them into",
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1:
+            raise CommandError("--rows must be positive")
+        bank_format = BANK_FORMATS[options["format"]]
+        output = options["output"]
+
+        files = []
+        for index, account in enumerate(options["accounts"]):
+            text_stream = io.StringIO(newline="")
+            rows = generate_transactions(
+                options["rows"],
+                seed=options["seed"] + index,
+                with_trades=has_isin(bank_format),
+            )
+            write_csv(text_stream, bank_format, rows)
+            name = f"{slugify(account) or f'account-{index + 1}'}.csv"
+            files.append((name, text_stream.getvalue().encode(bank_format.encoding)))
+
+        if output.lower().endswith(".zip"):
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, data in files:
+                    archive.writestr(name, data)
+            written = [output]
+        else:
+            os.makedirs(output, exist_ok=True)
+            written = []
+            for name, data in files:
+                path = os.path.join(output, name)
+                with open(path, "wb") as f:
+                    f.write(data)
+                written.append(path)
+
+        for path in written:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
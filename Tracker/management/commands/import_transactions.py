@@ -0,0 +1,305 @@
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from Tracker.importers import (
+    TransactionImporter,
+    find_bank_account,
+    get_import_batch_size,
+)
+from Tracker.models import BalanceSnapshot, BankAccount, TransactionSubType
+from Tracker.bank_formats import get_decoder, parse_segment
+from Tracker.parsers import Fingerprinter, iter_line_segments
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a CSV export into a bank account, decoded with the format of its "
+        "account type. Progress is checkpointed after every committed batch, so "
+        "an interrupted import resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", required=True, help="CSV file to import")
+        parser.add_argument(
+            "--account",
+            required=True,
+            help="Bank account id, or its name or IBAN together with --user-email",
+        )
+        parser.add_argument(
+            "--user-email",
+            help="Owner of the bank account, needed when --account is a name or IBAN",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per committed batch (default: CSV_IMPORT_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes parsing the file ahead of the database writer",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file (default: <file>.checkpoint.json)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the beginning",
+        )
+        parser.add_argument(
+            "--delimiter", help="Override the delimiter of the bank format"
+        )
+        parser.add_argument(
+            "--encoding", help="Override the encoding of the bank format"
+        )
+
+    def handle(self, *args, **options):
+        path = options["file"]
+        if not os.path.isfile(path):
+            raise CommandError(f"File '{path}' does not exist")
+        batch_size = options["batch_size"] or get_import_batch_size()
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        bank_account = self.get_bank_account(
+            options["account"], options["user_email"]
+        )
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint.json"
+        checkpoint = ImportCheckpoint.load(checkpoint_path, bank_account)
+        if options["restart"] or checkpoint is None:
+            checkpoint = ImportCheckpoint(checkpoint_path, bank_account.id)
+        elif checkpoint.offset > os.path.getsize(path):
+            raise CommandError(
+                f"Checkpoint offset {checkpoint.offset} is beyond the end of '{path}'"
+            )
+        else:
+            self.stdout.write(
+                f"Resuming at byte {checkpoint.offset} after "
+                f"{checkpoint.rows_processed} rows"
+            )
+
+        importer = TransactionImporter(
+            bank_account.user, bank_account, batch_size=batch_size
+        )
+        fingerprinter = Fingerprinter(bank_account.id)
+
+        started = time.perf_counter()
+        rows_at_start = checkpoint.rows_processed
+        last_report = started
+        try:
+            with open(path, "rb") as binary_stream:
+                header = self.read_header(binary_stream, bank_account, options)
+                if checkpoint.offset:
+                    # Count the rows before the checkpoint again, so identical
+                    # rows after it get the same fingerprints as in one run
+                    committed = iter_line_segments(
+                        binary_stream, batch_size, stop_offset=checkpoint.offset
+                    )
+                    for _, parsed_rows in self.parse_segments(
+                        committed, bank_account.account_type, header, options
+                    ):
+                        for parsed in parsed_rows:
+                            fingerprinter.fingerprint(parsed)
+                segments = iter_line_segments(binary_stream, batch_size)
+                for end_offset, parsed_rows in self.parse_segments(
+                    segments, bank_account.account_type, header, options
+                ):
+                    batch = [
+                        importer.build_transaction(fingerprinter.assign(parsed))
+                        for parsed in parsed_rows
+                    ]
+                    with transaction.atomic():
+                        created = importer.write_batch(batch)
+
+                    # Only advance the checkpoint once the batch is committed
+                    checkpoint.advance(end_offset, created, len(batch) - created)
+                    checkpoint.save()
+
+                    now = time.perf_counter()
+                    if now - last_report >= 1:
+                        last_report = now
+                        self.report(checkpoint, rows_at_start, now - started)
+        except (ValueError, IndexError, TransactionSubType.DoesNotExist) as e:
+            raise CommandError(
+                f"Import stopped after byte {checkpoint.offset} "
+                f"({checkpoint.rows_processed} rows): {e}. "
+                f"Fix the file and run the command again to resume."
+            )
+
+        # Backdated rows dropped the snapshots after them, put them back
+        if checkpoint.created_count:
+            BalanceSnapshot.objects.refresh([bank_account])
+
+        self.report(checkpoint, rows_at_start, time.perf_counter() - started)
+        checkpoint.delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {checkpoint.created_count} transactions into "
+                f"'{bank_account.name}', skipped {checkpoint.skipped_count} "
+                f"already imported"
+            )
+        )
+
+    def get_bank_account(self, reference, user_email):
+        accounts = BankAccount.objects.select_related("user")
+        if user_email:
+            try:
+                user = User.objects.get(email=user_email)
+            except User.DoesNotExist:
+                raise CommandError(f"User with email '{user_email}' does not exist")
+            accounts = accounts.filter(user=user)
+        elif not reference.isdigit():
+            raise CommandError(
+                "Pass --user-email to select an account by name or IBAN"
+            )
+
+        bank_account = find_bank_account(list(accounts), reference)
+        if bank_account is None:
+            raise CommandError(f"Bank account '{reference}' does not exist")
+        return bank_account
+
+    def read_header(self, binary_stream, bank_account, options):
+        """Read the header row, which named columns are resolved against."""
+        decoder = get_decoder(bank_account.account_type)
+        line = binary_stream.readline().decode(
+            options["encoding"] or decoder.encoding
+        )
+        return decoder.read_header(io.StringIO(line), options["delimiter"])
+
+    def parse_segments(self, segments, account_type, header, options):
+        """Yield ``(end_offset, parsed_rows)`` for every segment, in file order."""
+        tzinfo = timezone.get_current_timezone()
+        workers = options["workers"]
+
+        def parse_args(data):
+            return (
+                account_type,
+                header,
+                data,
+                tzinfo,
+                options["delimiter"],
+                options["encoding"],
+            )
+
+        if workers == 1:
+            for _, end_offset, data in segments:
+                yield end_offset, parse_segment(*parse_args(data))
+            return
+
+        # Keep a bounded number of segments in flight, so memory does not
+        # grow with the file when the writer is the bottleneck.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            pending = deque()
+            for _, end_offset, data in segments:
+                pending.append(
+                    (end_offset, executor.submit(parse_segment, *parse_args(data)))
+                )
+                if len(pending) >= workers * 2:
+                    end_offset, future = pending.popleft()
+                    yield end_offset, future.result()
+            while pending:
+                end_offset, future = pending.popleft()
+                yield end_offset, future.result()
+
+    def report(self, checkpoint, rows_at_start, elapsed_seconds):
+        rows = checkpoint.rows_processed - rows_at_start
+        rows_per_second = rows / elapsed_seconds if elapsed_seconds > 0 else rows
+        self.stdout.write(
+            f"{checkpoint.rows_processed} rows "
+            f"({checkpoint.created_count} created, "
+            f"{checkpoint.skipped_count} skipped), "
+            f"{rows_per_second:.0f} rows/sec, byte {checkpoint.offset}"
+        )
+
+
+class ImportCheckpoint:
+    """
+    The position of the last committed batch of a command line import.
+
+    The fingerprint occurrence counters are not kept, a resumed import
+    counts the rows before ``offset`` again.
+    """
+
+    def __init__(
+        self,
+        path,
+        bank_account_id,
+        offset=0,
+        created_count=0,
+        skipped_count=0,
+    ):
+        self.path = path
+        self.bank_account_id = bank_account_id
+        self.offset = offset
+        self.created_count = created_count
+        self.skipped_count = skipped_count
+
+    @property
+    def rows_processed(self):
+        return self.created_count + self.skipped_count
+
+    @classmethod
+    def load(cls, path, bank_account):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            raise CommandError(f"Checkpoint '{path}' is not valid JSON")
+        if data.get("bank_account") != bank_account.id:
+            raise CommandError(
+                f"Checkpoint '{path}' belongs to bank account "
+                f"{data.get('bank_account')}, pass --restart to start over"
+            )
+        return cls(
+            path,
+            bank_account.id,
+            offset=data["offset"],
+            created_count=data["created_count"],
+            skipped_count=data["skipped_count"],
+        )
+
+    def advance(self, offset, created_count, skipped_count):
+        self.offset = offset
+        self.created_count += created_count
+        self.skipped_count += skipped_count
+
+    def save(self):
+        # Write to a temporary file first, so a crash never leaves half a checkpoint
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(
+                {
+                    "bank_account": self.bank_account_id,
+                    "offset": self.offset,
+                    "created_count": self.created_count,
+                    "skipped_count": self.skipped_count,
+                },
+                f,
+            )
+        os.replace(temporary_path, self.path)
+
+    def delete(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from Tracker.models import MonthlyRollup
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the monthly rollups from the transactions, for all users or "
+        "the given ones, to repair drift from writes that bypassed the models"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only rebuild this user's rollups (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            users = dict(
+                User.objects.filter(username__in=options["usernames"]).values_list(
+                    "username", "pk"
+                )
+            )
+            missing = sorted(set(options["usernames"]) - set(users))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(missing)}")
+            user_ids = list(users.values())
+
+        count = MonthlyRollup.objects.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} monthly rollups"))
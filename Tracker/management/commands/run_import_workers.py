@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Tracker.jobs import (
+    ImportWorkerPool,
+    claim_next_job,
+    requeue_stale_jobs,
+    run_import_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued CSV imports. Jobs left queued or running by a stopped "
+        "server are picked up again, run this next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker threads (default: IMPORT_JOBS_WORKERS)",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] is not None and options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale import jobs")
+
+        if options["burst"]:
+            processed = 0
+            while (job := claim_next_job()) is not None:
+                run_import_job(job)
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} import jobs"))
+            return
+
+        pool = ImportWorkerPool(workers=options["workers"])
+        pool.start()
+        self.stdout.write(
+            f"Processing import jobs with {pool.workers} workers, "
+            f"press CTRL-C to stop"
+        )
+        try:
+            # Jobs of workers that died are retried once they count as stale
+            while True:
+                time.sleep(pool.poll_seconds)
+                if requeue_stale_jobs():
+                    pool.notify()
+        except KeyboardInterrupt:
+            self.stdout.write("Waiting for the running imports to finish")
+        finally:
+            pool.stop()
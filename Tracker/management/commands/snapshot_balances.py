@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from Tracker.models import BalanceSnapshot, BankAccount
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the missing month-start balance snapshots of all bank accounts, or "
+        "those of the given users, up to the current month"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only snapshot this user's accounts (repeatable)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Delete the existing snapshots first and recompute them all",
+        )
+
+    def handle(self, *args, **options):
+        accounts = BankAccount.objects.order_by("id")
+        if options["usernames"]:
+            found = set(
+                User.objects.filter(username__in=options["usernames"]).values_list(
+                    "username", flat=True
+                )
+            )
+            missing = sorted(set(options["usernames"]) - found)
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(missing)}")
+            accounts = accounts.filter(user__username__in=found)
+
+        if options["rebuild"]:
+            BalanceSnapshot.objects.filter(bank_account__in=accounts).delete()
+        added = BalanceSnapshot.objects.refresh(accounts)
+        self.stdout.write(self.style.SUCCESS(f"Added {added} balance snapshots"))
@@ -0,0 +1,122 @@
+"""
+Response compression negotiated from the Accept-Encoding header.
+
+Brotli is used when the ``brotli`` package is installed and the client
+prefers or equally accepts it, gzip otherwise. Responses smaller than
+COMPRESSION_MIN_SIZE bytes are not worth the CPU and are sent as they are.
+
+Against BREACH, gzip output gets random filename bytes like Django's
+GZipMiddleware. Brotli has no such field, so responses that set the CSRF
+cookie, which get_token() does whenever a token may be in the body, are
+only ever gzipped.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+# Random gzip filename bytes against BREACH, like Django's GZipMiddleware
+GZIP_MAX_RANDOM_BYTES = 100
+# Quality 4-6 is brotli's sweet spot for dynamic content
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|x-ndjson|xml)|image/svg\+xml)"
+)
+QUALITY = re.compile(r"\bq=([0-9.]+)")
+
+
+def get_compression_min_size():
+    return getattr(settings, "COMPRESSION_MIN_SIZE", DEFAULT_COMPRESSION_MIN_SIZE)
+
+
+def compress_gzip(content):
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def compress_brotli(content):
+    return brotli.compress(content, quality=BROTLI_QUALITY)
+
+
+# In order of preference when the client accepts several equally
+COMPRESSORS = {"gzip": compress_gzip}
+if brotli:
+    COMPRESSORS = {"br": compress_brotli, **COMPRESSORS}
+# The codings that randomize their length, see the module docstring
+LENGTH_RANDOMIZING_CODINGS = ("gzip",)
+
+
+def negotiate_encoding(accept_encoding, codings=None):
+    """
+    Return the content coding to use for an Accept-Encoding header, or None.
+
+    Codings the client gives the highest q-value win, ties go to the first
+    of ``codings`` (default: the available compressors). ``*`` stands for
+    every coding not listed and ``q=0`` refuses a coding.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        match = QUALITY.search(params)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+
+    best, best_quality = None, 0.0
+    for coding in COMPRESSORS if codings is None else codings:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress text and JSON responses with the best coding the client accepts.
+
+    Streaming responses are left alone; the transaction export compresses
+    its own stream.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+            return response
+        if len(response.content) < get_compression_min_size():
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codings = None
+        if settings.CSRF_COOKIE_NAME in response.cookies:
+            codings = LENGTH_RANDOMIZING_CODINGS
+        coding = negotiate_encoding(
+            request.headers.get("Accept-Encoding", ""), codings
+        )
+        if coding is None:
+            return response
+
+        compressed = COMPRESSORS[coding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        # A strong ETag promises identical bytes, RFC 9110 Section 8.8.1
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = coding
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0020_transaction_sync_versions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorizationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_type', models.CharField(choices=[('substring', 'Contains'), ('prefix', 'Starts with'), ('regex', 'Regular expression')], default='substring', max_length=10)),
+                ('pattern', models.CharField(max_length=200)),
+                ('priority', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction_subtype', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categorization_rules', to='Tracker.transactionsubtype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categorization_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'priority', 'id'], name='rule_user_priority_idx')],
+            },
+        ),
+    ]
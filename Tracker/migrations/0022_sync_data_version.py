@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_missing_counters(apps, schema_editor):
+    """Every user gets a counter, so their lists carry ETags from the start."""
+    SyncVersion = apps.get_model("Tracker", "SyncVersion")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    user_ids = User.objects.exclude(
+        pk__in=SyncVersion.objects.values("user_id")
+    ).values_list("pk", flat=True)
+    SyncVersion.objects.bulk_create(
+        [SyncVersion(user_id=user_id) for user_id in user_ids]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0021_categorization_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncversion',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(create_missing_counters, migrations.RunPython.noop),
+    ]
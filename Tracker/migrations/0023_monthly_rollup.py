@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+
+def build_rollups(apps, schema_editor):
+    """Roll up the existing transactions, like MonthlyRollup.objects.rebuild."""
+    Transaction = apps.get_model("Tracker", "Transaction")
+    MonthlyRollup = apps.get_model("Tracker", "MonthlyRollup")
+    rows = (
+        Transaction.objects.order_by()
+        .annotate(
+            rollup_month=Trunc(
+                "created_at",
+                "month",
+                output_field=DateField(),
+                tzinfo=timezone.get_default_timezone(),
+            )
+        )
+        .values("user_id", "bank_account_id", "transaction_subtype_id", "rollup_month")
+        .annotate(
+            amount_sum=Sum("amount"),
+            row_count=Count("id"),
+            fee_sum=Sum("fee"),
+            tax_sum=Sum("tax"),
+        )
+    )
+    MonthlyRollup.objects.bulk_create(
+        (
+            MonthlyRollup(
+                user_id=row["user_id"],
+                bank_account_id=row["bank_account_id"],
+                transaction_subtype_id=row["transaction_subtype_id"],
+                month=row["rollup_month"],
+                amount=row["amount_sum"] or 0,
+                count=row["row_count"],
+                fees=row["fee_sum"] or 0,
+                taxes=row["tax_sum"] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0022_sync_data_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('fees', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('taxes', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('bank_account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='Tracker.bankaccount')),
+                ('transaction_subtype', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='Tracker.transactionsubtype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'month'], name='rollup_user_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'bank_account', 'transaction_subtype', 'month'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0023_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='Tracker.bankaccount')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('bank_account', 'month'), name='unique_balance_snapshot')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rollups without an account that share user, subtype and month."""
+    MonthlyRollup = apps.get_model("Tracker", "MonthlyRollup")
+    without_account = MonthlyRollup.objects.filter(bank_account__isnull=True)
+    duplicates = (
+        without_account.order_by()
+        .values("user_id", "transaction_subtype_id", "month")
+        .annotate(
+            rows=Count("id"),
+            amount_sum=Sum("amount"),
+            count_sum=Sum("count"),
+            fee_sum=Sum("fees"),
+            tax_sum=Sum("taxes"),
+        )
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        group = without_account.filter(
+            user_id=duplicate["user_id"],
+            transaction_subtype_id=duplicate["transaction_subtype_id"],
+            month=duplicate["month"],
+        ).order_by("id")
+        kept = group.first()
+        group.exclude(pk=kept.pk).delete()
+        kept.amount = duplicate["amount_sum"]
+        kept.count = duplicate["count_sum"]
+        kept.fees = duplicate["fee_sum"]
+        kept.taxes = duplicate["tax_sum"]
+        kept.save(update_fields=["amount", "count", "fees", "taxes"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0024_balance_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('bank_account__isnull', True)), fields=('user', 'transaction_subtype', 'month'), name='unique_monthly_rollup_without_account'),
+        ),
+    ]
@@ -2,13 +2,62 @@ from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models.functions import Coalesce
-from django.db.models import Sum
-from django.db.models import Value, DecimalField
-from datetime import timedelta
+from django.db.models.functions import Coalesce, Trunc
+from django.db.models import Count, F, Q, Sum
+from django.db.models import Value, DateField, DecimalField
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import re
 
+# \1 or (?P=name) in a regular expression
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
 
-class TransactionType(models.Model):
+# Transaction fields the monthly rollups are keyed by or add up
+ROLLUP_FIELDS = {
+    "user",
+    "user_id",
+    "bank_account",
+    "bank_account_id",
+    "transaction_subtype",
+    "transaction_subtype_id",
+    "created_at",
+    "amount",
+    "fee",
+    "tax",
+}
+ROLLUP_CHUNK_SIZE = 500
+CENT = Decimal("0.01")
+
+
+class DataVersionMixin:
+    """
+    Bumps the data version on save and delete, so list ETags change.
+
+    Bulk queryset writes bypass it, like they bypass save() and delete().
+    """
+
+    def touch_data_version(self):
+        SyncVersion.objects.touch(self.user_id)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            self.touch_data_version()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            self.touch_data_version()
+            return super().delete(*args, **kwargs)
+
+
+class SharedDataVersionMixin(DataVersionMixin):
+    """For models every user sees: their writes bump all data versions."""
+
+    def touch_data_version(self):
+        SyncVersion.objects.touch_all()
+
+
+class TransactionType(SharedDataVersionMixin, models.Model):
     name = models.CharField(max_length=50, unique=True)  # e.g., "Income", "Expense"
     description = models.TextField(blank=True)
     expense_factor = models.SmallIntegerField(
@@ -19,7 +68,7 @@ class TransactionType(models.Model):
         return f"{self.name} ({'+' if self.expense_factor == 1 else '-'})"
 
 
-class TransactionSubType(models.Model):
+class TransactionSubType(SharedDataVersionMixin, models.Model):
     transaction_type = models.ForeignKey(
         TransactionType, on_delete=models.CASCADE, related_name="subtypes"
     )
@@ -78,8 +127,34 @@ class BankAccountManager(models.Manager):
         account = self.get_queryset().with_balance().filter(id=account_id).first()
         return account.balance if account else 0
 
+    def get_balance_as_of(self, account, moment):
+        """
+        The balance of the account before ``moment``, that is excluding it.
 
-class BankAccount(models.Model):
+        Starts from the latest BalanceSnapshot before ``moment``, so only
+        the transactions since have to be added up.
+        """
+        snapshot = (
+            BalanceSnapshot.objects.filter(
+                bank_account=account, month__lte=rollup_month(moment)
+            )
+            .order_by("-month")
+            .values_list("month", "balance")
+            .first()
+        )
+        transactions = Transaction.objects.filter(
+            user_id=account.user_id, bank_account=account, created_at__lt=moment
+        )
+        balance = 0
+        if snapshot is not None:
+            month, balance = snapshot
+            transactions = transactions.filter(created_at__gte=month_start(month))
+        return balance + (
+            transactions.aggregate(balance=Sum("amount"))["balance"] or 0
+        )
+
+
+class BankAccount(DataVersionMixin, models.Model):
     ACCOUNT_TYPES = [
         ("trade_republic", "Trade Republic"),
         ("volksbank", "Volksbank"),
@@ -111,6 +186,161 @@ class BankAccount(models.Model):
         return f"{self.user} - {self.name}"
 
 
+class SyncVersionManager(models.Manager):
+    def next_version(self, user_id):
+        """
+        Bump the user's change counter and return the new version.
+
+        Call it inside the transaction that writes the change: the counter
+        row stays locked until the commit, so changes of one user commit
+        in version order and a client never skips over a late commit.
+        """
+        counter = self.filter(user_id=user_id)
+        with transaction.atomic(using=self.db, savepoint=False):
+            if counter.update(
+                version=F("version") + 1, data_version=F("data_version") + 1
+            ):
+                return counter.values_list("version", flat=True).get()
+            _, created = self.get_or_create(
+                user_id=user_id, defaults={"version": 1, "data_version": 1}
+            )
+            # Otherwise another transaction created the counter meanwhile
+            return 1 if created else self.next_version(user_id)
+
+    def current_version(self, user_id):
+        version = self.filter(user_id=user_id).values_list("version", flat=True)
+        return version.first() or 0
+
+    def touch(self, user_id):
+        """Bump only the user's data version, for writes to other models."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            if self.filter(user_id=user_id).update(
+                data_version=F("data_version") + 1
+            ):
+                return
+            _, created = self.get_or_create(
+                user_id=user_id, defaults={"data_version": 1}
+            )
+            if not created:
+                self.touch(user_id)
+
+    def touch_all(self):
+        """Bump every user's data version, for writes to shared models."""
+        self.update(data_version=F("data_version") + 1)
+
+    def data_version(self, user_id):
+        """Return the user's data version, None if they never wrote anything."""
+        return (
+            self.filter(user_id=user_id)
+            .values_list("data_version", flat=True)
+            .first()
+        )
+
+
+class SyncVersion(models.Model):
+    """
+    The latest change version of a user's transactions, see Transaction.version.
+
+    ``data_version`` also counts writes to the user's accounts and budgets and
+    to the shared transaction types; list ETags are derived from it.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="sync_version"
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    data_version = models.PositiveBigIntegerField(default=0)
+
+    objects = SyncVersionManager()
+
+    def __str__(self):
+        return f"{self.user} - {self.version}"
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Keeps the change versions and monthly rollups of bulk writes, like
+    Transaction.save and Transaction.delete do for single rows.
+
+    Every write takes one new version per user it touches.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            versions = {}
+            for obj in objs:
+                if obj.user_id not in versions:
+                    versions[obj.user_id] = SyncVersion.objects.next_version(
+                        obj.user_id
+                    )
+                obj.version = versions[obj.user_id]
+            created = super().bulk_create(objs, *args, **kwargs)
+            changes = RollupChanges()
+            changes.add_transactions(created)
+            changes.save()
+            return created
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            changes = RollupChanges()
+            ids = None
+            if ROLLUP_FIELDS.intersection(kwargs):
+                # The filter may not match the rows any more after the update
+                ids = list(self.order_by().values_list("id", flat=True))
+                changes.add_queryset(self, sign=-1)
+
+            if "version" in kwargs:
+                updated = super().update(**kwargs)
+            else:
+                updated = 0
+                user_ids = self.order_by().values_list("user_id", flat=True)
+                for user_id in list(user_ids.distinct()):
+                    rows = super(TransactionQuerySet, self.filter(user_id=user_id))
+                    updated += rows.update(
+                        version=SyncVersion.objects.next_version(user_id),
+                        updated_at=timezone.now(),
+                        **kwargs,
+                    )
+
+            if ids:
+                for start in range(0, len(ids), ROLLUP_CHUNK_SIZE):
+                    changes.add_queryset(
+                        Transaction.objects.filter(
+                            pk__in=ids[start : start + ROLLUP_CHUNK_SIZE]
+                        )
+                    )
+                changes.save()
+        return updated
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            tombstones = []
+            versions = {}
+            for user_id, transaction_id in self.order_by().values_list(
+                "user_id", "id"
+            ):
+                if user_id not in versions:
+                    versions[user_id] = SyncVersion.objects.next_version(user_id)
+                tombstones.append(
+                    TransactionTombstone(
+                        user_id=user_id,
+                        transaction_id=transaction_id,
+                        version=versions[user_id],
+                    )
+                )
+            TransactionTombstone.objects.bulk_create(tombstones, batch_size=1000)
+            changes = RollupChanges()
+            changes.add_queryset(self, sign=-1)
+            changes.save()
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Transaction(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="transactions"
@@ -146,6 +376,51 @@ class Transaction(models.Model):
         null=True,
         blank=True,
     )
+    # Content hash of imported CSV rows, used to skip them on re-import.
+    # Empty for transactions that were entered manually.
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    # The user's SyncVersion after the last change of this row, for the
+    # changes endpoint. Deleted rows leave a TransactionTombstone.
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "bank_account", "fingerprint"],
+                condition=~models.Q(fingerprint=""),
+                name="unique_transaction_fingerprint_per_account",
+            )
+        ]
+        indexes = [
+            # Keyset pagination of a user's transactions seeks in this index
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="transaction_user_created_idx",
+            ),
+            # Filtered lists, still in (created_at, id) order, see filters.py
+            models.Index(
+                fields=["user", "bank_account", "created_at", "id"],
+                name="transaction_account_date_idx",
+            ),
+            models.Index(
+                fields=["user", "transaction_subtype", "created_at", "id"],
+                name="transaction_subtype_date_idx",
+            ),
+            models.Index(
+                fields=["user", "isin", "created_at", "id"],
+                name="transaction_isin_date_idx",
+            ),
+            # Per-row lookups of the importer and the bulk subtype updates
+            models.Index(
+                fields=["user", "isin", "amount"],
+                name="transaction_isin_amount_idx",
+            ),
+            models.Index(fields=["user", "note"], name="transaction_user_note_idx"),
+            models.Index(fields=["user", "version"], name="transaction_version_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.bank_account:
@@ -156,12 +431,479 @@ class Transaction(models.Model):
             else:
                 raise ValidationError(f"User {self.user} has no bank accounts defined.")
 
-        super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            self.version = SyncVersion.objects.next_version(self.user_id)
+            update_fields = kwargs.get("update_fields")
+            changes = RollupChanges()
+            tracked = update_fields is None or ROLLUP_FIELDS.intersection(
+                update_fields
+            )
+            if tracked and not self._state.adding:
+                # What the row counted for before, it may have moved months
+                stored = Transaction.objects.filter(pk=self.pk)
+                changes.add_queryset(stored, sign=-1)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "version", "updated_at"}
+            super().save(*args, **kwargs)
+            if tracked:
+                changes.add_transactions([self])
+                changes.save()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            TransactionTombstone.objects.create(
+                user_id=self.user_id,
+                transaction_id=self.pk,
+                version=SyncVersion.objects.next_version(self.user_id),
+            )
+            changes = RollupChanges()
+            changes.add_transactions([self], sign=-1)
+            changes.save()
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user} - {self.transaction_subtype} - {self.amount}"
 
 
+class TransactionTombstone(models.Model):
+    """Marks a deleted transaction, so clients syncing changes drop it too."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="transaction_tombstones"
+    )
+    transaction_id = models.PositiveBigIntegerField()
+    version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "version"], name="tombstone_version_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.transaction_id} deleted"
+
+
+def rollup_month(created_at):
+    """The first day of the month of ``created_at`` in the default timezone."""
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    local = timezone.localtime(created_at, timezone.get_default_timezone())
+    return local.date().replace(day=1)
+
+
+def month_start(month):
+    """Midnight at the start of ``month`` in the default timezone."""
+    return timezone.make_aware(
+        datetime.combine(month, time.min), timezone.get_default_timezone()
+    )
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def to_cents(value):
+    return Decimal(0) if value is None else Decimal(str(value)).quantize(CENT)
+
+
+class RollupChanges(dict):
+    """
+    Signed changes to MonthlyRollups, collected before they are applied.
+
+    Maps (user id, bank account id, subtype id, month) to
+    ``[amount, count, fees, taxes]``.
+    """
+
+    def add(self, key, amount, count, fees, taxes):
+        totals = self.setdefault(key, [Decimal(0), 0, Decimal(0), Decimal(0)])
+        totals[0] += to_cents(amount)
+        totals[1] += count
+        totals[2] += to_cents(fees)
+        totals[3] += to_cents(taxes)
+
+    def add_transactions(self, transactions, sign=1):
+        for obj in transactions:
+            self.add(
+                (
+                    obj.user_id,
+                    obj.bank_account_id,
+                    obj.transaction_subtype_id,
+                    rollup_month(obj.created_at),
+                ),
+                sign * to_cents(obj.amount),
+                sign,
+                sign * to_cents(obj.fee),
+                sign * to_cents(obj.tax),
+            )
+
+    def save(self):
+        """Apply the changes to the rollups and drop the snapshots they outdate."""
+        MonthlyRollup.objects.apply(self)
+        BalanceSnapshot.objects.invalidate(self)
+
+    def add_queryset(self, queryset, sign=1):
+        """Add the stored transactions of ``queryset``, grouped in SQL."""
+        rows = (
+            queryset.order_by()
+            .annotate(
+                rollup_month=Trunc(
+                    "created_at",
+                    "month",
+                    output_field=DateField(),
+                    tzinfo=timezone.get_default_timezone(),
+                )
+            )
+            .values_list(
+                "user_id", "bank_account_id", "transaction_subtype_id", "rollup_month"
+            )
+            .annotate(Sum("amount"), Count("id"), Sum("fee"), Sum("tax"))
+        )
+        for *key, amount, count, fees, taxes in rows:
+            self.add(
+                tuple(key),
+                sign * to_cents(amount),
+                sign * count,
+                sign * to_cents(fees),
+                sign * to_cents(taxes),
+            )
+
+
+class MonthlyRollupManager(models.Manager):
+    def apply(self, changes):
+        """
+        Add RollupChanges to the stored rollups in a few bulk queries.
+
+        Call it in the transaction that writes the transactions, after the
+        user's SyncVersion was bumped: the locked counter row serializes the
+        rollup writes of a user, so no two of them create the same row.
+        Rollups whose count drops to zero are deleted.
+        """
+        changes = {key: totals for key, totals in changes.items() if any(totals)}
+        if not changes:
+            return
+        with transaction.atomic(using=self.db, savepoint=False):
+            existing = self.select_for_update().filter(
+                user_id__in={key[0] for key in changes},
+                month__in={key[3] for key in changes},
+            )
+            rollups = {rollup.get_key(): rollup for rollup in existing}
+            creates, updates, deletes = [], [], []
+            for key, (amount, count, fees, taxes) in changes.items():
+                rollup = rollups.get(key)
+                if rollup is None:
+                    if count > 0:
+                        creates.append(
+                            self.model.from_key(key, amount, count, fees, taxes)
+                        )
+                    continue
+                rollup.amount += amount
+                rollup.count += count
+                rollup.fees += fees
+                rollup.taxes += taxes
+                if rollup.count > 0:
+                    updates.append(rollup)
+                else:
+                    deletes.append(rollup.pk)
+
+            if deletes:
+                self.filter(pk__in=deletes).delete()
+            if updates:
+                self.bulk_update(
+                    updates,
+                    ["amount", "count", "fees", "taxes"],
+                    batch_size=ROLLUP_CHUNK_SIZE,
+                )
+            if creates:
+                self.bulk_create(creates, batch_size=ROLLUP_CHUNK_SIZE)
+
+    def rebuild(self, user_ids=None):
+        """
+        Recompute the rollups of ``user_ids`` (default: all users) from their
+        transactions, repairing any drift. Returns the number of rollups.
+        """
+        with transaction.atomic(using=self.db):
+            rollups = self.all()
+            transactions = Transaction.objects.all()
+            if user_ids is not None:
+                rollups = rollups.filter(user_id__in=user_ids)
+                transactions = transactions.filter(user_id__in=user_ids)
+            rollups.delete()
+            changes = RollupChanges()
+            changes.add_queryset(transactions)
+            created = self.bulk_create(
+                [self.model.from_key(key, *totals) for key, totals in changes.items()],
+                batch_size=ROLLUP_CHUNK_SIZE,
+            )
+        return len(created)
+
+    def sum_amount(self, user, start, end, **filters):
+        """
+        Sum the amounts of the user's transactions created in [start, end).
+
+        The whole months in the range are read from the rollups, only the
+        days before the first and after the last of them from the
+        transactions. ``filters`` are lookups both models understand, like
+        ``transaction_subtype__in``.
+        """
+        first = rollup_month(start)
+        if month_start(first) < start:
+            first = next_month(first)
+        # Every month before the one ``end`` falls in ends before ``end``
+        last = rollup_month(end)
+        transactions = Transaction.objects.filter(user=user, **filters)
+        if first >= last:
+            return (
+                transactions.filter(created_at__gte=start, created_at__lt=end)
+                .aggregate(total=Sum("amount"))["total"]
+                or 0
+            )
+
+        months = self.filter(
+            user=user, month__gte=first, month__lt=last, **filters
+        ).aggregate(total=Sum("amount"))["total"]
+        days = transactions.filter(
+            Q(created_at__gte=start, created_at__lt=month_start(first))
+            | Q(created_at__gte=month_start(last), created_at__lt=end)
+        ).aggregate(total=Sum("amount"))["total"]
+        return (months or 0) + (days or 0)
+
+
+class MonthlyRollup(models.Model):
+    """
+    The transactions of one account and subtype in one calendar month of the
+    default timezone, added up.
+
+    Kept current by every write through Transaction and its queryset, see
+    RollupChanges; ``manage.py rebuild_rollups`` recomputes them.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="monthly_rollups"
+    )
+    bank_account = models.ForeignKey(
+        BankAccount,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="monthly_rollups",
+    )
+    transaction_subtype = models.ForeignKey(
+        TransactionSubType, on_delete=models.CASCADE, related_name="monthly_rollups"
+    )
+    month = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    fees = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    taxes = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = MonthlyRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "bank_account", "transaction_subtype", "month"],
+                name="unique_monthly_rollup",
+            ),
+            # NULLs are distinct in the constraint above, and SQLite ignores
+            # nulls_distinct=False, so rows without an account need their own
+            models.UniqueConstraint(
+                fields=["user", "transaction_subtype", "month"],
+                condition=models.Q(bank_account__isnull=True),
+                name="unique_monthly_rollup_without_account",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "month"], name="rollup_user_month_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.transaction_subtype} - {self.month:%Y-%m}"
+
+    @classmethod
+    def from_key(cls, key, amount, count, fees, taxes):
+        user_id, bank_account_id, transaction_subtype_id, month = key
+        return cls(
+            user_id=user_id,
+            bank_account_id=bank_account_id,
+            transaction_subtype_id=transaction_subtype_id,
+            month=month,
+            amount=amount,
+            count=count,
+            fees=fees,
+            taxes=taxes,
+        )
+
+    def get_key(self):
+        return (
+            self.user_id,
+            self.bank_account_id,
+            self.transaction_subtype_id,
+            self.month,
+        )
+
+
+class BalanceSnapshotManager(models.Manager):
+    def invalidate(self, changes):
+        """
+        Delete the snapshots RollupChanges outdate: those of the changed
+        accounts after the earliest month whose amount changed.
+
+        Snapshots only go up to the current month, so writes dated in it or
+        later do not need a query.
+        """
+        current = rollup_month(timezone.now())
+        earliest = {}
+        for (_, account_id, _, month), totals in changes.items():
+            if totals[0] and account_id is not None and month < current:
+                earliest[account_id] = min(month, earliest.get(account_id, month))
+        if not earliest:
+            return
+        outdated = Q()
+        for account_id, month in earliest.items():
+            outdated |= Q(bank_account_id=account_id, month__gt=month)
+        self.filter(outdated).delete()
+
+    def refresh(self, bank_accounts):
+        """
+        Add the missing monthly snapshots of ``bank_accounts`` up to the
+        current month and return how many were added.
+
+        Snapshots continue from the latest one of an account, or start after
+        its first month; the balances are added up from the MonthlyRollups.
+        """
+        current = rollup_month(timezone.now())
+        added = 0
+        for account in bank_accounts:
+            with transaction.atomic(using=self.db):
+                # Writers bump the counter before they touch the rollups, so
+                # holding it keeps a backdated write from slipping in between
+                # reading the rollups and inserting snapshots it would outdate
+                list(
+                    SyncVersion.objects.select_for_update().filter(
+                        user_id=account.user_id
+                    )
+                )
+                latest = (
+                    self.filter(bank_account=account)
+                    .order_by("-month")
+                    .values_list("month", "balance")
+                    .first()
+                )
+                rollups = MonthlyRollup.objects.filter(
+                    bank_account=account, month__lt=current
+                )
+                if latest is not None:
+                    rollups = rollups.filter(month__gte=latest[0])
+                totals = dict(
+                    rollups.order_by().values_list("month").annotate(Sum("amount"))
+                )
+                if latest is None and not totals:
+                    continue
+                month, balance = latest or (min(totals), Decimal(0))
+
+                snapshots = []
+                while month < current:
+                    balance += to_cents(totals.get(month))
+                    month = next_month(month)
+                    snapshots.append(
+                        self.model(bank_account=account, month=month, balance=balance)
+                    )
+                self.bulk_create(snapshots, ignore_conflicts=True)
+                added += len(snapshots)
+        return added
+
+
+class BalanceSnapshot(models.Model):
+    """
+    The balance of a bank account before the start of ``month`` in the
+    default timezone, a checkpoint for balances as of a date.
+
+    Added by BalanceSnapshotManager.refresh, after imports and by
+    ``manage.py snapshot_balances``; writes dated before ``month`` delete
+    the snapshot again, see RollupChanges.save.
+    """
+
+    bank_account = models.ForeignKey(
+        BankAccount, on_delete=models.CASCADE, related_name="balance_snapshots"
+    )
+    month = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BalanceSnapshotManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bank_account", "month"], name="unique_balance_snapshot"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.bank_account} - {self.month:%Y-%m} - {self.balance}"
+
+
+class ImportJob(models.Model):
+    """A CSV import queued for the background worker pool."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="import_jobs"
+    )
+    # Empty for ZIP archives whose files are mapped to accounts individually
+    bank_account = models.ForeignKey(
+        BankAccount,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+    file = models.FileField(upload_to="imports/", blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    batch_size = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.user} - {self.original_name} ({self.status})"
+
+    def is_archive(self):
+        return self.file.name.lower().endswith(".zip")
+
+    def get_elapsed_seconds(self):
+        """Seconds spent running so far, or in total once finished."""
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or timezone.now()
+        return max((end - self.started_at).total_seconds(), 0.0)
+
+    def get_rows_per_second(self):
+        elapsed = self.get_elapsed_seconds()
+        if elapsed <= 0:
+            return 0.0
+        return self.rows_processed / elapsed
+
+
 class UserProvidedSymbol(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="provided_symbols"
@@ -178,7 +920,80 @@ class UserProvidedSymbol(models.Model):
         return f"{self.user} provided {self.symbol} for {self.isin}"
 
 
-class Budget(models.Model):
+class CategorizationRule(models.Model):
+    """
+    Assigns a subtype to transactions whose note matches ``pattern``.
+
+    Notes are matched case-insensitively. A user's rules are tried in order
+    of ``priority``, lowest first, then by age; the first match wins.
+    """
+
+    MATCH_TYPE_CHOICES = [
+        ("substring", "Contains"),
+        ("prefix", "Starts with"),
+        ("regex", "Regular expression"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="categorization_rules"
+    )
+    match_type = models.CharField(
+        max_length=10, choices=MATCH_TYPE_CHOICES, default="substring"
+    )
+    pattern = models.CharField(max_length=200)
+    transaction_subtype = models.ForeignKey(
+        TransactionSubType,
+        on_delete=models.CASCADE,
+        related_name="categorization_rules",
+    )
+    priority = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "priority", "id"], name="rule_user_priority_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.get_match_type_display()} '{self.pattern}'"
+            f" -> {self.transaction_subtype}"
+        )
+
+    def get_expression(self):
+        """
+        Return a regular expression source that re.search finds in matching
+        notes; prefix rules are anchored at the start of the note. See
+        categorization.RuleMatcher.
+        """
+        if self.match_type == "prefix":
+            return r"\A" + re.escape(self.pattern)
+        if self.match_type == "substring":
+            return re.escape(self.pattern)
+        return f"(?:{self.pattern})"
+
+    def clean(self):
+        if self.match_type != "regex":
+            return
+        # Rules are combined into one expression, where group numbers and
+        # names of a single rule would refer to the wrong groups.
+        if BACKREFERENCE.search(self.pattern):
+            raise ValidationError(
+                {"pattern": "Backreferences are not supported in rules."}
+            )
+        try:
+            compiled = re.compile(self.get_expression())
+        except re.error as error:
+            raise ValidationError({"pattern": f"Invalid regular expression: {error}"})
+        if compiled.groupindex:
+            raise ValidationError(
+                {"pattern": "Named groups are not supported in rules."}
+            )
+
+
+class Budget(DataVersionMixin, models.Model):
     PERIOD_CHOICES = [
         ("daily", "Daily"),
         ("weekly", "Weekly"),
@@ -250,28 +1065,21 @@ class Budget(models.Model):
         period_start = self.get_current_period_start()
         period_end = self.get_current_period_end()
 
-        # Get transactions for this budget in the current period
-        transactions = Transaction.objects.filter(
-            user=self.user, created_at__gte=period_start, created_at__lt=period_end
-        )
+        # Only expenses count, not income
+        filters = {"transaction_subtype__transaction_type__expense_factor": -1}
 
         # Filter by transaction types and subtypes if specified
         if self.transaction_types.exists():
-            transactions = transactions.filter(
-                transaction_subtype__transaction_type__in=self.transaction_types.all()
+            filters["transaction_subtype__transaction_type__in"] = (
+                self.transaction_types.all()
             )
 
         if self.transaction_subtypes.exists():
-            transactions = transactions.filter(
-                transaction_subtype__in=self.transaction_subtypes.all()
-            )
+            filters["transaction_subtype__in"] = self.transaction_subtypes.all()
 
-        # Calculate total spent (only expenses, not income)
-        total_spent = (
-            transactions.filter(
-                transaction_subtype__transaction_type__expense_factor=-1
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0
+        # Whole months come from the monthly rollups
+        total_spent = MonthlyRollup.objects.sum_amount(
+            self.user, period_start, period_end, **filters
         )
 
         return abs(total_spent)  # Return positive value for spent amount
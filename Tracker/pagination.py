@@ -0,0 +1,140 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the unique key ``(created_at, id)``.
+
+    A page is fetched with ``created_at >= c AND (created_at > c OR id > i)``
+    ordered by the key and limited to the page size, so the database seeks
+    to the cursor in the ``(user, created_at, id)`` index instead of
+    skipping rows with OFFSET. Fetching page 1000 costs the same as page 1,
+    and rows sharing a timestamp are neither repeated nor skipped.
+
+    The cursor holds the key of the last row of the page (or the first one
+    for ``previous`` links). ``?all=true`` turns pagination off for clients
+    that want the full list.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    all_query_param = "all"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.all_query_param, "").lower() in (
+            "1",
+            "true",
+        ):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        reverse, position = cursor or (False, None)
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                    created_at__lte=created_at,
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+                    created_at__gte=created_at,
+                )
+
+        ordering = ("-created_at", "-id") if reverse else ("created_at", "id")
+        rows = list(queryset.order_by(*ordering)[: page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+
+        if reverse:
+            page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        if not page:
+            # Past either end of the list: only offer the way to the start
+            self.has_previous, self.has_next = position is not None, False
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            direction, created_at, pk = (
+                base64.urlsafe_b64decode(encoded.encode("ascii")).decode().split("|")
+            )
+            if direction not in ("n", "p"):
+                raise ValueError(direction)
+            return direction == "p", (datetime.fromisoformat(created_at), int(pk))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, obj):
+        # Pages hold model instances or ``.values_list()`` rows that
+        # start with the key, see TransactionListWriter
+        if isinstance(obj, tuple):
+            created_at, pk = obj[:2]
+        else:
+            created_at, pk = obj.created_at, obj.pk
+        raw = f"{'p' if reverse else 'n'}|{created_at.isoformat()}|{pk}"
+        encoded = base64.urlsafe_b64encode(raw.encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,170 @@
+"""
+Plain CSV parsing helpers for the importer.
+
+Nothing in here touches the database or Django settings, so the functions can
+run in worker processes that never set up Django.
+"""
+
+import csv
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+ParsedRow = namedtuple(
+    "ParsedRow",
+    ["created_at", "amount", "note", "isin", "quantity", "fee", "tax", "fingerprint"],
+    defaults=[""],
+)
+
+
+def safe_float(value):
+    try:
+        return float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def make_aware(value, tzinfo):
+    """Attach ``tzinfo`` to a naive datetime, like django.utils.timezone.make_aware."""
+    if value.utcoffset() is not None:
+        raise ValueError("make_aware expects a naive datetime, got %s" % value)
+    return value.replace(tzinfo=tzinfo)
+
+
+def parse_row(row, tzinfo):
+    """Parse a Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax row."""
+    datetime_from_iso = datetime.fromisoformat(row[0])
+    return ParsedRow(
+        created_at=make_aware(datetime_from_iso, tzinfo),
+        amount=float(row[2]) if row[2] else float(0.0),
+        note=row[3] if len(row) > 3 and row[3] else "",
+        isin=row[4] if len(row) > 4 and row[4] else "",
+        quantity=safe_float(row[5] if len(row) > 5 else None),
+        fee=safe_float(row[6] if len(row) > 6 else None),
+        tax=safe_float(row[7] if len(row) > 7 else None),
+    )
+
+
+def compute_fingerprint(bank_account_id, parsed, occurrence=0):
+    """
+    Hash the content of a parsed row together with its account.
+
+    ``occurrence`` tells apart identical rows within one export (e.g. two equal
+    card payments on the same day), so they are not collapsed into one.
+    """
+    content = "|".join(
+        [
+            parsed.created_at.isoformat(),
+            f"{parsed.amount:.2f}",
+            parsed.note,
+            parsed.isin,
+            f"{parsed.quantity:.2f}",
+            str(bank_account_id),
+            str(occurrence),
+        ]
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class Fingerprinter:
+    """
+    Assigns fingerprints to the parsed rows of one file.
+
+    Identical rows get increasing occurrence numbers, counted over the whole
+    file since exports are not always ordered by date. Every row is
+    remembered by the first 8 bytes of its fingerprint: recent ones in a set
+    that is merged into a sorted array now and then, so the counters take
+    about 8 bytes per row. Two different rows sharing those bytes only get
+    different occurrence numbers, their fingerprints stay apart.
+    """
+
+    MERGE_SIZE = 4096
+
+    def __init__(self, bank_account_id):
+        self.bank_account_id = bank_account_id
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._recent = set()
+        # Keys seen more than once -> how often
+        self._repeated = {}
+
+    def count(self, key):
+        """Return how often ``key`` was counted before, and count it."""
+        occurrence = self._repeated.get(key, 0)
+        if not occurrence and (key in self._recent or self._was_merged(key)):
+            occurrence = 1
+        if occurrence:
+            self._repeated[key] = occurrence + 1
+        else:
+            self._recent.add(key)
+            if len(self._recent) >= self.MERGE_SIZE:
+                self._merge_recent()
+        return occurrence
+
+    def _was_merged(self, key):
+        key = np.uint64(key)
+        position = np.searchsorted(self._seen, key)
+        return position < len(self._seen) and self._seen[position] == key
+
+    def _merge_recent(self):
+        recent = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+        recent.sort()
+        self._seen = np.insert(self._seen, np.searchsorted(self._seen, recent), recent)
+        self._recent = set()
+
+    def fingerprint(self, parsed):
+        key = compute_fingerprint(self.bank_account_id, parsed)
+        occurrence = self.count(int(key[:16], 16))
+        if occurrence == 0:
+            return key
+        return compute_fingerprint(self.bank_account_id, parsed, occurrence)
+
+    def assign(self, parsed):
+        return parsed._replace(fingerprint=self.fingerprint(parsed))
+
+
+def iter_parsed_rows(rows, bank_account_id, tzinfo):
+    """Parse CSV rows (header excluded) and fingerprint them, skipping empty lines."""
+    fingerprinter = Fingerprinter(bank_account_id)
+    for row in rows:
+        if not row:  # skip empty lines
+            continue
+        yield fingerprinter.assign(parse_row(row, tzinfo))
+
+
+def iter_csv_rows(text_stream, delimiter=";"):
+    """Yield the rows of a CSV text stream after its header row."""
+    reader = csv.reader(text_stream, delimiter=delimiter)
+
+    # Skip header row manually
+    next(reader, None)
+
+    yield from reader
+
+
+def iter_line_segments(binary_stream, lines_per_segment, stop_offset=None):
+    """
+    Cut a binary CSV stream into segments of whole lines, from its position on.
+
+    Yields ``(start_offset, end_offset, data)``, where the offsets are byte
+    positions in the stream, so a reader can later resume at ``end_offset``.
+    ``stop_offset``, a line boundary, ends the segments early. Quoted fields
+    must not contain line breaks.
+    """
+    offset = binary_stream.tell()
+    while True:
+        lines = []
+        end_offset = offset
+        for _ in range(lines_per_segment):
+            if stop_offset is not None and end_offset >= stop_offset:
+                break
+            line = binary_stream.readline()
+            if not line:
+                break
+            lines.append(line)
+            end_offset += len(line)
+        if not lines:
+            return
+        yield offset, end_offset, b"".join(lines)
+        offset = end_offset
@@ -0,0 +1,282 @@
+"""
+Dry run of a CSV import.
+
+The preview works on whole columns with pandas/NumPy instead of row by row,
+but produces the same fingerprints and subtypes as TransactionImporter, so
+its numbers match what a real import of the file would do.
+"""
+
+import hashlib
+import io
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from .bank_formats import get_decoder, to_pydatetimes
+from .importers import SubtypeClassifier, open_csv_stream
+from .models import Transaction, TransactionSubType
+
+
+def read_columns(text_stream, decoder, tzinfo, delimiter=None):
+    """Decode a whole export into the column arrays of ColumnarDecoder."""
+    header = decoder.read_header(text_stream, delimiter)
+    frames = list(decoder.read_frames(text_stream, header, delimiter=delimiter))
+    if not frames:
+        return None
+    frame = pd.concat(frames, ignore_index=True)
+    return decoder.decode_columns(frame, header, tzinfo)
+
+
+def fingerprint_columns(columns, bank_account_id, rows):
+    """
+    Compute the fingerprints of the ``rows`` mask, see parsers.compute_fingerprint.
+
+    Occurrence numbers are counted over all rows, but only the selected rows
+    are hashed.
+    """
+    created_at = to_pydatetimes(columns["created_at"][rows])
+    iso_dates = np.array([value.isoformat() for value in created_at], dtype=object)
+
+    # Plain object arrays: NumPy applies str + elementwise without pandas'
+    # string dtype machinery, which is several times slower here.
+    content = (
+        iso_dates
+        + "|"
+        + format_decimals(columns["amount"][rows])
+        + "|"
+        + columns["note"][rows]
+        + "|"
+        + columns["isin"][rows]
+        + "|"
+        + format_decimals(columns["quantity"][rows])
+        + "|"
+        + str(bank_account_id)
+    )
+
+    # Identical rows are numbered over the whole file, like Fingerprinter.
+    # Identical content means an identical timestamp, so rows left out of the
+    # mask never share a number with selected ones.
+    content_codes = pd.factorize(content)[0]
+    occurrences = pd.Series(content_codes).groupby(content_codes).cumcount()
+    return [
+        hashlib.sha256(f"{value}|{occurrence}".encode("utf-8")).hexdigest()
+        for value, occurrence in zip(content, occurrences.to_numpy())
+    ]
+
+
+def format_decimals(values):
+    """Format floats like f"{value:.2f}" into an object array."""
+    return np.array(["%.2f" % value for value in values], dtype=object)
+
+
+class ImportPreview:
+    """
+    Summarises what importing one or more files would do, without writing.
+
+    Files are classified one after the other against the same maps, so the
+    subtypes learned from an earlier file apply to later ones just like in
+    ArchiveImporter.
+    """
+
+    def __init__(self, user, classifier=None):
+        self.user = user
+        self.classifier = classifier or SubtypeClassifier(user)
+        self.rows_processed = 0
+        self.duplicates = 0
+        # subtype id -> [row count, total amount] of the rows to be created
+        self.subtype_totals = {}
+        self.started = time.perf_counter()
+
+    def add_csv(self, csv_file, bank_account, delimiter=None, encoding=None):
+        """Preview an uploaded CSV export for ``bank_account``."""
+        decoder = get_decoder(bank_account.account_type)
+        with open_csv_stream(csv_file, encoding or decoder.encoding) as text_stream:
+            self.add_columns(
+                read_columns(
+                    text_stream,
+                    decoder,
+                    timezone.get_current_timezone(),
+                    delimiter,
+                ),
+                bank_account,
+            )
+
+    def add_archive(self, archive_file, plan):
+        """Preview the members of a ZIP archive as mapped by plan_archive_import."""
+        with zipfile.ZipFile(archive_file) as archive:
+            for member, bank_account in plan:
+                decoder = get_decoder(bank_account.account_type)
+                with archive.open(member) as binary_stream:
+                    text_stream = io.TextIOWrapper(
+                        binary_stream, encoding=decoder.encoding, newline=""
+                    )
+                    columns = read_columns(
+                        text_stream, decoder, timezone.get_current_timezone()
+                    )
+                self.add_columns(columns, bank_account)
+
+    def add_columns(self, columns, bank_account):
+        if columns is None:
+            return
+        amounts = columns["amount"]
+        subtype_ids = self.classify_columns(amounts, columns["note"], columns["isin"])
+
+        # A row can only be a duplicate of a transaction with the same
+        # timestamp, so only those rows need a fingerprint at all.
+        created_at = pd.to_datetime(columns["created_at"], utc=True)
+        existing = (
+            Transaction.objects.filter(
+                user=self.user,
+                bank_account=bank_account,
+                created_at__gte=created_at.min().to_pydatetime(),
+                created_at__lte=created_at.max().to_pydatetime(),
+            )
+            .exclude(fingerprint="")
+            .values_list("created_at", "fingerprint")
+        )
+        existing_times = [created for created, _ in existing]
+        existing_fingerprints = {fingerprint for _, fingerprint in existing}
+        candidates = created_at.isin(
+            pd.to_datetime(existing_times, utc=True)
+        ).to_numpy()
+
+        is_new = np.ones(len(amounts), dtype=bool)
+        if candidates.any():
+            fingerprints = fingerprint_columns(columns, bank_account.id, candidates)
+            is_new[candidates] = ~pd.Series(fingerprints).isin(
+                existing_fingerprints
+            ).to_numpy()
+
+        self.rows_processed += len(amounts)
+        self.duplicates += int((~is_new).sum())
+        totals = (
+            pd.DataFrame(
+                {"subtype_id": subtype_ids[is_new], "amount": amounts[is_new]}
+            )
+            .groupby("subtype_id")["amount"]
+            .agg(["count", "sum"])
+        )
+        for subtype_id, row in totals.iterrows():
+            entry = self.subtype_totals.setdefault(int(subtype_id), [0, 0.0])
+            entry[0] += int(row["count"])
+            entry[1] += float(row["sum"])
+
+    def classify_columns(self, amounts, notes, isins):
+        """
+        Vectorized SubtypeClassifier.classify over the rows of one file.
+
+        A row reuses the subtype stored for its ``(isin, sign)`` or note, and
+        otherwise gets the default for its kind; matching rules win over the
+        stored note. Within the file the first row of an ISIN or note decides
+        the subtype of the later ones.
+        """
+        classifier = self.classifier
+        count = len(amounts)
+        positions = np.arange(count)
+        has_isin = isins != ""
+        has_note = notes != ""
+
+        subtype_ids = np.zeros(count, dtype=np.int64)
+        for is_stock in (False, True):
+            for negative in (False, True):
+                rows = (has_isin == is_stock) & ((amounts < 0) == negative)
+                if rows.any():
+                    subtype_ids[rows] = classifier.get_transaction_subtype_id(
+                        is_stock, -1 if negative else 1
+                    )
+
+        # ISIN rows: the stored subtype for (isin, sign) wins over the default
+        isin_keys = pd.Series(isins + np.where(amounts > 0, "|+", "|-"))
+        stored = isin_keys.map(
+            {
+                f"{isin}|{'+' if sign > 0 else '-'}": subtype_id
+                for (isin, sign), subtype_id in classifier.isin_subtype_ids.items()
+            }
+        ).to_numpy()
+        found = has_isin & ~pd.isna(stored)
+        subtype_ids[found] = stored[found].astype(np.int64)
+
+        # Zero amounts are looked up as outflows but never remembered, so they
+        # take the subtype of an earlier non-zero outflow of the same ISIN.
+        remembered_isin = has_isin & (amounts != 0)
+        first_isin_rows = (
+            pd.Series(positions[remembered_isin], index=isin_keys[remembered_isin])
+            .groupby(level=0)
+            .min()
+        )
+        zero_rows = has_isin & (amounts == 0) & ~found
+        first = isin_keys[zero_rows].map(first_isin_rows).to_numpy()
+        earlier = ~pd.isna(first)
+        earlier[earlier] = first[earlier] < positions[zero_rows][earlier]
+        zero_positions = positions[zero_rows][earlier]
+        subtype_ids[zero_positions] = subtype_ids[first[earlier].astype(np.int64)]
+
+        # Note rows without an ISIN: stored note, else the first row of the
+        # file with the same note (any row remembers its note).
+        note_rows = has_note & ~has_isin
+        note_series = pd.Series(notes)
+        stored = note_series[note_rows].map(classifier.note_subtype_ids).to_numpy()
+        found = ~pd.isna(stored)
+        note_positions = positions[note_rows]
+        subtype_ids[note_positions[found]] = stored[found].astype(np.int64)
+
+        first_note_rows = (
+            pd.Series(positions[has_note], index=notes[has_note])
+            .groupby(level=0)
+            .min()
+        )
+        missing = note_positions[~found]
+        first = note_series[missing].map(first_note_rows).to_numpy(dtype=np.int64)
+        subtype_ids[missing] = subtype_ids[first]
+
+        # Rules win over stored notes; each distinct note is matched once
+        if classifier.rules:
+            rule_subtype_ids = {
+                note: classifier.rules.match(note)
+                for note in pd.unique(notes[note_rows])
+            }
+            stored = note_series[note_rows].map(rule_subtype_ids).to_numpy()
+            found = ~pd.isna(stored)
+            subtype_ids[note_positions[found]] = stored[found].astype(np.int64)
+
+        # Later files see this one as if it had been imported already
+        for position in first_isin_rows.to_numpy():
+            classifier.remember(
+                isins[position], amounts[position], "", int(subtype_ids[position])
+            )
+        for note, position in first_note_rows.items():
+            classifier.remember("", 0, note, int(subtype_ids[position]))
+        return subtype_ids
+
+    def as_dict(self):
+        names = dict(
+            TransactionSubType.objects.filter(pk__in=self.subtype_totals).values_list(
+                "id", "name"
+            )
+        )
+        subtypes = [
+            {
+                "id": subtype_id,
+                "name": names.get(subtype_id, ""),
+                "count": count,
+                "total_amount": round(total, 2),
+            }
+            for subtype_id, (count, total) in sorted(self.subtype_totals.items())
+        ]
+        would_create = sum(entry["count"] for entry in subtypes)
+        return {
+            "preview": True,
+            "rows_processed": self.rows_processed,
+            "would_create": would_create,
+            "duplicates": self.duplicates,
+            "not_assigned": sum(
+                entry["count"]
+                for entry in subtypes
+                if entry["name"] == SubtypeClassifier.FALLBACK_SUBTYPE_NAME
+            ),
+            "subtypes": subtypes,
+            "elapsed_seconds": round(time.perf_counter() - self.started, 4),
+        }
@@ -0,0 +1,93 @@
+"""
+JSON encoding for API responses.
+
+``dumps`` uses orjson when it is installed and falls back to the standard
+library otherwise, so orjson stays an optional speed-up. Both produce the
+same compact JSON for the data the views return; types orjson does not know,
+like Decimal and datetime, are handed to the same encoder class the
+standard library path uses. Unlike ``json``, orjson writes NaN and
+infinities as null, which is also the only form JSON.parse accepts.
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+if orjson:
+    # Datetimes go through the encoder class, which formats them like DRF and
+    # Django do; orjson's own format differs in the UTC suffix and precision.
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+# U+2028 and U+2029 are valid in JSON but not in JavaScript source
+LINE_SEPARATORS = {b"\xe2\x80\xa8": b"\\u2028", b"\xe2\x80\xa9": b"\\u2029"}
+
+
+def dumps(data, encoder=DjangoJSONEncoder):
+    """Encode ``data`` as compact UTF-8 JSON bytes."""
+    if orjson:
+        try:
+            return orjson.dumps(data, default=encoder().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and other values only json can write
+            pass
+    return json.dumps(
+        data, cls=encoder, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    DRF's JSONRenderer, encoding with ``dumps``.
+
+    Indented output, as requested by the browsable API or an ``indent``
+    media type parameter, and the non-default UNICODE_JSON and COMPACT_JSON
+    settings are left to the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        content = dumps(data, self.encoder_class)
+        if b"\xe2\x80" in content:
+            for separator, escaped in LINE_SEPARATORS.items():
+                content = content.replace(separator, escaped)
+        return content
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in for django.http.JsonResponse that encodes with ``dumps``.
+
+    ``json_dumps_params`` need the standard library and disable orjson.
+    """
+
+    def __init__(
+        self,
+        data,
+        encoder=DjangoJSONEncoder,
+        safe=True,
+        json_dumps_params=None,
+        **kwargs,
+    ):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        if json_dumps_params:
+            content = json.dumps(data, cls=encoder, **json_dumps_params)
+        else:
+            content = dumps(data, encoder)
+        super().__init__(content=content, **kwargs)
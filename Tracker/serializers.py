@@ -1,18 +1,85 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
 from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.utils import timezone
 from Tracker import models
 from rest_framework import serializers
 
+from .renderers import dumps
+
 # serializers.py
 
 
 class CSVUploadSerializer(serializers.Serializer):
-    file = serializers.FileField()
+    file = serializers.FileField(required=False)
+    files = serializers.ListField(child=serializers.FileField(), required=False)
     bank_account = serializers.PrimaryKeyRelatedField(
-        queryset=models.BankAccount.objects.all(), required=True
+        queryset=models.BankAccount.objects.all(), required=False
+    )
+    batch_size = serializers.IntegerField(
+        required=False, min_value=1, max_value=10000
+    )
+    preview = serializers.BooleanField(required=False, default=False)
+
+    class Meta:
+        fields = ["file", "files", "bank_account", "batch_size", "preview"]
+
+    def validate(self, attrs):
+        uploads = list(attrs.get("files", []))
+        if attrs.get("file"):
+            uploads.insert(0, attrs["file"])
+        if not uploads:
+            raise serializers.ValidationError({"file": "No file was submitted."})
+
+        # A single CSV needs an account, ZIPs and several files can map
+        # their members through a manifest or the file names instead.
+        is_archive = len(uploads) > 1 or uploads[0].name.lower().endswith(".zip")
+        if not is_archive and not attrs.get("bank_account"):
+            raise serializers.ValidationError(
+                {"bank_account": "This field is required."}
+            )
+
+        attrs["uploads"] = uploads
+        attrs["is_archive"] = is_archive
+        return attrs
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    bank_account_name = serializers.CharField(
+        source="bank_account.name", read_only=True
     )
+    elapsed_seconds = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
 
     class Meta:
-        fields = ["file", "bank_account"]
+        model = models.ImportJob
+        fields = [
+            "id",
+            "bank_account",
+            "bank_account_name",
+            "original_name",
+            "status",
+            "rows_processed",
+            "created_count",
+            "skipped_count",
+            "elapsed_seconds",
+            "rows_per_second",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_elapsed_seconds(self, obj):
+        return round(obj.get_elapsed_seconds(), 4)
+
+    def get_rows_per_second(self, obj):
+        return round(obj.get_rows_per_second(), 1)
 
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
@@ -98,6 +165,221 @@ class TransactionSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from a dict in ``context[context_key]`` instead of running a
+    query per value, for serializers validating many items at once.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.context[self.context_key][int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class TransactionBatchSerializer(TransactionSerializer):
+    """
+    TransactionSerializer for batch operations, see services.TransactionBatch.
+
+    Subtypes and accounts are looked up in ``context["subtypes"]`` and
+    ``context["bank_accounts"]``, which only hold the user's accounts.
+    """
+
+    transaction_subtype = PreloadedPrimaryKeyRelatedField(
+        "subtypes", queryset=models.TransactionSubType.objects.all()
+    )
+    bank_account = PreloadedPrimaryKeyRelatedField(
+        "bank_accounts",
+        queryset=models.BankAccount.objects.all(),
+        allow_null=True,
+        required=True,
+    )
+
+
+class TransactionListWriter:
+    """
+    Renders transaction lists from ``.values()`` rows straight to JSON bytes.
+
+    The output matches TransactionSerializer field for field, but skips
+    DRF's per-field machinery: every field is a dict lookup plus, for
+    dates and decimals, one conversion. Account names come from a map
+    built once per response instead of a join or a query per row.
+
+    ``fields`` is the comma-separated sparse fieldset of ``?fields=``.
+    """
+
+    FIELDS = TransactionSerializer.Meta.fields
+    COLUMNS = {
+        "transaction_subtype": "transaction_subtype_id",
+        "bank_account": "bank_account_id",
+        "bank_account_name": "bank_account_id",
+    }
+    DECIMAL_FIELDS = ["amount", "quantity", "fee", "tax"]
+    # Rows start with the pagination key, rendered or not
+    KEY_COLUMNS = ["created_at", "id"]
+
+    def __init__(self, fields=None):
+        requested = [name.strip() for name in (fields or "").split(",")]
+        requested = [name for name in requested if name]
+        unknown = [name for name in requested if name not in self.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        self.fields = requested or list(self.FIELDS)
+
+    @property
+    def columns(self):
+        """The model columns to pass to ``.values_list()``, in row order."""
+        columns = list(self.KEY_COLUMNS)
+        for name in self.fields:
+            column = self.COLUMNS.get(name, name)
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+    def get_converters(self):
+        """
+        Formatters matching DRF's DateTimeField and DecimalField output.
+
+        They accept converted values as well as the raw ones of
+        ``fetch_raw``, which are naive UTC datetimes or text and floats or
+        ints for decimals on SQLite.
+        """
+        tzinfo = timezone.get_current_timezone()
+        utc_output = str(tzinfo) == "UTC"
+        quantum = Decimal(1).scaleb(-2)
+
+        def format_datetime(value):
+            if not value:
+                return None
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            if value.tzinfo is None:
+                if utc_output:
+                    return value.isoformat() + "Z"
+                value = value.replace(tzinfo=dt_timezone.utc)
+            value = value.astimezone(tzinfo).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        def format_decimal(value):
+            if value is None:
+                return None
+            if not isinstance(value, Decimal):
+                return f"{value:.2f}"
+            if value.as_tuple().exponent != -2:
+                value = value.quantize(quantum)
+            return f"{value:f}"
+
+        converters = {"created_at": format_datetime}
+        for name in self.DECIMAL_FIELDS:
+            converters[name] = format_decimal
+        return converters
+
+    @staticmethod
+    def fetch_raw(queryset, chunk_size=2000):
+        """
+        Yield the rows of a ``.values_list()`` queryset as the database
+        returns them.
+
+        This skips Django's per-value converters, which cost more than the
+        rendering itself on long lists.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+
+    def to_representation(self, rows, account_names):
+        """
+        Turn ``.values_list(*columns)`` or ``fetch_raw`` rows into dicts.
+
+        ``account_names`` maps account ids to names; accounts missing from
+        it are looked up with one extra query.
+        """
+        rows = list(rows)
+        columns = self.columns
+        if "bank_account_name" in self.fields:
+            index = columns.index("bank_account_id")
+            missing = {row[index] for row in rows} - set(account_names)
+            missing.discard(None)
+            if missing:
+                account_names = {
+                    **account_names,
+                    **dict(
+                        models.BankAccount.objects.filter(id__in=missing).values_list(
+                            "id", "name"
+                        )
+                    ),
+                }
+
+        converters = self.get_converters()
+        plan = []
+        for name in self.fields:
+            column = self.COLUMNS.get(name, name)
+            if name == "bank_account_name":
+                convert = account_names.get
+            else:
+                convert = converters.get(name)
+            plan.append((name, columns.index(column), convert))
+
+        return [
+            {
+                name: convert(row[index]) if convert else row[index]
+                for name, index, convert in plan
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def render(data):
+        """Encode response data as compact JSON bytes."""
+        return dumps(data)
+
+
+class CategorizationRuleSerializer(serializers.ModelSerializer):
+    transaction_subtype_name = serializers.CharField(
+        source="transaction_subtype.name", read_only=True
+    )
+
+    class Meta:
+        model = models.CategorizationRule
+        fields = [
+            "id",
+            "match_type",
+            "pattern",
+            "transaction_subtype",
+            "transaction_subtype_name",
+            "priority",
+            "created_at",
+        ]
+
+    def validate(self, attrs):
+        """Check that the pattern compiles, see CategorizationRule.clean."""
+        rule = models.CategorizationRule(
+            match_type=attrs.get(
+                "match_type", getattr(self.instance, "match_type", "substring")
+            ),
+            pattern=attrs.get("pattern", getattr(self.instance, "pattern", "")),
+        )
+        try:
+            rule.clean()
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.message_dict)
+        return attrs
+
+
 class BudgetSerializer(serializers.ModelSerializer):
     transaction_types = serializers.PrimaryKeyRelatedField(
         queryset=models.TransactionType.objects.all(), many=True, required=False
@@ -130,6 +412,17 @@ class BudgetSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def create(self, validated_data):
+        budget = super().create(validated_data)
+        # Types and subtypes are set after Budget.save bumped the data version
+        models.SyncVersion.objects.touch(budget.user_id)
+        return budget
+
+    def update(self, instance, validated_data):
+        budget = super().update(instance, validated_data)
+        models.SyncVersion.objects.touch(budget.user_id)
+        return budget
+
     def get_spent_amount(self, obj):
         return float(obj.get_spent_amount())
 
@@ -1,5 +1,12 @@
 from django.db import transaction
-from .models import JournalEntry, Transaction, TransactionType, TransactionSubType
+from .models import (
+    BankAccount,
+    JournalEntry,
+    Transaction,
+    TransactionType,
+    TransactionSubType,
+)
+from .serializers import TransactionBatchSerializer, TransactionSerializer
 
 
 class LedgerService:
@@ -93,3 +100,165 @@ class LedgerService:
         )
 
         return journal
+
+
+class TransactionBatch:
+    """
+    Creates, updates and deletes many transactions of one user at once.
+
+    ``operations`` is a list of ``{"op": "create", "data": {...}}``,
+    ``{"op": "update", "id": ..., "data": {...}}`` (a partial update) and
+    ``{"op": "delete", "id": ...}``. The referenced subtypes, accounts and
+    transactions are loaded with one query each, and all writes happen in
+    one atomic block through bulk_create, bulk_update and a single delete.
+
+    Use it like a serializer: ``is_valid()``, then ``save()``. ``results``
+    has one entry per operation, in request order. If any operation is
+    invalid nothing is written; the others report status 424.
+    """
+
+    MAX_OPERATIONS = 1000
+    OPERATIONS = ("create", "update", "delete")
+
+    def __init__(self, user, operations):
+        self.user = user
+        self.operations = operations
+        self.error = None
+        self.results = []
+        self._validated = []
+
+    def is_valid(self):
+        if not isinstance(self.operations, list) or not self.operations:
+            self.error = "Expected a non-empty list of operations."
+            return False
+        if len(self.operations) > self.MAX_OPERATIONS:
+            self.error = f"At most {self.MAX_OPERATIONS} operations per batch."
+            return False
+
+        operations = [self.parse(operation) for operation in self.operations]
+        context = self.load_related(operations)
+        seen_ids = set()
+        self._validated = []
+        self.results = []
+        for op, pk, data, errors in operations:
+            instance = validated_data = None
+            status = 400
+            if not errors and op != "create":
+                instance = context["transactions"].get(pk)
+                if instance is None:
+                    errors, status = {"id": ["Not found."]}, 404
+                elif pk in seen_ids:
+                    errors = {"id": ["Only one operation per transaction."]}
+                seen_ids.add(pk)
+            if not errors and op != "delete":
+                serializer = TransactionBatchSerializer(
+                    instance, data=data, partial=op == "update", context=context
+                )
+                if serializer.is_valid():
+                    validated_data = serializer.validated_data
+                else:
+                    errors = serializer.errors
+            if (
+                not errors
+                and op != "delete"
+                and (op == "create" or "bank_account" in validated_data)
+                and not validated_data.get("bank_account")
+            ):
+                # Like Transaction.save, default to the user's first account
+                if not context["bank_accounts"]:
+                    errors = {"bank_account": ["User has no bank accounts defined."]}
+                else:
+                    validated_data["bank_account"] = context["bank_accounts"][
+                        min(context["bank_accounts"])
+                    ]
+
+            self._validated.append((op, instance, validated_data))
+            result = {"op": op}
+            if errors:
+                result.update(status=status, errors=errors)
+            self.results.append(result)
+
+        if any("errors" in result for result in self.results):
+            for result in self.results:
+                result.setdefault("status", 424)
+            return False
+        return True
+
+    def parse(self, operation):
+        """Return ``(op, id, data, errors)`` of a raw operation."""
+        if not isinstance(operation, dict):
+            return None, None, None, {"non_field_errors": ["Expected an object."]}
+        op = operation.get("op")
+        if op not in self.OPERATIONS:
+            choices = ", ".join(self.OPERATIONS)
+            return op, None, None, {"op": [f"Must be one of {choices}."]}
+
+        pk = operation.get("id")
+        if op != "create" and (not isinstance(pk, int) or isinstance(pk, bool)):
+            return op, None, None, {"id": ["A valid integer is required."]}
+        data = operation.get("data", {})
+        if op != "delete" and not isinstance(data, dict):
+            return op, pk, None, {"data": ["Expected an object."]}
+        return op, pk, data, None
+
+    def load_related(self, operations):
+        """Load everything the operations refer to, one query per model."""
+        subtype_ids = set()
+        transaction_ids = set()
+        for op, pk, data, errors in operations:
+            if errors:
+                continue
+            if pk is not None:
+                transaction_ids.add(pk)
+            value = (data or {}).get("transaction_subtype")
+            if isinstance(value, (int, str)) and str(value).isdigit():
+                subtype_ids.add(int(value))
+
+        return {
+            "subtypes": (
+                TransactionSubType.objects.in_bulk(subtype_ids) if subtype_ids else {}
+            ),
+            "bank_accounts": BankAccount.objects.filter(user=self.user).in_bulk(),
+            "transactions": (
+                Transaction.objects.filter(user=self.user)
+                .select_related("bank_account")
+                .in_bulk(transaction_ids)
+                if transaction_ids
+                else {}
+            ),
+        }
+
+    @transaction.atomic
+    def save(self):
+        """Write all operations and fill in the results."""
+        creates = []
+        updates = []
+        update_fields = set()
+        delete_ids = []
+        for op, instance, validated_data in self._validated:
+            if op == "create":
+                creates.append(Transaction(user=self.user, **validated_data))
+            elif op == "update":
+                for name, value in validated_data.items():
+                    setattr(instance, name, value)
+                updates.append(instance)
+                update_fields.update(validated_data)
+            else:
+                delete_ids.append(instance.pk)
+
+        Transaction.objects.bulk_create(creates)
+        if updates and update_fields:
+            Transaction.objects.bulk_update(updates, sorted(update_fields))
+        if delete_ids:
+            Transaction.objects.filter(user=self.user, id__in=delete_ids).delete()
+
+        created = iter(creates)
+        for result, (op, instance, _) in zip(self.results, self._validated):
+            if op == "create":
+                instance = next(created)
+                result.update(status=201, data=TransactionSerializer(instance).data)
+            elif op == "update":
+                result.update(status=200, data=TransactionSerializer(instance).data)
+            else:
+                result.update(status=204, id=instance.pk)
+        return self.results
@@ -1,9 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APITestCase
 from rest_framework import status
 from .models import Transaction, TransactionType, TransactionSubType, BankAccount
+from .tests_importers import TemporaryMediaMixin
 import io
 import json
 import csv
@@ -22,7 +23,8 @@ import os
 # from standalone_portfolio import Portfolio, TradeRepublicApi, get_portfolio_data
 
 
-class CSVUploadTestCase(APITestCase):
+@override_settings(IMPORT_JOBS_EAGER=True)
+class CSVUploadTestCase(TemporaryMediaMixin, APITestCase):
     def setUp(self):
         # Create test user
         self.user = User.objects.create_user(
@@ -159,8 +161,9 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn("Imported 2 rows", response.data["status"])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "completed")
+        self.assertEqual(response.data["created_count"], 2)
 
         # Check that transactions were created
         transactions = Transaction.objects.filter(user=self.user)
@@ -223,7 +226,7 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
         transactions = Transaction.objects.filter(user=self.user)
         self.assertEqual(transactions.count(), 2)
@@ -290,7 +293,7 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
         # Check that new transaction got the same subtype as existing one
         new_transaction = Transaction.objects.filter(
@@ -349,7 +352,7 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
         # Check that new transaction got the same subtype as existing one
         new_transaction = Transaction.objects.filter(
@@ -394,7 +397,7 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
         # Check that transaction got default subtype (Outflow for negative amount)
         new_transaction = Transaction.objects.filter(
@@ -450,8 +453,9 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn("Imported 2 rows", response.data["status"])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "completed")
+        self.assertEqual(response.data["created_count"], 2)
 
         transactions = Transaction.objects.filter(user=self.user)
         self.assertEqual(transactions.count(), 2)
@@ -480,7 +484,7 @@ class CSVUploadTestCase(APITestCase):
             {"file": csv_file, "bank_account": self.bank_account.id},
             format="multipart",
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
         transaction = Transaction.objects.filter(user=self.user).first()
         self.assertEqual(transaction.amount, -100.00)
@@ -0,0 +1,241 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, Transaction
+from .tests_importers import ImporterTestMixin
+
+URL = "/api/analytics/summary"
+
+
+class AnalyticsSummaryTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the aggregated dashboard summary"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        self.savings = BankAccount.objects.create(user=self.user, name="Savings")
+        for day, subtype, account, amount, fee, tax in [
+            ("2024-05-02", self.inflow_subtype, self.bank_account, "2500", None, None),
+            ("2024-05-03", self.outflow_subtype, self.bank_account, "-900", None, None),
+            ("2024-05-20", self.outflow_subtype, self.savings, "-45.50", None, None),
+            ("2024-06-01", self.buy_subtype, self.bank_account, "-1000", "1", None),
+            ("2024-06-15", self.sell_subtype, self.bank_account, "120", "1", "12.5"),
+        ]:
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=account,
+                transaction_subtype=subtype,
+                amount=Decimal(amount),
+                fee=fee and Decimal(fee),
+                tax=tax and Decimal(tax),
+                created_at=timezone.make_aware(datetime.fromisoformat(day)),
+            )
+        other = User.objects.create_user(username="other", password="x")
+        Transaction.objects.create(
+            user=other,
+            bank_account=BankAccount.objects.create(user=other, name="Other"),
+            transaction_subtype=self.inflow_subtype,
+            amount=Decimal("99"),
+        )
+
+    def test_summary(self):
+        """Totals, subtypes, types and months of the user's transactions"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(
+            [data[key] for key in ("count", "amount", "fees", "taxes")],
+            [5, "674.50", "2.00", "12.50"],
+        )
+        self.assertEqual(
+            [(s["name"], s["count"], s["amount"]) for s in data["subtypes"]],
+            [
+                ("Outflow", 2, "-945.50"),
+                ("Stock/ETF/Bond Purchase", 1, "-1000.00"),
+                ("Inflow", 1, "2500.00"),
+                ("Investment Returns", 1, "120.00"),
+            ],
+        )
+        self.assertEqual(data["subtypes"][0]["transaction_type"], "Expense")
+        self.assertEqual(
+            data["types"],
+            [
+                {
+                    "name": "Expense",
+                    "count": 3,
+                    "amount": "-1945.50",
+                    "fees": "1.00",
+                    "taxes": "0.00",
+                },
+                {
+                    "name": "Income",
+                    "count": 2,
+                    "amount": "2620.00",
+                    "fees": "1.00",
+                    "taxes": "12.50",
+                },
+            ],
+        )
+        self.assertEqual(
+            data["periods"],
+            [
+                {
+                    "period": "2024-05-01",
+                    "totals": {"Expense": "945.50", "Income": "2500.00"},
+                },
+                {
+                    "period": "2024-06-01",
+                    "totals": {"Expense": "1000.00", "Income": "120.00"},
+                },
+            ],
+        )
+        # Session, user, data version, subtypes and periods
+        self.assertEqual(len(captured), 5, captured.captured_queries)
+
+    def test_filters_and_periods(self):
+        """The transaction list filters apply, periods can be days or weeks"""
+        response = self.client.get(
+            URL,
+            {
+                "bank_account": self.bank_account.id,
+                "start_date": "2024-05-03",
+                "period": "week",
+            },
+        )
+
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(
+            [period["period"] for period in data["periods"]],
+            ["2024-04-29", "2024-05-27", "2024-06-10"],
+        )
+
+        response = self.client.get(URL, {"period": "day", "note": "nothing"})
+        self.assertEqual(response.json()["count"], 0)
+        self.assertEqual(response.json()["periods"], [])
+
+    def test_invalid_parameters(self):
+        """Unknown periods and malformed filters are rejected"""
+        for params in [{"period": "year"}, {"start_date": "soon"}]:
+            with self.subTest(params=params):
+                response = self.client.get(URL, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_not_modified(self):
+        """Summaries are revalidated like the lists"""
+        etag = self.client.get(URL)["ETag"]
+
+        response = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Transaction.objects.filter(user=self.user).update(note="Miete")
+        self.assertNotEqual(self.client.get(URL)["ETag"], etag)
+
+
+class CashflowTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the bucketed, cached cashflow series"""
+
+    url = "/api/analytics/cashflow"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.login(username="testuser", password="testpass123")
+        self.savings = BankAccount.objects.create(user=self.user, name="Savings")
+        for day, subtype, account, amount in [
+            ("2024-01-31", self.inflow_subtype, self.bank_account, "2500"),
+            ("2024-02-01", self.outflow_subtype, self.bank_account, "-900"),
+            ("2024-04-15", self.outflow_subtype, self.savings, "-45.50"),
+            ("2024-04-20", self.inflow_subtype, self.savings, "20"),
+        ]:
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=account,
+                transaction_subtype=subtype,
+                amount=Decimal(amount),
+                created_at=timezone.make_aware(datetime.fromisoformat(day)),
+            )
+
+    def test_gap_filled_columns(self):
+        """Empty months within the range are zeros, the arrays line up"""
+        response = self.client.get(
+            self.url, {"start_date": "2023-12-05", "end_date": "2024-05-31"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(
+            data["periods"],
+            [f"{month}-01" for month in ["2023-12", "2024-01", "2024-02"]]
+            + [f"2024-0{month}-01" for month in (3, 4, 5)],
+        )
+        self.assertEqual(
+            data["income"], ["0.00", "2500.00", "0.00", "0.00", "20.00", "0.00"]
+        )
+        self.assertEqual(
+            data["expense"], ["0.00", "0.00", "900.00", "0.00", "45.50", "0.00"]
+        )
+        self.assertEqual(data["net"][1:5], ["2500.00", "-900.00", "0.00", "-25.50"])
+        self.assertNotIn("series", data)
+
+    def test_granularities_and_splits(self):
+        """Periods follow the granularity, splits add a series per group"""
+        for granularity, periods in [
+            ("week", ["2024-01-29", "2024-02-05"]),
+            ("quarter", ["2024-01-01"]),
+            ("year", ["2024-01-01"]),
+        ]:
+            with self.subTest(granularity=granularity):
+                data = self.client.get(
+                    self.url, {"granularity": granularity, "end_date": "2024-02-06"}
+                ).json()
+                self.assertEqual(data["periods"], periods)
+                self.assertEqual(data["net"][0], "1600.00")
+
+        data = self.client.get(
+            self.url, {"granularity": "quarter", "split": "account"}
+        ).json()
+        self.assertEqual(
+            [series["name"] for series in data["series"]], ["Savings", "Test Account"]
+        )
+        self.assertEqual(data["series"][0]["net"], ["0.00", "-25.50"])
+        self.assertEqual(data["series"][1]["income"], ["2500.00", "0.00"])
+
+        data = self.client.get(self.url, {"split": "subtype", "isin": "X"}).json()
+        self.assertEqual(data["periods"], [])
+        self.assertEqual(data["series"], [])
+
+    def test_cached_until_transactions_change(self):
+        """Repeated requests skip the query, writes invalidate the entry"""
+        params = {"granularity": "year"}
+        first = self.client.get(self.url, params).json()
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(self.url, params).json(), first)
+        # Session, user, data version for the ETag and for the cache key
+        self.assertEqual(len(captured), 4, captured.captured_queries)
+
+        Transaction.objects.filter(amount=Decimal("20")).update(amount=Decimal("30"))
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data["income"], ["2530.00"])
+
+    def test_invalid_parameters(self):
+        """Unknown granularities and splits, and unreadable ranges"""
+        for params in [
+            {"granularity": "hour"},
+            {"split": "isin"},
+            {"granularity": "day", "start_date": "1990-01-01"},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
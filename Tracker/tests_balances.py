@@ -0,0 +1,228 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .importers import TransactionImporter
+from .models import BalanceSnapshot, BankAccount, Transaction, next_month
+from .tests_importers import ImporterTestMixin, make_csv
+
+
+def aware(value):
+    return timezone.make_aware(datetime.fromisoformat(value))
+
+
+class BalanceHistoryTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the running balance of an account"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        self.url = f"/api/bankaccounts/{self.bank_account.id}/balance-history/"
+        for created_at, amount in [
+            ("2023-12-31 12:00", "1000"),
+            ("2024-01-02 08:00", "-200.50"),
+            ("2024-01-02 20:00", "-0.50"),
+            ("2024-01-05 10:00", "50"),
+            ("2024-03-10 10:00", "-100"),
+        ]:
+            self.create(created_at, amount)
+        # Other accounts do not count
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=BankAccount.objects.create(user=self.user, name="Depot"),
+            transaction_subtype=self.inflow_subtype,
+            amount=Decimal("999"),
+            created_at=aware("2024-01-03 10:00"),
+        )
+
+    def create(self, created_at, amount):
+        return Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            transaction_subtype=self.outflow_subtype,
+            amount=Decimal(amount),
+            created_at=aware(created_at),
+        )
+
+    def test_daily_balances(self):
+        """Every day of the range, starting from the balance before it"""
+        response = self.client.get(
+            self.url, {"start_date": "2024-01-01", "end_date": "2024-01-06"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["interval"], "day")
+        self.assertEqual(data["dates"], [f"2024-01-0{day}" for day in range(1, 7)])
+        self.assertEqual(
+            data["balances"],
+            ["1000.00", "799.00", "799.00", "799.00", "849.00", "849.00"],
+        )
+
+    def test_downsampling(self):
+        """Coarser intervals keep the balance after their last day"""
+        data = self.client.get(
+            self.url, {"interval": "month", "end_date": "2024-03-15"}
+        ).json()
+        self.assertEqual(
+            data["dates"], ["2023-12-31", "2024-01-31", "2024-02-29", "2024-03-15"]
+        )
+        self.assertEqual(data["balances"], ["1000.00", "849.00", "849.00", "749.00"])
+
+        data = self.client.get(
+            self.url, {"start_date": "2020-01-01", "end_date": "2024-12-31"}
+        ).json()
+        self.assertEqual(data["interval"], "week")
+        self.assertEqual(data["dates"][:2], ["2020-01-05", "2020-01-12"])
+        self.assertEqual(data["balances"][0], "0.00")
+        self.assertEqual(data["balances"][-1], "749.00")
+
+    def test_query_count_is_independent_of_transactions(self):
+        """One query for the opening balance and one for the daily totals"""
+        params = {"start_date": "2024-01-01", "end_date": "2024-12-31"}
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(self.url, params)
+            return len(captured)
+
+        before = count_queries()
+        for day in range(1, 29):
+            self.create(f"2024-02-{day:02d} 09:00", "-1")
+        self.assertEqual(count_queries(), before)
+        # Session, user, account, snapshot, opening balance and daily totals
+        self.assertEqual(before, 6)
+
+    def test_invalid_requests(self):
+        """Unknown intervals, reversed ranges and other users' accounts"""
+        for params in [
+            {"interval": "hour"},
+            {"start_date": "2024-02-01", "end_date": "2024-01-01"},
+            {"start_date": "soon"},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user(username="other", password="x")
+        account = BankAccount.objects.create(user=other, name="Other")
+        response = self.client.get(f"/api/bankaccounts/{account.id}/balance-history/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BalanceSnapshotTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the monthly balance checkpoints"""
+
+    def setUp(self):
+        super().setUp()
+        for created_at, amount in [
+            ("2024-01-15 12:00", "1000"),
+            ("2024-02-01 00:00", "-200.50"),
+            ("2024-04-30 23:59", "-100"),
+        ]:
+            self.create(created_at, amount)
+
+    def create(self, created_at, amount):
+        return Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            transaction_subtype=self.outflow_subtype,
+            amount=Decimal(amount),
+            created_at=aware(created_at),
+        )
+
+    def snapshots(self):
+        return dict(
+            BalanceSnapshot.objects.filter(bank_account=self.bank_account)
+            .order_by("month")
+            .values_list("month", "balance")
+        )
+
+    def balance_as_of(self, moment):
+        return BankAccount.objects.get_balance_as_of(self.bank_account, aware(moment))
+
+    def test_refresh(self):
+        """A snapshot per month after the first, up to the current one"""
+        current = timezone.localdate().replace(day=1)
+        months = []
+        month = date(2024, 2, 1)
+        while month <= current:
+            months.append(month)
+            month = next_month(month)
+
+        added = BalanceSnapshot.objects.refresh([self.bank_account])
+
+        snapshots = self.snapshots()
+        self.assertEqual(added, len(months))
+        self.assertEqual(list(snapshots), months)
+        self.assertEqual(
+            [snapshots[date(2024, month, 1)] for month in (2, 3, 4, 5)],
+            [Decimal(value) for value in ("1000", "799.50", "799.50", "699.50")],
+        )
+        self.assertEqual(snapshots[current], Decimal("699.50"))
+        self.assertEqual(BalanceSnapshot.objects.refresh([self.bank_account]), 0)
+
+    def test_balance_as_of_starts_from_snapshot(self):
+        """Only transactions since the snapshot are added to it"""
+        expected = [self.balance_as_of(day) for day in ("2024-03-10", "2024-05-01")]
+        self.assertEqual(expected, [Decimal("799.50"), Decimal("699.50")])
+        BalanceSnapshot.objects.refresh([self.bank_account])
+        self.assertEqual(
+            [self.balance_as_of(day) for day in ("2024-03-10", "2024-05-01")], expected
+        )
+
+        # Wrong on purpose, the balances after it show it
+        BalanceSnapshot.objects.filter(month=date(2024, 3, 1)).update(balance=5)
+        self.assertEqual(self.balance_as_of("2024-03-10"), Decimal(5))
+        self.assertEqual(self.balance_as_of("2024-02-10"), Decimal("799.50"))
+        self.assertEqual(self.balance_as_of("2024-01-01"), 0)
+
+    def test_backdated_writes_invalidate_later_snapshots(self):
+        """Writes dated before a snapshot delete it, current ones do not"""
+        BalanceSnapshot.objects.refresh([self.bank_account])
+        count = len(self.snapshots())
+
+        self.create(timezone.localtime().isoformat(sep=" ")[:16], "-5")
+        self.assertEqual(len(self.snapshots()), count)
+
+        rent = self.create("2024-03-05 10:00", "-50")
+        self.assertEqual(list(self.snapshots()), [date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(self.balance_as_of("2024-05-01"), Decimal("649.50"))
+
+        BalanceSnapshot.objects.refresh([self.bank_account])
+        self.assertEqual(self.snapshots()[date(2024, 5, 1)], Decimal("649.50"))
+        Transaction.objects.filter(id=rent.id).update(amount=Decimal("-60"))
+        self.assertEqual(self.balance_as_of("2024-05-01"), Decimal("639.50"))
+
+    def test_import_refreshes_snapshots(self):
+        """Imports add the snapshots their backdated rows deleted"""
+        BalanceSnapshot.objects.refresh([self.bank_account])
+        TransactionImporter(self.user, self.bank_account).import_csv(
+            SimpleUploadedFile("t.csv", make_csv(["2024-02-10;Tx;-0.50;Abo;;;0;0"]))
+        )
+
+        snapshots = self.snapshots()
+        self.assertEqual(snapshots[date(2024, 3, 1)], Decimal("799.00"))
+        self.assertEqual(snapshots[date(2024, 5, 1)], Decimal("699.00"))
+
+    def test_snapshot_command(self):
+        """Missing snapshots are added, --rebuild recomputes them all"""
+        out = StringIO()
+        call_command("snapshot_balances", "--user", "testuser", stdout=out)
+        count = len(self.snapshots())
+        self.assertIn(f"Added {count} balance snapshots", out.getvalue())
+
+        BalanceSnapshot.objects.update(balance=0)
+        call_command("snapshot_balances", stdout=out)
+        self.assertIn("Added 0 balance snapshots", out.getvalue())
+        call_command("snapshot_balances", "--rebuild", stdout=out)
+        self.assertEqual(self.snapshots()[date(2024, 5, 1)], Decimal("699.50"))
@@ -0,0 +1,206 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zoneinfo
+from datetime import datetime
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .bank_formats import (
+    TRADE_REPUBLIC,
+    VOLKSBANK,
+    get_bank_format,
+    get_decoder,
+)
+from .benchmarks import sample_csv_text
+from .importers import TransactionImporter
+from .models import BankAccount, Transaction
+from .parsers import iter_csv_rows, iter_parsed_rows, make_aware
+from .tests_importers import ImporterTestMixin, TemporaryMediaMixin
+
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+
+VOLKSBANK_CSV = "\ufeff" + "\n".join(
+    [
+        ";".join(VOLKSBANK.header),
+        "Giro;DE02;GENODEF1;Volksbank;15.03.2024;15.03.2024;REWE Markt;DE89;;"
+        "Lastschrift;Einkauf;-1.234,56;EUR;100,00;;;;;",
+        "Giro;DE02;GENODEF1;Volksbank;16.03.2024;16.03.2024;;DE89;;"
+        "Gutschrift;Gehalt Maerz;2.500,00;EUR;2.600,00;;;;;",
+        "Giro;DE02;GENODEF1;Volksbank;16.03.2024;16.03.2024;;;;"
+        "Abschluss;;-0,5;EUR;2.599,50;;;;;",
+    ]
+)
+
+
+class ColumnarDecoderTestCase(SimpleTestCase):
+    """Test cases for decoding bank exports column by column"""
+
+    def decode(self, account_type, text):
+        decoder = get_decoder(account_type)
+        rows = []
+        for chunk in decoder.iter_chunks(io.StringIO(text, newline=""), BERLIN):
+            rows.extend(chunk)
+        return rows
+
+    def test_registry_falls_back_to_default_format(self):
+        """Accounts without a known type use the Trade Republic layout"""
+        self.assertIs(get_bank_format(""), TRADE_REPUBLIC)
+        self.assertIs(get_bank_format("unknown"), TRADE_REPUBLIC)
+        self.assertIs(get_bank_format("volksbank"), VOLKSBANK)
+
+    def test_volksbank_export(self):
+        """German dates and decimals and the counterparty as note"""
+        rows = self.decode("volksbank", VOLKSBANK_CSV.lstrip("\ufeff"))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0].created_at, datetime(2024, 3, 15, tzinfo=BERLIN))
+        self.assertEqual(rows[0].amount, -1234.56)
+        self.assertEqual(rows[0].note, "REWE Markt")
+        self.assertEqual(rows[1].amount, 2500.0)
+        # Without a counterparty the purpose, then the booking text is used
+        self.assertEqual(rows[1].note, "Gehalt Maerz")
+        self.assertEqual(rows[2].note, "Abschluss")
+        self.assertEqual(rows[2].amount, -0.5)
+        self.assertEqual(rows[0].isin, "")
+
+    def test_matches_row_parser(self):
+        """The positional layout decodes to the same rows and fingerprints"""
+        text = sample_csv_text(TRADE_REPUBLIC, 300, seed=3)
+        # Local times in the spring DST gap and the autumn fold
+        text += "\n2024-03-31 02:30:00;Tx;-1;Gap;;;;"
+        text += "\n2024-10-27 02:30:00;Tx;-1;Fold;;;;\n"
+
+        expected = list(
+            iter_parsed_rows(
+                iter_csv_rows(io.StringIO(text, newline="")), 1, BERLIN
+            )
+        )
+        decoded = list(
+            get_decoder("trade_republic").iter_rows(
+                io.StringIO(text, newline=""), 1, BERLIN, chunk_size=64
+            )
+        )
+
+        self.assertEqual(decoded, expected)
+        self.assertEqual(
+            [row.created_at.utcoffset() for row in decoded[-2:]],
+            [row.created_at.utcoffset() for row in expected[-2:]],
+        )
+
+    def test_invalid_values_raise(self):
+        """Invalid dates and amounts are errors, like in the row parser"""
+        header = "Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax\n"
+        for line in ["yesterday;Tx;1;;;;;", "2024-01-01;Tx;one;;;;;", ";Tx;1;;;;;"]:
+            with self.subTest(line=line), self.assertRaises(ValueError):
+                self.decode("trade_republic", header + line)
+
+    def test_optional_numbers_are_lenient(self):
+        """Invalid quantities become 0 like safe_float"""
+        header = "Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax\n"
+        rows = self.decode("trade_republic", header + "2024-01-01;Tx;1;;;n/a;;\n")
+
+        self.assertEqual(rows[0].quantity, 0.0)
+
+    def test_missing_required_column(self):
+        """Named columns must be present in the header"""
+        with self.assertRaisesMessage(ValueError, "Betrag"):
+            self.decode("volksbank", "Buchungstag;Verwendungszweck\n01.01.2024;x\n")
+
+    def test_sample_files_round_trip(self):
+        """Sample files written for a format decode to the same amounts"""
+        for bank_format, account_type in [
+            (TRADE_REPUBLIC, "trade_republic"),
+            (VOLKSBANK, "volksbank"),
+        ]:
+            with self.subTest(format=bank_format.name):
+                rows = self.decode(account_type, sample_csv_text(bank_format, 50))
+                self.assertEqual(len(rows), 50)
+
+    def test_make_aware_matches_for_ambiguous_times(self):
+        """Ambiguous local times resolve like datetime.replace(tzinfo=...)"""
+        rows = self.decode(
+            "trade_republic",
+            "Date;Type;Amount\n2024-10-27 02:30:00;Tx;1\n",
+        )
+
+        self.assertEqual(
+            rows[0].created_at.utcoffset(),
+            make_aware(datetime(2024, 10, 27, 2, 30), BERLIN).utcoffset(),
+        )
+
+
+@override_settings(IMPORT_JOBS_EAGER=True)
+class VolksbankImportTestCase(TemporaryMediaMixin, ImporterTestMixin, APITestCase):
+    """Test cases for importing Volksbank exports"""
+
+    def setUp(self):
+        super().setUp()
+        self.volksbank = BankAccount.objects.create(
+            user=self.user, name="Giro", account_type="volksbank"
+        )
+
+    def test_upload_volksbank_export(self):
+        """The account type selects the decoder of an upload"""
+        self.client.login(username="testuser", password="testpass123")
+
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile(
+                    "umsaetze.csv", VOLKSBANK_CSV.encode("utf-8")
+                ),
+                "bank_account": self.volksbank.id,
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["created_count"], 3)
+        transaction = Transaction.objects.get(note="REWE Markt")
+        self.assertEqual(float(transaction.amount), -1234.56)
+        self.assertEqual(transaction.transaction_subtype, self.outflow_subtype)
+
+    def test_reimport_skips_rows(self):
+        """Fingerprints also work for decoded Volksbank rows"""
+        importer = TransactionImporter(self.user, self.volksbank)
+        upload = VOLKSBANK_CSV.encode("utf-8")
+
+        importer.import_csv(SimpleUploadedFile("a.csv", upload))
+        result = importer.import_csv(SimpleUploadedFile("a.csv", upload))
+
+        self.assertEqual(result.skipped_count, 3)
+
+
+class BenchmarkCommandTestCase(TestCase):
+    """Test cases for the benchmark command"""
+
+    def test_parser_benchmark_report(self):
+        """Every format is benchmarked and the report is written as JSON"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "report.json")
+
+        call_command(
+            "benchmark",
+            "parsers",
+            "--rows",
+            "50",
+            "--output",
+            path,
+            stdout=StringIO(),
+        )
+
+        with open(path) as f:
+            report = json.load(f)
+        cases = {result["case"] for result in report["results"]}
+        self.assertIn("volksbank/columnar", cases)
+        self.assertIn("trade_republic/columnar", cases)
+        self.assertIn("trade_republic/row", cases)
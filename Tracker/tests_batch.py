@@ -0,0 +1,150 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, Transaction, TransactionTombstone
+from .tests_importers import ImporterTestMixin
+
+
+class TransactionBatchTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the batch mutation endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        self.rent, self.coffee = [
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=self.bank_account,
+                transaction_subtype=self.outflow_subtype,
+                amount=Decimal(amount),
+                note=note,
+            )
+            for amount, note in [("-900", "Miete"), ("-4.50", "Kaffee")]
+        ]
+
+    def batch(self, operations):
+        return self.client.post(
+            "/api/transactions/batch/", operations, format="json"
+        )
+
+    def create_op(self, note, amount="-1.00"):
+        return {
+            "op": "create",
+            "data": {
+                "transaction_subtype": self.outflow_subtype.id,
+                "bank_account": self.bank_account.id,
+                "amount": amount,
+                "note": note,
+            },
+        }
+
+    def test_mixed_operations(self):
+        """Results come back in request order"""
+        response = self.batch(
+            [
+                {"op": "delete", "id": self.coffee.id},
+                self.create_op("Brot"),
+                {
+                    "op": "update",
+                    "id": self.rent.id,
+                    "data": {"note": "Miete Mai", "amount": "-950"},
+                },
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        results = response.data["results"]
+        self.assertEqual(
+            [(result["op"], result["status"]) for result in results],
+            [("delete", 204), ("create", 201), ("update", 200)],
+        )
+        self.assertEqual(results[0]["id"], self.coffee.id)
+        self.assertEqual(results[1]["data"]["bank_account_name"], "Test Account")
+        self.assertEqual(results[2]["data"]["amount"], "-950.00")
+
+        self.rent.refresh_from_db()
+        self.assertEqual((self.rent.note, self.rent.amount), ("Miete Mai", -950))
+        self.assertTrue(Transaction.objects.filter(note="Brot").exists())
+        self.assertFalse(Transaction.objects.filter(id=self.coffee.id).exists())
+        self.assertTrue(
+            TransactionTombstone.objects.filter(transaction_id=self.coffee.id).exists()
+        )
+
+    def test_invalid_operation_writes_nothing(self):
+        """One bad operation fails the batch, the others report 424"""
+        other = User.objects.create_user(username="other", password="x")
+        foreign = BankAccount.objects.create(user=other, name="Foreign")
+        bad_account = self.create_op("Fremd")
+        bad_account["data"]["bank_account"] = foreign.id
+
+        response = self.batch(
+            [
+                self.create_op("Brot"),
+                bad_account,
+                {"op": "update", "id": 999999, "data": {"note": "x"}},
+                {"op": "delete", "id": self.rent.id},
+                {"op": "update", "id": self.rent.id, "data": {"note": "x"}},
+                {"op": "rename"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [424, 400, 404, 424, 400, 400]
+        )
+        self.assertIn("bank_account", results[1]["errors"])
+        self.assertIn("id", results[4]["errors"])
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_default_account(self):
+        """Creates without an account use the first one, like Transaction.save"""
+        operation = self.create_op("Brot")
+        operation["data"]["bank_account"] = None
+
+        response = self.batch([operation])
+
+        self.assertEqual(
+            response.data["results"][0]["data"]["bank_account"], self.bank_account.id
+        )
+
+    def test_update_to_no_account(self):
+        """Updates clearing the account get the first one, like a PATCH"""
+        savings = BankAccount.objects.create(user=self.user, name="Savings")
+        Transaction.objects.filter(id=self.rent.id).update(bank_account=savings)
+
+        response = self.batch(
+            [{"op": "update", "id": self.rent.id, "data": {"bank_account": None}}]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.bank_account, self.bank_account)
+
+    def test_query_count_is_independent_of_batch_size(self):
+        """Lookups and writes are bulk, not per operation"""
+
+        def count_queries(size):
+            operations = [self.create_op(f"Neu {i}") for i in range(size)]
+            operations.append(
+                {"op": "update", "id": self.rent.id, "data": {"note": f"x{size}"}}
+            )
+            with CaptureQueriesContext(connection) as captured:
+                response = self.batch(operations)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(captured)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_malformed_body(self):
+        """The body must be a non-empty list"""
+        for body in [{}, [], {"op": "create"}]:
+            with self.subTest(body=body):
+                response = self.batch(body)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("error", response.data)
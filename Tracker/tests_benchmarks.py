@@ -0,0 +1,190 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from .bank_formats import TRADE_REPUBLIC, VOLKSBANK, get_decoder
+from .benchmarks import compare_reports, run_benchmarks
+from .generators import generate_transactions, write_csv
+from .models import Transaction
+
+
+class GeneratorTestCase(SimpleTestCase):
+    """Test cases for the synthetic transaction generator"""
+
+    def test_rows_are_ordered_and_reproducible(self):
+        """The same seed gives the same history, in date order"""
+        rows = list(generate_transactions(500, seed=1))
+
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(rows, list(generate_transactions(500, seed=1)))
+        dates = [row["created_at"] for row in rows]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_mix_of_trades_and_recurring_notes(self):
+        """Trades carry an ISIN and quantity, payments repeat their notes"""
+        rows = list(generate_transactions(2000))
+        trades = [row for row in rows if row["isin"]]
+        notes = {row["note"] for row in rows}
+
+        self.assertTrue(trades)
+        self.assertTrue(
+            all(row["quantity"] or row["note"] == "Dividende" for row in trades)
+        )
+        self.assertLess(len(notes), 30)
+        self.assertFalse(
+            any(row["isin"] for row in generate_transactions(2000, with_trades=False))
+        )
+
+    def test_written_files_decode(self):
+        """Generated files decode with the decoder of their format"""
+        for bank_format, account_type in [
+            (TRADE_REPUBLIC, "trade_republic"),
+            (VOLKSBANK, "volksbank"),
+        ]:
+            with self.subTest(format=bank_format.name):
+                text_stream = io.StringIO(newline="")
+                write_csv(text_stream, bank_format, generate_transactions(100))
+                text_stream.seek(0)
+
+                rows = list(
+                    get_decoder(account_type).iter_rows(text_stream, 1, None)
+                )
+
+                self.assertEqual(len(rows), 100)
+
+    def test_generate_command_writes_one_file_per_account(self):
+        """Files are named after the accounts so archive uploads map them"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "export.zip")
+
+        call_command(
+            "generate_transactions",
+            "--rows",
+            "20",
+            "--accounts",
+            "Depot",
+            "Giro Konto",
+            "--output",
+            path,
+            stdout=StringIO(),
+        )
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()), ["depot.csv", "giro-konto.csv"]
+            )
+            lines = archive.read("depot.csv").decode().splitlines()
+        self.assertEqual(len(lines), 21)
+
+    def test_compare_reports(self):
+        """Results are paired by suite, case and size"""
+        result = {"suite": "import", "case": "tr/parse", "rows": 10}
+        other = {"suite": "import", "case": "tr/write", "rows": 10}
+
+        pairs = compare_reports({"results": [result]}, {"results": [result, other]})
+
+        self.assertEqual(pairs, [(result, result), (other, None)])
+
+
+class ImportBenchmarkTestCase(TestCase):
+    """Test cases for the import benchmark suite"""
+
+    def test_import_benchmark_report(self):
+        """Every stage and the upload view are timed with queries and memory"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "report.json")
+
+        call_command(
+            "benchmark",
+            "import",
+            "--rows",
+            "30",
+            "--output",
+            path,
+            stdout=StringIO(),
+        )
+
+        with open(path) as f:
+            report = json.load(f)
+        results = {result["case"]: result for result in report["results"]}
+        self.assertEqual(
+            sorted(results),
+            [
+                "trade_republic/classify",
+                "trade_republic/parse",
+                "trade_republic/total",
+                "trade_republic/upload",
+                "trade_republic/write",
+            ],
+        )
+        self.assertGreater(results["trade_republic/write"]["queries"], 0)
+        self.assertGreater(results["trade_republic/upload"]["peak_memory_bytes"], 0)
+        # Two runs per case, each on its own account
+        self.assertEqual(Transaction.objects.count(), 4 * 30)
+
+    def test_serializer_benchmark_report(self):
+        """Both list serializers are measured on the same rows"""
+        report = run_benchmarks(["serializers"], [40], trace_memory=False)
+
+        results = {result["case"]: result for result in report["results"]}
+        self.assertEqual(
+            sorted(results), ["transactions/drf", "transactions/values"]
+        )
+        self.assertEqual(results["transactions/values"]["rows"], 40)
+
+    def test_filter_benchmark_report(self):
+        """Every filter case fetches a page through the view"""
+        report = run_benchmarks(["filters"], [40], trace_memory=False)
+
+        cases = {result["case"] for result in report["results"]}
+        self.assertIn("transactions/combined", cases)
+        self.assertTrue(all(result["queries"] for result in report["results"]))
+
+    def test_export_benchmark_report(self):
+        """Every export format streams the whole list"""
+        report = run_benchmarks(["export"], [40], trace_memory=False)
+
+        results = {result["case"]: result for result in report["results"]}
+        self.assertEqual(
+            sorted(results),
+            ["transactions/csv", "transactions/csv.gz", "transactions/ndjson"],
+        )
+        self.assertLess(
+            results["transactions/csv.gz"]["content_bytes"],
+            results["transactions/csv"]["content_bytes"],
+        )
+
+    def test_rules_benchmark_report(self):
+        """Notes are matched in memory and stored rows re-categorized"""
+        report = run_benchmarks(["rules"], [40], trace_memory=False)
+
+        results = {result["case"]: result for result in report["results"]}
+        self.assertEqual(sorted(results), ["notes/match", "transactions/apply"])
+        self.assertEqual(results["notes/match"]["queries"], 1)
+        self.assertEqual(results["transactions/apply"]["rules"], 300)
+
+    def test_renderers_benchmark_report(self):
+        """Both encoders write the same bytes, compression shrinks them"""
+        report = run_benchmarks(["renderers"], [40], trace_memory=False)
+
+        results = {result["case"]: result for result in report["results"]}
+        self.assertIn("transactions/json", results)
+        self.assertIn("portfolio/gzip", results)
+        fast = [case for case in results if case.startswith("transactions/dumps/")]
+        self.assertEqual(
+            results[fast[0]]["content_bytes"],
+            results["transactions/json"]["content_bytes"],
+        )
+        self.assertLess(
+            results["transactions/gzip"]["content_bytes"],
+            results["transactions/json"]["content_bytes"],
+        )
@@ -0,0 +1,173 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, SyncVersion, Transaction, TransactionTombstone
+from .tests_importers import ImporterTestMixin
+
+
+class TransactionChangesTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for change versions and the delta-sync endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        self.rent = self.create("-900", "Miete")
+        self.salary = self.create("3000", "Gehalt", self.inflow_subtype)
+
+    def create(self, amount, note, subtype=None, user=None, bank_account=None):
+        return Transaction.objects.create(
+            user=user or self.user,
+            bank_account=bank_account or self.bank_account,
+            transaction_subtype=subtype or self.outflow_subtype,
+            amount=Decimal(amount),
+            created_at=datetime(2024, 5, 1, tzinfo=timezone.utc),
+            note=note,
+        )
+
+    def changes(self, since, query=""):
+        response = self.client.get(f"/api/transactions/changes/?since={since}{query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        body = response.json()
+        return body["version"], [row["note"] for row in body["upserts"]], sorted(
+            body["deletions"]
+        )
+
+    def test_writes_take_new_versions(self):
+        """Saves, bulk updates and deletes each bump the user's version"""
+        self.assertEqual((self.rent.version, self.salary.version), (1, 2))
+
+        self.rent.note = "Miete Mai"
+        self.rent.save(update_fields=["note"])
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.version, 3)
+
+        Transaction.objects.filter(user=self.user).update(note="x")
+        self.assertEqual(
+            set(Transaction.objects.values_list("version", flat=True)), {4}
+        )
+
+        salary_id = self.salary.id
+        self.salary.delete()
+        Transaction.objects.filter(pk=self.rent.pk).delete()
+        self.assertEqual(
+            list(
+                TransactionTombstone.objects.order_by("version").values_list(
+                    "transaction_id", "version"
+                )
+            ),
+            [(salary_id, 5), (self.rent.id, 6)],
+        )
+        self.assertEqual(SyncVersion.objects.current_version(self.user.id), 6)
+
+    def test_bulk_create_shares_one_version(self):
+        """Imported batches take one version per user"""
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    user=self.user,
+                    bank_account=self.bank_account,
+                    transaction_subtype=self.outflow_subtype,
+                    amount=Decimal(-i),
+                )
+                for i in range(3)
+            ]
+        )
+
+        self.assertEqual(
+            sorted(set(Transaction.objects.values_list("version", flat=True))),
+            [1, 2, 3],
+        )
+
+    def test_full_and_delta_sync(self):
+        """since=0 returns everything, later calls only what changed"""
+        version, upserts, deletions = self.changes(0)
+        self.assertEqual((version, upserts, deletions), (2, ["Miete", "Gehalt"], []))
+
+        self.client.patch(
+            "/api/transactions/bulk_update_by_note/",
+            {"note": "Miete", "transaction_subtype": self.custom_subtype.id},
+        )
+        self.client.delete(f"/api/transactions/{self.salary.id}/")
+        self.client.post(
+            "/api/transactions/",
+            {
+                "transaction_subtype": self.outflow_subtype.id,
+                "bank_account": self.bank_account.id,
+                "amount": "-4.50",
+                "note": "Kaffee",
+            },
+        )
+
+        version, upserts, deletions = self.changes(version)
+        self.assertEqual(version, 5)
+        self.assertEqual(upserts, ["Miete", "Kaffee"])
+        self.assertEqual(deletions, [self.salary.id])
+        self.assertEqual(self.changes(version), (5, [], []))
+
+    def test_filtered_sync(self):
+        """Changed rows leaving the filtered view are sent as deletions"""
+        version, upserts, _ = self.changes(0, "&note=miete")
+        self.assertEqual(upserts, ["Miete"])
+
+        self.rent.note = "Wohnung"
+        self.rent.save()
+        self.create("-950", "Miete Juni")
+
+        _, upserts, deletions = self.changes(version, "&note=miete")
+        self.assertEqual(upserts, ["Miete Juni"])
+        self.assertEqual(deletions, [self.rent.id])
+
+    def test_other_users_changes(self):
+        """Versions and changes are per user"""
+        other = User.objects.create_user(username="other", password="x")
+        account = BankAccount.objects.create(user=other, name="Other")
+        foreign = self.create("-1", "Fremd", user=other, bank_account=account)
+        foreign.delete()
+
+        self.assertEqual(foreign.version, 1)
+        self.assertEqual(self.changes(1), (2, ["Gehalt"], []))
+
+    def test_paged_sync(self):
+        """Large deltas come in pages, even within one version"""
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    user=self.user,
+                    bank_account=self.bank_account,
+                    transaction_subtype=self.outflow_subtype,
+                    amount=Decimal(-i),
+                    note=f"Abo {i}",
+                )
+                for i in range(4)
+            ]
+        )
+        salary_id = self.salary.id
+        self.salary.delete()
+
+        url = "/api/transactions/changes/?since=1&page_size=2"
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            pages.append(
+                (body["version"], [row["note"] for row in body["upserts"]])
+            )
+            pages[-1][1].extend(body["deletions"])
+            url = body["next"]
+
+        self.assertEqual(
+            pages,
+            [(2, ["Abo 0", "Abo 1"]), (4, ["Abo 2", "Abo 3", salary_id])],
+        )
+        response = self.client.get("/api/transactions/changes/?since=1&after=3")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_since(self):
+        """since must be a non-negative integer"""
+        for since in ["latest", "-1"]:
+            with self.subTest(since=since):
+                response = self.client.get(f"/api/transactions/changes/?since={since}")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
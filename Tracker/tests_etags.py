@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, SyncVersion, Transaction, TransactionSubType
+from .tests_importers import ImporterTestMixin
+
+LIST_URLS = [
+    "/api/transactions/",
+    "/api/transactionsubtypes/",
+    "/api/transactiontypes/",
+    "/api/bankaccounts/",
+    "/api/budgets/",
+]
+
+
+class ConditionalListTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for list ETags and 304 responses"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            transaction_subtype=self.outflow_subtype,
+            amount=Decimal("-900"),
+            note="Miete",
+        )
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["ETag"]
+
+    def test_not_modified(self):
+        """A matching If-None-Match is a 304 without touching the data"""
+        for url in LIST_URLS:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("no-cache", response["Cache-Control"])
+
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=f'"x", W/{response["ETag"]}'
+                    )
+
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response.content, b"")
+                self.assertTrue(response["ETag"])
+                # Session, user and data version, nothing else
+                self.assertEqual(len(captured), 3, captured.captured_queries)
+
+    def test_writes_change_etags(self):
+        """Transactions, accounts, budgets and shared types all count"""
+        url = "/api/transactions/"
+        etags = [self.etag(url)]
+
+        self.client.post(
+            url,
+            {
+                "transaction_subtype": self.outflow_subtype.id,
+                "bank_account": self.bank_account.id,
+                "amount": "-4.50",
+                "note": "Kaffee",
+            },
+        )
+        etags.append(self.etag(url))
+        self.client.patch(
+            f"/api/bankaccounts/{self.bank_account.id}/", {"name": "Giro"}
+        )
+        etags.append(self.etag(url))
+        self.client.post(
+            "/api/budgets/",
+            {"name": "Food", "limit_amount": "300", "period": "monthly"},
+        )
+        etags.append(self.etag(url))
+        TransactionSubType.objects.create(
+            transaction_type=self.outflow_subtype.transaction_type, name="Rent"
+        )
+        etags.append(self.etag(url))
+
+        self.assertEqual(len(set(etags)), 5)
+        self.assertEqual(self.etag(url), etags[-1])
+
+    def test_etag_depends_on_request(self):
+        """Query strings and users are validated separately"""
+        self.assertNotEqual(
+            self.etag("/api/transactions/"),
+            self.etag("/api/transactions/?note=miete"),
+        )
+
+        other = User.objects.create_user(username="other", password="x")
+        BankAccount.objects.create(user=other, name="Other")
+        etag = self.etag("/api/bankaccounts/")
+        self.client.login(username="other", password="x")
+        response = self.client.get("/api/bankaccounts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_users_without_data_version(self):
+        """Lists of users who never wrote anything carry no ETag"""
+        User.objects.create_user(username="new", password="x")
+        self.client.login(username="new", password="x")
+
+        response = self.client.get("/api/transactions/", HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("ETag"))
+        user_id = response.wsgi_request.user.id
+        self.assertIsNone(SyncVersion.objects.data_version(user_id))
@@ -0,0 +1,124 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.test import TestCase
+
+from .exports import TransactionExport
+from .models import Transaction
+from .tests_importers import ImporterTestMixin
+
+
+class TransactionExportTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the streaming transaction export"""
+
+    def setUp(self):
+        super().setUp()
+        created_at = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        for day, (subtype, amount, note, isin) in enumerate(
+            [
+                (self.buy_subtype, "-500", "Kauf", "IE00B4L5Y983"),
+                (self.outflow_subtype, "-42.5", "REWE, Markt", ""),
+                (self.inflow_subtype, "3000", 'Gehalt "Januar"', ""),
+            ]
+        ):
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=self.bank_account,
+                transaction_subtype=subtype,
+                amount=Decimal(amount),
+                created_at=created_at + timedelta(days=day),
+                note=note,
+                isin=isin,
+            )
+        self.client.login(username="testuser", password="testpass123")
+
+    def export(self, query="", **headers):
+        response = self.client.get(f"/api/transactions/export?{query}", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_matches_list(self):
+        """CSV rows carry the list fields, quoted where needed"""
+        listed = self.client.get("/api/transactions/?all=true").json()
+        response, content = self.export()
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="transactions.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(
+            [row["note"] for row in rows], ["Kauf", "REWE, Markt", 'Gehalt "Januar"']
+        )
+        self.assertEqual(rows[0]["amount"], listed[0]["amount"])
+        self.assertEqual(rows[0]["created_at"], listed[0]["created_at"])
+        self.assertEqual(rows[1]["quantity"], "")
+
+    def test_csv_escapes_formulas(self):
+        """Text cells a spreadsheet would run are quoted, amounts are not"""
+        Transaction.objects.filter(note="Kauf").update(note="=HYPERLINK(1)")
+        self.bank_account.name = "@SUM(A1)"
+        self.bank_account.save()
+
+        _, content = self.export("fields=note,amount,bank_account_name")
+
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0]["note"], "'=HYPERLINK(1)")
+        self.assertEqual(rows[0]["bank_account_name"], "'@SUM(A1)")
+        self.assertEqual(rows[0]["amount"], "-500.00")
+        self.assertEqual(rows[1]["note"], "REWE, Markt")
+
+    def test_ndjson_matches_list(self):
+        """NDJSON has one list object per line"""
+        listed = self.client.get("/api/transactions/?all=true").json()
+        response, content = self.export("format=ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = content.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], listed)
+
+    def test_filters_and_fields(self):
+        """List filters and sparse fieldsets apply to the export"""
+        _, content = self.export("format=ndjson&isin=ie00b4l5y983&fields=note")
+        self.assertEqual(content, b'{"note":"Kauf"}\n')
+
+        _, content = self.export("start_date=2024-01-02&end_date=2024-01-02")
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual([row["note"] for row in rows], ["REWE, Markt"])
+        _, content = self.export("end_date=2024-01-01&fields=amount")
+        self.assertEqual(content.decode().splitlines(), ["amount", "-500.00"])
+
+    def test_streams_in_chunks(self):
+        """Rows are written chunk by chunk, not rendered all at once"""
+        export = TransactionExport(
+            Transaction.objects.order_by("created_at", "id"), "csv", chunk_size=2
+        )
+        chunks = [chunk.decode().splitlines() for chunk in export]
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        self.assertEqual(chunks[0][0], ",".join(export.writer.fields))
+
+    def test_gzip(self):
+        """Clients accepting gzip get the same content compressed"""
+        _, plain = self.export("format=ndjson")
+        response, compressed = self.export(
+            "format=ndjson", HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_errors(self):
+        """Bad formats, fields and filters are a 400, anonymous users a 401"""
+        for query in ["format=xlsx", "fields=password", "start_date=soon"]:
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/transactions/export?{query}")
+                self.assertEqual(response.status_code, 400)
+
+        self.client.logout()
+        response = self.client.get("/api/transactions/export")
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, Transaction
+from .tests_importers import ImporterTestMixin
+
+
+class TransactionFilterTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the server-side filters of the transaction list"""
+
+    def setUp(self):
+        super().setUp()
+        self.giro = BankAccount.objects.create(user=self.user, name="Giro")
+        depot, giro, isin = self.bank_account, self.giro, "IE00B4L5Y983"
+        rows = [
+            (depot, self.buy_subtype, "-500", "2024-01-10 09:00", "Kauf", isin),
+            (depot, self.sell_subtype, "250", "2024-02-01 23:30", "Verkauf", isin),
+            (giro, self.outflow_subtype, "-42.50", "2024-01-31 12:00", "REWE Markt", ""),
+            (giro, self.outflow_subtype, "-9.99", "2024-02-05 08:00", "Spotify", ""),
+            (giro, self.inflow_subtype, "3000", "2024-02-01 00:00", "Gehalt", ""),
+        ]
+        for account, subtype, amount, created_at, note, isin in rows:
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=account,
+                transaction_subtype=subtype,
+                amount=Decimal(amount),
+                created_at=datetime.fromisoformat(created_at).replace(
+                    tzinfo=timezone.utc
+                ),
+                note=note,
+                isin=isin,
+            )
+        self.client.login(username="testuser", password="testpass123")
+
+    def notes(self, query):
+        response = self.client.get(f"/api/transactions/?all=true&{query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return [row["note"] for row in response.json()]
+
+    def test_date_range(self):
+        """The end date includes the whole day"""
+        self.assertEqual(
+            self.notes("start_date=2024-01-31&end_date=2024-02-01"),
+            ["REWE Markt", "Gehalt", "Verkauf"],
+        )
+        self.assertEqual(
+            self.notes("end_date=2024-02-01T00:00:00Z"),
+            ["Kauf", "REWE Markt", "Gehalt"],
+        )
+
+    def test_account_and_isin(self):
+        """Accounts take lists, ISINs match case-insensitively"""
+        giro, depot = self.giro.id, self.bank_account.id
+
+        self.assertEqual(self.notes(f"bank_account={giro}")[0], "REWE Markt")
+        self.assertEqual(self.notes("isin=ie00b4l5y983"), ["Kauf", "Verkauf"])
+        self.assertEqual(len(self.notes(f"bank_account={giro},{depot}")), 5)
+
+    def test_amount_range_and_note(self):
+        """Amount bounds are inclusive, notes match anywhere"""
+        self.assertEqual(
+            self.notes("min_amount=-42.50&max_amount=0"), ["REWE Markt", "Spotify"]
+        )
+        self.assertEqual(self.notes("note=rewe"), ["REWE Markt"])
+
+    def test_type_and_subtype(self):
+        """Transaction types select all of their subtypes"""
+        income_type = self.inflow_subtype.transaction_type
+        self.assertEqual(
+            self.notes(f"transaction_type={income_type.id}"), ["Gehalt", "Verkauf"]
+        )
+        self.assertEqual(
+            self.notes(f"transaction_subtype={self.outflow_subtype.id}"),
+            ["REWE Markt", "Spotify"],
+        )
+
+    def test_filters_combine(self):
+        """Every filter narrows the result further"""
+        self.assertEqual(
+            self.notes(
+                f"bank_account={self.giro.id}&start_date=2024-02-01&max_amount=0"
+            ),
+            ["Spotify"],
+        )
+
+    def test_filtered_pages(self):
+        """Filters apply before paging, next links keep them"""
+        first = self.client.get(
+            f"/api/transactions/?bank_account={self.giro.id}&page_size=2"
+        ).json()
+        second = self.client.get(first["next"]).json()
+
+        self.assertEqual(
+            [row["note"] for row in first["results"] + second["results"]],
+            ["REWE Markt", "Gehalt", "Spotify"],
+        )
+
+    def test_invalid_values(self):
+        """Unparseable filters are a 400 naming the parameter"""
+        for query in [
+            "start_date=yesterday",
+            "bank_account=giro",
+            "min_amount=lots",
+            "max_amount=NaN",
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/transactions/?{query}")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(query.split("=")[0], response.json())
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .importers import TransactionImporter
+from .models import BalanceSnapshot, BankAccount, Transaction
+from .tests_importers import ImporterTestMixin, make_csv
+
+
+class ImportTransactionsCommandTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the import_transactions management command"""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "history.csv")
+        self.checkpoint_path = f"{self.path}.checkpoint.json"
+
+    def write_file(self, lines):
+        with open(self.path, "wb") as f:
+            f.write(make_csv(lines))
+
+    def run_command(self, *args):
+        stdout = StringIO()
+        call_command(
+            "import_transactions",
+            "--file",
+            self.path,
+            "--account",
+            str(self.bank_account.id),
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def test_imports_file_and_reports_progress(self):
+        """All rows are imported and the rate is printed"""
+        self.write_file(
+            [f"2023-01-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(1, 11)]
+        )
+
+        output = self.run_command("--batch-size", "3")
+
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 10)
+        self.assertIn("rows/sec", output)
+        self.assertIn("Imported 10 transactions", output)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resumes_from_checkpoint(self):
+        """An interrupted import continues after the last committed batch"""
+        # Identical rows straddle the batch boundary where the run fails
+        lines = ["2023-01-01;Tx;-5.00;Coffee;;;0;0"] * 4 + [
+            f"2023-01-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(2, 8)
+        ]
+        self.write_file(lines)
+        write_batch = TransactionImporter.write_batch
+        calls = []
+
+        def failing_write_batch(importer, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise ValueError("disk full")
+            return write_batch(importer, batch)
+
+        with patch.object(TransactionImporter, "write_batch", failing_write_batch):
+            with self.assertRaises(CommandError):
+                self.run_command("--batch-size", "3")
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint["created_count"], 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+        output = self.run_command("--batch-size", "3")
+
+        self.assertIn("Resuming at byte", output)
+        self.assertEqual(Transaction.objects.count(), 10)
+        self.assertEqual(Transaction.objects.filter(note="Coffee").count(), 4)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_refreshes_balance_snapshots(self):
+        """Accounts imported by the command get their monthly snapshots"""
+        self.write_file(
+            [f"2023-0{month}-10;Tx;-{month}.00;Rent;;;0;0" for month in (1, 2, 3)]
+        )
+
+        self.run_command("--batch-size", "2")
+
+        snapshots = dict(
+            BalanceSnapshot.objects.filter(bank_account=self.bank_account)
+            .order_by("month")
+            .values_list("month", "balance")
+        )
+        self.assertEqual(snapshots[date(2023, 2, 1)], Decimal("-1.00"))
+        self.assertEqual(snapshots[date(2023, 4, 1)], Decimal("-6.00"))
+
+    def test_rerun_matches_upload_fingerprints(self):
+        """Rows imported by the command are skipped by a later upload"""
+        lines = ["2023-01-01;Tx;-5.00;Coffee;;;0;0"] * 3
+        self.write_file(lines)
+        self.run_command("--batch-size", "2")
+
+        with open(self.path, "rb") as f:
+            result = TransactionImporter(self.user, self.bank_account).import_csv(f)
+
+        self.assertEqual(result.created_count, 0)
+        self.assertEqual(result.skipped_count, 3)
+
+    def test_parses_with_worker_processes(self):
+        """Rows parsed in worker processes are written in file order"""
+        self.write_file(
+            [f"2023-02-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(1, 21)]
+        )
+
+        self.run_command("--batch-size", "4", "--workers", "2")
+
+        amounts = list(
+            Transaction.objects.order_by("pk").values_list("amount", flat=True)
+        )
+        self.assertEqual(amounts, [-day for day in range(1, 21)])
+
+    def test_invalid_row_stops_import(self):
+        """Invalid rows abort with the position of the last committed batch"""
+        self.write_file(["2023-01-01;Tx;-5.00;;;;0;0", "yesterday;Tx;1;;;;0;0"])
+
+        with self.assertRaisesMessage(CommandError, "Import stopped after byte"):
+            self.run_command("--batch-size", "1")
+
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_checkpoint_of_other_account_is_rejected(self):
+        """A checkpoint is only resumed for the account it was written for"""
+        other = BankAccount.objects.create(user=self.user, name="Other")
+        self.write_file(["2023-01-01;Tx;-5.00;;;;0;0"])
+        with open(self.checkpoint_path, "w") as f:
+            json.dump({"bank_account": other.id, "offset": 0}, f)
+
+        with self.assertRaises(CommandError):
+            self.run_command()
+
+    def test_account_by_name_needs_user(self):
+        """Account names are only looked up within one user's accounts"""
+        self.write_file(["2023-01-01;Tx;-5.00;;;;0;0"])
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "import_transactions",
+                "--file",
+                self.path,
+                "--account",
+                "Test Account",
+                stdout=StringIO(),
+            )
+
+        call_command(
+            "import_transactions",
+            "--file",
+            self.path,
+            "--account",
+            "Test Account",
+            "--user-email",
+            "test@example.com",
+            stdout=StringIO(),
+        )
+        self.assertEqual(Transaction.objects.count(), 1)
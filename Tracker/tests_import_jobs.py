@@ -0,0 +1,395 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .importers import ArchiveImporter, plan_archive_import
+from .jobs import (
+    ImportWorkerPool,
+    claim_next_job,
+    enqueue_import_job,
+    requeue_stale_jobs,
+    run_import_job,
+)
+from .models import (
+    BankAccount,
+    ImportJob,
+    Transaction,
+    TransactionSubType,
+    TransactionType,
+)
+from .tests_importers import TemporaryMediaMixin
+
+CSV_CONTENT = (
+    "Date;Description;Amount;Note;ISIN;Quantity;Fee;Tax\n"
+    "2023-01-01;Tx;-10.00;Coffee;;;0;0\n"
+    "2023-01-02;Tx;2000.00;Salary;;;0;0\n"
+)
+
+
+class ImportJobTestMixin(TemporaryMediaMixin):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.bank_account = BankAccount.objects.create(
+            user=self.user, name="Checking", account_type="trade_republic"
+        )
+        expense_type = TransactionType.objects.create(name="Expense", expense_factor=-1)
+        income_type = TransactionType.objects.create(name="Income", expense_factor=1)
+        TransactionSubType.objects.create(transaction_type=expense_type, name="Outflow")
+        TransactionSubType.objects.create(transaction_type=income_type, name="Inflow")
+
+    def make_file(self, content=CSV_CONTENT):
+        return SimpleUploadedFile("export.csv", content.encode("utf-8"))
+
+
+class ImportJobQueueTestCase(ImportJobTestMixin, TestCase):
+    """Test cases for the DB-backed import job queue"""
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_enqueue_stores_file_and_wakes_pool(self, mock_get_pool):
+        """Queued jobs keep the upload and notify the worker pool"""
+        job = enqueue_import_job(self.user, self.bank_account, self.make_file())
+
+        self.assertEqual(job.status, ImportJob.QUEUED)
+        self.assertEqual(job.original_name, "export.csv")
+        self.assertTrue(job.file.name.startswith("imports/"))
+        mock_get_pool.return_value.notify.assert_called_once()
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_claim_next_job_takes_oldest_first(self, mock_get_pool):
+        """Jobs are claimed in queue order and only once"""
+        first = enqueue_import_job(self.user, self.bank_account, self.make_file())
+        second = enqueue_import_job(self.user, self.bank_account, self.make_file())
+
+        self.assertEqual(claim_next_job().pk, first.pk)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+        first.refresh_from_db()
+        self.assertEqual(first.status, ImportJob.RUNNING)
+        self.assertIsNotNone(first.started_at)
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_run_import_job_records_results(self, mock_get_pool):
+        """A finished job reports its counts and drops the stored file"""
+        enqueue_import_job(self.user, self.bank_account, self.make_file(), 1)
+        job = claim_next_job()
+
+        run_import_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual(job.rows_processed, 2)
+        self.assertEqual(job.created_count, 2)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(job.file)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_run_import_job_records_error(self, mock_get_pool):
+        """A broken file marks the job as failed and drops the stored file"""
+        content = CSV_CONTENT + "yesterday;Tx;-1.00;Broken;;;0;0\n"
+        enqueue_import_job(self.user, self.bank_account, self.make_file(content), 1)
+        job = claim_next_job()
+        path = job.file.path
+
+        with self.assertLogs("Tracker.jobs", level="ERROR"):
+            run_import_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("yesterday", job.error)
+        self.assertFalse(job.file)
+        self.assertFalse(os.path.exists(path))
+        # Batches committed before the error are kept and skipped on retry
+        self.assertEqual(job.rows_processed, 2)
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_requeue_stale_jobs(self, mock_get_pool):
+        """Running jobs without recent progress go back to the queue"""
+        enqueue_import_job(self.user, self.bank_account, self.make_file())
+        job = claim_next_job()
+        ImportJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(requeue_stale_jobs(stale_after=60), 1)
+        self.assertEqual(claim_next_job().pk, job.pk)
+
+
+class ImportWorkerPoolTestCase(ImportJobTestMixin, TransactionTestCase):
+    """Test cases for the in-process worker threads"""
+
+    def test_worker_pool_drains_queue(self):
+        """A started pool imports queued jobs in the background"""
+        with patch("Tracker.jobs.get_worker_pool"):
+            job = enqueue_import_job(self.user, self.bank_account, self.make_file())
+        pool = ImportWorkerPool(workers=1, poll_seconds=0.05)
+
+        pool.notify()
+        try:
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                job.refresh_from_db()
+                if job.status not in (ImportJob.QUEUED, ImportJob.RUNNING):
+                    break
+                time.sleep(0.05)
+        finally:
+            pool.stop(timeout=5)
+
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_jobs_queued_before_start_are_processed(self):
+        """Jobs left over from a previous process run without a new upload"""
+        with patch("Tracker.jobs.get_worker_pool"):
+            queued = enqueue_import_job(self.user, self.bank_account, self.make_file())
+            stale = enqueue_import_job(
+                self.user, self.bank_account, self.make_file(), 1
+            )
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.RUNNING, updated_at=timezone.now() - timedelta(hours=1)
+        )
+        stdout = io.StringIO()
+
+        call_command("run_import_workers", "--burst", stdout=stdout)
+
+        for job in (queued, stale):
+            job.refresh_from_db()
+            self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertIn("Requeued 1 stale import jobs", stdout.getvalue())
+        self.assertIn("Processed 2 import jobs", stdout.getvalue())
+
+
+class ImportJobAPITestCase(ImportJobTestMixin, APITestCase):
+    """Test cases for the asynchronous upload and progress endpoints"""
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_upload_returns_job_id(self, mock_get_pool):
+        """Uploading answers 202 with a queued job instead of importing"""
+        self.client.login(username="testuser", password="testpass123")
+
+        response = self.client.post(
+            "/api/upload-csv/",
+            {"file": self.make_file(), "bank_account": self.bank_account.id},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ImportJob.QUEUED)
+        self.assertTrue(ImportJob.objects.filter(pk=response.data["id"]).exists())
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    @override_settings(IMPORT_JOBS_EAGER=True)
+    def test_job_progress_endpoint(self):
+        """The job endpoint reports rows, throughput and errors"""
+        self.client.login(username="testuser", password="testpass123")
+        upload = self.client.post(
+            "/api/upload-csv/",
+            {"file": self.make_file(), "bank_account": self.bank_account.id},
+            format="multipart",
+        )
+
+        response = self.client.get(f"/api/import-jobs/{upload.data['id']}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], ImportJob.COMPLETED)
+        self.assertEqual(response.data["rows_processed"], 2)
+        self.assertIn("rows_per_second", response.data)
+        self.assertEqual(response.data["error"], "")
+
+    @patch("Tracker.jobs.get_worker_pool")
+    def test_job_endpoint_user_isolation(self, mock_get_pool):
+        """Users cannot see import jobs of other users"""
+        job = enqueue_import_job(self.user, self.bank_account, self.make_file())
+        User.objects.create_user(
+            username="other", email="other@example.com", password="testpass123"
+        )
+        self.client.login(username="other", password="testpass123")
+
+        response = self.client.get(f"/api/import-jobs/{job.id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class ArchiveImportTestCase(ImportJobTestMixin, TestCase):
+    """Test cases for importing several CSV files from one ZIP archive"""
+
+    def setUp(self):
+        super().setUp()
+        self.savings = BankAccount.objects.create(
+            user=self.user, name="Savings", iban="DE44 5001 0517 0123 4567 89"
+        )
+
+    def write_archive(self, members):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "archive.zip")
+        with open(path, "wb") as f:
+            f.write(make_zip(members))
+        return path
+
+    def test_plan_uses_manifest_filename_and_default(self):
+        """Manifest entries win over the filename convention and the default"""
+        path = self.write_archive(
+            {
+                "manifest.json": json.dumps({"a.csv": "Savings"}),
+                "a.csv": CSV_CONTENT,
+                "checking_2024-01.csv": CSV_CONTENT,
+                "DE44500105170123456789.csv": CSV_CONTENT,
+                "other.csv": CSV_CONTENT,
+                "readme.txt": "not imported",
+            }
+        )
+
+        plan = dict(plan_archive_import(path, self.user, self.bank_account))
+
+        self.assertEqual(
+            plan,
+            {
+                "DE44500105170123456789.csv": self.savings,
+                "a.csv": self.savings,
+                "checking_2024-01.csv": self.bank_account,
+                "other.csv": self.bank_account,
+            },
+        )
+
+    def test_plan_rejects_unmapped_files(self):
+        """Without a default account every file must be mapped"""
+        path = self.write_archive({"unknown.csv": CSV_CONTENT})
+
+        with self.assertRaises(ValueError):
+            plan_archive_import(path, self.user)
+
+    def test_plan_rejects_accounts_of_other_users(self):
+        """Manifest entries only resolve to the importing user's accounts"""
+        other = User.objects.create_user(username="other", password="testpass123")
+        foreign = BankAccount.objects.create(user=other, name="Foreign")
+        path = self.write_archive(
+            {
+                "manifest.json": json.dumps({"a.csv": foreign.id}),
+                "a.csv": CSV_CONTENT,
+            }
+        )
+
+        with self.assertRaises(ValueError):
+            plan_archive_import(path, self.user)
+
+    def test_import_archive_with_parser_processes(self):
+        """Files parsed in worker processes land in their own accounts"""
+        path = self.write_archive(
+            {
+                "checking-2023-01.csv": CSV_CONTENT,
+                "savings-2023-01.csv": CSV_CONTENT,
+            }
+        )
+
+        result = ArchiveImporter(self.user, workers=2).import_archive(path)
+
+        self.assertEqual(result.created_count, 4)
+        self.assertEqual(self.bank_account.outgoing_transactions.count(), 2)
+        self.assertEqual(self.savings.outgoing_transactions.count(), 2)
+
+    def test_reimporting_archive_skips_rows(self):
+        """Archive imports use the same fingerprints as single files"""
+        path = self.write_archive({"checking.csv": CSV_CONTENT})
+
+        ArchiveImporter(self.user, workers=1).import_archive(path)
+        result = ArchiveImporter(self.user, workers=1).import_archive(path)
+
+        self.assertEqual(result.created_count, 0)
+        self.assertEqual(result.skipped_count, 2)
+
+
+@override_settings(IMPORT_JOBS_EAGER=True)
+class ArchiveUploadAPITestCase(ImportJobTestMixin, APITestCase):
+    """Test cases for uploading ZIP archives and several files at once"""
+
+    def setUp(self):
+        super().setUp()
+        self.savings = BankAccount.objects.create(user=self.user, name="Savings")
+        self.client.login(username="testuser", password="testpass123")
+
+    def test_upload_zip_without_bank_account(self):
+        """A ZIP maps its files to accounts by name"""
+        archive = SimpleUploadedFile(
+            "export.zip",
+            make_zip(
+                {"checking.csv": CSV_CONTENT, "savings.csv": CSV_CONTENT}
+            ),
+        )
+
+        response = self.client.post(
+            "/api/upload-csv/", {"file": archive}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ImportJob.COMPLETED)
+        self.assertEqual(response.data["created_count"], 4)
+        self.assertEqual(self.savings.outgoing_transactions.count(), 2)
+
+    def test_upload_several_files(self):
+        """Several files in one request become a single job"""
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "files": [
+                    SimpleUploadedFile("january.csv", CSV_CONTENT.encode("utf-8")),
+                    SimpleUploadedFile("savings.csv", CSV_CONTENT.encode("utf-8")),
+                ],
+                "bank_account": self.bank_account.id,
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["created_count"], 4)
+        self.assertEqual(self.bank_account.outgoing_transactions.count(), 2)
+        self.assertEqual(self.savings.outgoing_transactions.count(), 2)
+
+    def test_upload_zip_with_unmapped_file(self):
+        """Archives with files that map to no account are rejected up front"""
+        archive = SimpleUploadedFile(
+            "export.zip", make_zip({"unknown.csv": CSV_CONTENT})
+        )
+
+        response = self.client.post(
+            "/api/upload-csv/", {"file": archive}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_single_csv_still_needs_bank_account(self):
+        """Plain CSV uploads keep requiring an account"""
+        response = self.client.post(
+            "/api/upload-csv/",
+            {"file": SimpleUploadedFile("a.csv", CSV_CONTENT.encode("utf-8"))},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("bank_account", response.data)
@@ -0,0 +1,248 @@
+import io
+import random
+import zipfile
+from datetime import date, timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .importers import TransactionImporter
+from .models import ImportJob, Transaction
+from .previews import ImportPreview
+from .tests_importers import ImporterTestMixin, make_csv
+
+ISIN = "US0378331005"
+
+
+def subtype_totals(transactions):
+    """Summarise saved transactions like ImportPreview.as_dict does."""
+    totals = {}
+    for transaction in transactions:
+        count, total = totals.get(transaction.transaction_subtype_id, (0, 0.0))
+        totals[transaction.transaction_subtype_id] = (
+            count + 1,
+            round(total + float(transaction.amount), 2),
+        )
+    return totals
+
+
+def preview_totals(summary):
+    return {
+        entry["id"]: (entry["count"], entry["total_amount"])
+        for entry in summary["subtypes"]
+    }
+
+
+class ImportPreviewTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the vectorized import dry run"""
+
+    def preview(self, lines):
+        preview = ImportPreview(self.user)
+        upload = SimpleUploadedFile("t.csv", make_csv(lines))
+        preview.add_csv(upload, self.bank_account)
+        return preview.as_dict()
+
+    def import_lines(self, lines):
+        importer = TransactionImporter(self.user, self.bank_account)
+        return importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+    def assert_preview_matches_import(self, lines):
+        summary = self.preview(lines)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+        result = self.import_lines(lines)
+
+        self.assertEqual(summary["would_create"], result.created_count)
+        self.assertEqual(summary["duplicates"], result.skipped_count)
+        self.assertEqual(
+            preview_totals(summary), subtype_totals(Transaction.objects.all())
+        )
+        return summary
+
+    def test_preview_matches_import(self):
+        """Defaults, ISIN and note matching agree with a real import"""
+        lines = [
+            "2023-01-01;Tx;-10.00;Coffee;;;0;0",
+            "2023-01-01;Tx;-10.00;Coffee;;;0;0",
+            "2023-01-02;Tx;2000.00;Salary;;;0;0",
+            f"2023-01-03;Buy;-100.00;Apple;{ISIN};1;1;0",
+            f"2023-01-04;Sell;150.00;;{ISIN};1;1;0",
+            f"2023-01-05;Split;0;;{ISIN};2;0;0",
+            "2023-01-06;Tx;5.00;Coffee;;;0;0",
+            "2023-01-07;Tx;0;;;;0;0",
+            "2023-01-08;Tx;30.00;Apple;;;0;0",
+        ]
+
+        summary = self.assert_preview_matches_import(lines)
+
+        self.assertEqual(summary["rows_processed"], 9)
+        self.assertEqual(summary["not_assigned"], 0)
+
+    def test_preview_uses_existing_transactions(self):
+        """Stored ISIN and note subtypes win over the defaults"""
+        for amount, isin, note in [(-1, "", "Supermarket"), (-1, ISIN, "")]:
+            Transaction.objects.create(
+                user=self.user,
+                amount=amount,
+                isin=isin,
+                note=note,
+                transaction_subtype=self.custom_subtype,
+            )
+
+        summary = self.preview(
+            [
+                "2023-01-01;Tx;-10.00;Supermarket;;;0;0",
+                f"2023-01-02;Buy;-100.00;;{ISIN};1;1;0",
+                f"2023-01-03;Split;0;;{ISIN};1;0;0",
+                f"2023-01-04;Sell;100.00;;{ISIN};1;1;0",
+            ]
+        )
+
+        self.assertEqual(
+            preview_totals(summary),
+            {
+                self.custom_subtype.id: (3, -110.0),
+                self.sell_subtype.id: (1, 100.0),
+            },
+        )
+
+    def test_preview_counts_duplicates(self):
+        """Rows imported before are reported as duplicates"""
+        lines = [f"2023-02-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(1, 6)]
+        self.import_lines(lines)
+
+        summary = self.preview(lines + ["2023-02-06;Tx;-6.00;Rent;;;0;0"])
+
+        self.assertEqual(summary["duplicates"], 5)
+        self.assertEqual(summary["would_create"], 1)
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_preview_numbers_identical_rows(self):
+        """Identical rows of one day are told apart like in the importer"""
+        line = "2023-02-01;Tx;-4.50;Coffee;;;0;0"
+        self.import_lines([line, line])
+
+        summary = self.preview(["2023-01-31;Tx;-1.00;;;;0;0", line, line, line])
+
+        self.assertEqual(summary["duplicates"], 2)
+        self.assertEqual(summary["would_create"], 2)
+
+    def test_preview_numbers_interleaved_identical_rows(self):
+        """Identical rows separated by other days are numbered like imports"""
+        line = "2023-02-01;Tx;-4.50;Coffee;;;0;0"
+        self.import_lines([line, "2023-02-02;Tx;-1.00;;;;0;0", line])
+
+        summary = self.preview([line, "2023-01-31;Tx;-1.00;;;;0;0", line, line])
+
+        self.assertEqual(summary["duplicates"], 2)
+        self.assertEqual(summary["would_create"], 2)
+
+    def test_preview_counts_not_assigned(self):
+        """Rows falling back to 'Not assigned' are counted"""
+        self.outflow_subtype.delete()
+
+        summary = self.preview(
+            ["2023-01-01;Tx;-10.00;;;;0;0", "2023-01-02;Tx;10.00;;;;0;0"]
+        )
+
+        self.assertEqual(summary["not_assigned"], 1)
+
+    def test_random_files_match_import(self):
+        """Randomised files classify exactly like the row-by-row importer"""
+        rng = random.Random(7)
+        notes = ["", "", "Coffee", "Rent", "Salary"]
+        isins = ["", "", "", ISIN, "DE0005140008"]
+        lines = []
+        day = date(2022, 1, 1)
+        for _ in range(500):
+            day += timedelta(days=rng.choice([0, 0, 1]))
+            amount = rng.choice([-25, -5, 0, 5, 40])
+            lines.append(
+                f"{day.isoformat()};Tx;{amount}.00;{rng.choice(notes)};"
+                f"{rng.choice(isins)};1;0;0"
+            )
+
+        self.assert_preview_matches_import(lines)
+
+    def test_preview_of_large_file_is_fast(self):
+        """100k rows are summarised in well under a second"""
+        start = date(2000, 1, 1)
+        lines = [
+            f"{start + timedelta(days=i // 100)};Tx;-{i % 97}.{i % 100:02d};"
+            f"Note {i % 500};;;0;0"
+            for i in range(100_000)
+        ]
+        upload = SimpleUploadedFile("big.csv", make_csv(lines))
+
+        preview = ImportPreview(self.user)
+        preview.add_csv(upload, self.bank_account)
+        summary = preview.as_dict()
+
+        self.assertEqual(summary["would_create"], 100_000)
+        self.assertLess(summary["elapsed_seconds"], 1.0)
+
+
+class ImportPreviewAPITestCase(ImporterTestMixin, APITestCase):
+    """Test cases for preview uploads"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+
+    def test_preview_upload_writes_nothing(self):
+        """A preview upload returns the summary without queueing a job"""
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile(
+                    "t.csv", make_csv(["2023-01-01;Tx;-10.00;Coffee;;;0;0"])
+                ),
+                "bank_account": self.bank_account.id,
+                "preview": "true",
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["would_create"], 1)
+        self.assertEqual(response.data["subtypes"][0]["name"], "Outflow")
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_preview_archive(self):
+        """Archive previews cover every mapped file"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("a.csv", make_csv(["2023-01-01;Tx;-10.00;;;;0;0"]))
+            archive.writestr("b.csv", make_csv(["2023-01-01;Tx;10.00;;;;0;0"]))
+
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile("export.zip", buffer.getvalue()),
+                "bank_account": self.bank_account.id,
+                "preview": "true",
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["would_create"], 2)
+
+    def test_preview_rejects_invalid_rows(self):
+        """Unparseable files are reported as errors"""
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile(
+                    "t.csv", make_csv(["not a date;Tx;-10.00;;;;0;0"])
+                ),
+                "bank_account": self.bank_account.id,
+                "preview": "true",
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
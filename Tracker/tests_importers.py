@@ -0,0 +1,415 @@
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .importers import SubtypeClassifier, TransactionImporter
+from .models import (
+    BankAccount,
+    SyncVersion,
+    Transaction,
+    TransactionSubType,
+    TransactionType,
+)
+
+HEADER = "Date;Description;Amount;Note;ISIN;Quantity;Fee;Tax"
+
+
+def make_csv(lines):
+    return "\n".join([HEADER] + lines).encode("utf-8")
+
+
+class TemporaryMediaMixin:
+    """Store the uploads of the test class in a MEDIA_ROOT removed afterwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+
+class ImporterTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.bank_account = BankAccount.objects.create(
+            user=self.user, name="Test Account", account_type="trade_republic"
+        )
+
+        income_type = TransactionType.objects.create(name="Income", expense_factor=1)
+        expense_type = TransactionType.objects.create(name="Expense", expense_factor=-1)
+
+        self.inflow_subtype = TransactionSubType.objects.create(
+            transaction_type=income_type, name="Inflow"
+        )
+        self.outflow_subtype = TransactionSubType.objects.create(
+            transaction_type=expense_type, name="Outflow"
+        )
+        self.buy_subtype = TransactionSubType.objects.create(
+            transaction_type=expense_type, name="Stock/ETF/Bond Purchase"
+        )
+        self.sell_subtype = TransactionSubType.objects.create(
+            transaction_type=income_type, name="Investment Returns"
+        )
+        self.not_assigned_subtype = TransactionSubType.objects.create(
+            transaction_type=expense_type, name="Not assigned"
+        )
+        self.custom_subtype = TransactionSubType.objects.create(
+            transaction_type=expense_type, name="Groceries"
+        )
+
+
+class TransactionImporterTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the bulk CSV import engine"""
+
+    def test_import_rows_in_multiple_batches(self):
+        """Rows spanning several batches are all written"""
+        lines = [f"2023-01-{day:02d};Tx;-{day}.00;Note {day};;;0;0" for day in range(1, 26)]
+        importer = TransactionImporter(self.user, self.bank_account, batch_size=7)
+
+        result = importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+        self.assertEqual(result.created_count, 25)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 25)
+        self.assertTrue(
+            Transaction.objects.filter(bank_account=self.bank_account).exists()
+        )
+
+    def test_subtype_copied_from_existing_note(self):
+        """A note that was already categorized keeps its subtype"""
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            amount=-10,
+            note="Supermarket",
+            transaction_subtype=self.custom_subtype,
+        )
+        importer = TransactionImporter(self.user, self.bank_account)
+
+        importer.import_csv(
+            SimpleUploadedFile(
+                "t.csv", make_csv(["2023-02-01;Tx;-20.00;Supermarket;;;0;0"])
+            )
+        )
+
+        imported = Transaction.objects.get(user=self.user, amount=-20)
+        self.assertEqual(imported.transaction_subtype, self.custom_subtype)
+
+    def test_rows_of_same_batch_see_each_other(self):
+        """Later rows reuse the subtype of an earlier row in the same file"""
+        lines = [
+            "2023-01-01;Tx;-100.00;ETF buy;IE00B4L5Y983;1;0;0",
+            "2023-01-02;Tx;-50.00;Another ETF buy;IE00B4L5Y983;1;0;0",
+            "2023-01-03;Tx;-5.00;ETF buy;;;0;0",
+        ]
+        importer = TransactionImporter(self.user, self.bank_account, batch_size=100)
+
+        importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+        # The note "ETF buy" was first used by a stock purchase in this file
+        regular = Transaction.objects.get(user=self.user, amount=-5)
+        self.assertEqual(regular.transaction_subtype, self.buy_subtype)
+
+    def test_failed_row_rolls_back_whole_import(self):
+        """An invalid row leaves no partially imported batches behind"""
+        lines = [
+            "2023-01-01;Tx;-1.00;A;;;0;0",
+            "2023-01-02;Tx;-2.00;B;;;0;0",
+            "not-a-date;Tx;-3.00;C;;;0;0",
+        ]
+        importer = TransactionImporter(self.user, self.bank_account, batch_size=1)
+
+        with self.assertRaises(ValueError):
+            importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 0)
+
+
+class FingerprintReimportTestCase(ImporterTestMixin, TestCase):
+    """Test cases for skipping already imported rows"""
+
+    def import_lines(self, lines, batch_size=100):
+        importer = TransactionImporter(
+            self.user, self.bank_account, batch_size=batch_size
+        )
+        return importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+    def test_reimporting_same_file_creates_nothing(self):
+        """A second upload of the same export only skips rows"""
+        lines = [f"2023-01-{day:02d};Tx;-{day}.00;Note {day};;;0;0" for day in range(1, 11)]
+
+        first = self.import_lines(lines)
+        second = self.import_lines(lines)
+
+        self.assertEqual(first.created_count, 10)
+        self.assertEqual(second.created_count, 0)
+        self.assertEqual(second.skipped_count, 10)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 10)
+
+    def test_overlapping_export_imports_only_new_rows(self):
+        """Rows shared by two monthly exports are imported once"""
+        january = [f"2023-01-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(1, 21)]
+        overlap = january[10:] + [
+            f"2023-02-{day:02d};Tx;-{day}.00;Rent;;;0;0" for day in range(1, 6)
+        ]
+
+        self.import_lines(january, batch_size=4)
+        result = self.import_lines(overlap, batch_size=4)
+
+        self.assertEqual(result.created_count, 5)
+        self.assertEqual(result.skipped_count, 10)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 25)
+
+    def test_identical_rows_in_one_file_are_kept(self):
+        """Two equal payments on the same day are both imported"""
+        lines = ["2023-01-01;Tx;-3.50;Coffee;;;0;0"] * 2
+
+        first = self.import_lines(lines)
+        second = self.import_lines(lines)
+
+        self.assertEqual(first.created_count, 2)
+        self.assertEqual(second.created_count, 0)
+
+    def test_interleaved_identical_rows_are_kept(self):
+        """Equal payments of one day are kept in exports not sorted by date"""
+        coffee = "2023-01-01;Tx;-3.50;Coffee;;;0;0"
+        lines = [coffee, "2023-01-02;Tx;-9.00;Lunch;;;0;0", coffee, coffee]
+
+        for batch_size in (100, 1):
+            with self.subTest(batch_size=batch_size):
+                Transaction.objects.filter(user=self.user).delete()
+                first = self.import_lines(lines, batch_size=batch_size)
+                second = self.import_lines(lines[1:] + lines[:1])
+
+                self.assertEqual(first.created_count, 4)
+                self.assertEqual(second.created_count, 0)
+                self.assertEqual(Transaction.objects.filter(note="Coffee").count(), 3)
+
+    def test_same_rows_in_other_account_are_imported(self):
+        """Fingerprints are unique per account, not globally"""
+        other_account = BankAccount.objects.create(user=self.user, name="Other")
+        lines = ["2023-01-01;Tx;-3.50;Coffee;;;0;0"]
+
+        self.import_lines(lines)
+        result = TransactionImporter(self.user, other_account).import_csv(
+            SimpleUploadedFile("t.csv", make_csv(lines))
+        )
+
+        self.assertEqual(result.created_count, 1)
+
+    def test_manual_transactions_have_no_fingerprint(self):
+        """Transactions created outside the importer may repeat freely"""
+        for _ in range(2):
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=self.bank_account,
+                amount=-1,
+                transaction_subtype=self.outflow_subtype,
+            )
+
+        self.assertEqual(
+            Transaction.objects.filter(user=self.user, fingerprint="").count(), 2
+        )
+
+
+class SubtypeClassifierTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the preloaded import classifier"""
+
+    def test_classifier_loads_maps_in_four_queries(self):
+        """Subtypes, rules, ISIN history and note history are one query each"""
+        with self.assertNumQueries(4):
+            SubtypeClassifier(self.user)
+
+    def test_classify_does_not_touch_database(self):
+        """Classifying rows only uses the preloaded maps"""
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            amount=-10,
+            note="Supermarket",
+            transaction_subtype=self.custom_subtype,
+        )
+        classifier = SubtypeClassifier(self.user)
+
+        with self.assertNumQueries(0):
+            by_note = classifier.classify("", -5.0, "Supermarket")
+            default_out = classifier.classify("", -5.0, "Kiosk")
+            default_in = classifier.classify("", 5.0, "")
+            stock_buy = classifier.classify("US0378331005", -100.0, "")
+            stock_sell = classifier.classify("US0378331005", 100.0, "")
+
+        self.assertEqual(by_note, self.custom_subtype.id)
+        self.assertEqual(default_out, self.outflow_subtype.id)
+        self.assertEqual(default_in, self.inflow_subtype.id)
+        self.assertEqual(stock_buy, self.buy_subtype.id)
+        self.assertEqual(stock_sell, self.sell_subtype.id)
+
+    def test_isin_history_respects_amount_sign(self):
+        """Buys and sells of the same ISIN are matched separately"""
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            amount=-100,
+            isin="US0378331005",
+            transaction_subtype=self.custom_subtype,
+        )
+        classifier = SubtypeClassifier(self.user)
+
+        self.assertEqual(
+            classifier.classify("US0378331005", -1.0, ""), self.custom_subtype.id
+        )
+        self.assertEqual(
+            classifier.classify("US0378331005", 1.0, ""), self.sell_subtype.id
+        )
+
+    def test_classified_rows_update_maps(self):
+        """A note seen earlier in the same file is reused"""
+        classifier = SubtypeClassifier(self.user)
+        classifier.remember("", -1.0, "Gym", self.custom_subtype.id)
+
+        self.assertEqual(classifier.classify("", -30.0, "Gym"), self.custom_subtype.id)
+
+    def test_falls_back_to_not_assigned(self):
+        """Missing default subtypes fall back to 'Not assigned'"""
+        self.outflow_subtype.delete()
+        classifier = SubtypeClassifier(self.user)
+
+        self.assertEqual(
+            classifier.classify("", -1.0, ""), self.not_assigned_subtype.id
+        )
+
+    def test_import_query_count_is_independent_of_row_count(self):
+        """Importing more rows does not issue more classification queries"""
+        lines = [f"2023-01-01;Tx;-{i}.00;Note {i % 3};;;0;0" for i in range(1, 41)]
+        importer = TransactionImporter(self.user, self.bank_account, batch_size=100)
+
+        SyncVersion.objects.next_version(self.user.id)
+
+        # savepoint + release, the fingerprint lookup, the version bump
+        # (UPDATE + SELECT), a single bulk INSERT, the monthly rollups
+        # (SELECT + INSERT), the outdated balance snapshots (DELETE) and their
+        # refresh (savepoint + release, lock, latest, rollups, INSERT)
+        with self.assertNumQueries(15):
+            importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+
+
+class StreamingImportMemoryTestCase(ImporterTestMixin, TestCase):
+    """Test cases for the bounded memory use of the streaming importer"""
+
+    # Ceiling for the traced Python heap while importing. The test database is
+    # an in-memory SQLite database whose pages live outside the Python heap,
+    # so process RSS would grow with the stored rows rather than the importer.
+    MEMORY_CEILING_BYTES = 32 * 1024 * 1024
+
+    def write_csv(self, directory, row_count):
+        path = os.path.join(directory, f"{row_count}.csv")
+        start = date(2000, 1, 1)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(HEADER + "\n")
+            for i in range(row_count):
+                day = (start + timedelta(days=i // 100)).isoformat()
+                if i % 10 == 0:
+                    f.write(f"{day};Buy;-{i}.50;Savings plan;IE00B4L5Y983;0.5;1.00;0\n")
+                else:
+                    f.write(f"{day};Card;-{i}.99;Shop {i % 50};;;0;0\n")
+        return path
+
+    def import_and_measure(self, path):
+        importer = TransactionImporter(self.user, self.bank_account, batch_size=1000)
+        with open(path, "rb") as f:
+            # Start from a clean heap, so when the collector runs during the
+            # import depends on the import and not on the tests before it
+            gc.collect()
+            tracemalloc.start()
+            try:
+                result = importer.import_csv(File(f, name=os.path.basename(path)))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        return result, peak
+
+    def test_peak_memory_does_not_grow_with_file_size(self):
+        """Importing five times more rows needs about the same memory"""
+        with tempfile.TemporaryDirectory() as directory:
+            small_result, small_peak = self.import_and_measure(
+                self.write_csv(directory, 2000)
+            )
+            Transaction.objects.filter(user=self.user).delete()
+            large_result, large_peak = self.import_and_measure(
+                self.write_csv(directory, 10000)
+            )
+
+        self.assertEqual(small_result.created_count, 2000)
+        self.assertEqual(large_result.created_count, 10000)
+        self.assertLess(large_peak, small_peak * 1.5)
+
+    @skipUnless(
+        os.environ.get("TRACKER_RUN_SLOW_TESTS"),
+        "set TRACKER_RUN_SLOW_TESTS=1 to import a generated 1M-row file",
+    )
+    def test_one_million_rows_under_memory_ceiling(self):
+        """A generated 1M-row file imports under a fixed memory ceiling"""
+        with tempfile.TemporaryDirectory() as directory:
+            result, peak = self.import_and_measure(self.write_csv(directory, 1000000))
+
+        self.assertEqual(result.created_count, 1000000)
+        self.assertLess(peak, self.MEMORY_CEILING_BYTES)
+
+
+@override_settings(IMPORT_JOBS_EAGER=True)
+class CSVUploadThroughputTestCase(
+    TemporaryMediaMixin, ImporterTestMixin, APITestCase
+):
+    """Test cases for the import statistics returned by the upload endpoint"""
+
+    def test_upload_reports_throughput(self):
+        """The job includes elapsed time and rows per second"""
+        self.client.login(username="testuser", password="testpass123")
+        lines = [f"2023-03-{day:02d};Tx;{day}.00;Salary;;;0;0" for day in range(1, 11)]
+
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile("t.csv", make_csv(lines)),
+                "bank_account": self.bank_account.id,
+                "batch_size": 3,
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["created_count"], 10)
+        self.assertEqual(response.data["rows_processed"], 10)
+        self.assertIn("rows_per_second", response.data)
+        self.assertIn("elapsed_seconds", response.data)
+
+    def test_upload_rejects_invalid_batch_size(self):
+        """A batch size below one is rejected"""
+        self.client.login(username="testuser", password="testpass123")
+
+        response = self.client.post(
+            "/api/upload-csv/",
+            {
+                "file": SimpleUploadedFile("t.csv", make_csv([])),
+                "bank_account": self.bank_account.id,
+                "batch_size": 0,
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Transaction
+from .pagination import KeysetPagination
+from .tests_importers import ImporterTestMixin
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TransactionPaginationTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for keyset pagination of the transaction list"""
+
+    def setUp(self):
+        super().setUp()
+        # Three rows per timestamp, so pages have to split ties on the id
+        Transaction.objects.bulk_create(
+            Transaction(
+                user=self.user,
+                bank_account=self.bank_account,
+                transaction_subtype=self.outflow_subtype,
+                amount=-index,
+                created_at=START + timedelta(days=index // 3),
+                note=f"Row {index}",
+            )
+            for index in range(25)
+        )
+        self.client.login(username="testuser", password="testpass123")
+
+    def expected_ids(self):
+        return list(
+            Transaction.objects.order_by("created_at", "id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def test_pages_cover_every_row_once(self):
+        """Following next links returns all rows in (created_at, id) order"""
+        ids = []
+        url = "/api/transactions/?page_size=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.json()["results"]), 4)
+            ids.extend(row["id"] for row in response.json()["results"])
+            url = response.json()["next"]
+
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_previous_link(self):
+        """Previous links page backwards to the first page"""
+        first = self.client.get("/api/transactions/?page_size=4")
+        second = self.client.get(first.json()["next"])
+
+        self.assertIsNone(first.json()["previous"])
+        back = self.client.get(second.json()["previous"])
+
+        self.assertEqual(back.json()["results"], first.json()["results"])
+        self.assertIsNotNone(back.json()["next"])
+
+    def test_pages_use_the_cursor_instead_of_offset(self):
+        """Deep pages seek to the cursor, so every page is one limited query"""
+        page = self.client.get("/api/transactions/?page_size=4")
+        for _ in range(4):
+            page = self.client.get(page.json()["next"])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(page.json()["next"])
+
+        sql = [
+            query["sql"]
+            for query in queries
+            if '"tracker_transaction"' in query["sql"].lower()
+        ]
+        self.assertEqual(len(sql), 1)
+        self.assertIn("LIMIT 5", sql[0])
+        self.assertNotIn("OFFSET", sql[0])
+
+    def test_all_returns_plain_list(self):
+        """?all=true keeps the unpaginated response for existing clients"""
+        response = self.client.get("/api/transactions/?all=true")
+
+        self.assertEqual([row["id"] for row in response.json()], self.expected_ids())
+
+    def test_page_size_is_capped(self):
+        """Clients cannot ask for more than max_page_size rows"""
+        with patch.object(KeysetPagination, "max_page_size", 10):
+            response = self.client.get("/api/transactions/?page_size=100000")
+
+        self.assertEqual(len(response.json()["results"]), 10)
+        self.assertIsNotNone(response.json()["next"])
+
+    def test_filter_is_applied_before_paging(self):
+        """The subtype filter narrows the rows that are paged"""
+        Transaction.objects.filter(amount__lte=-20).update(
+            transaction_subtype=self.custom_subtype
+        )
+
+        response = self.client.get(
+            f"/api/transactions/?transaction_subtype={self.custom_subtype.id}"
+        )
+
+        self.assertEqual(len(response.json()["results"]), 5)
+
+    def test_invalid_cursor(self):
+        """A tampered cursor is a 404 like in DRF's own cursor pagination"""
+        response = self.client.get("/api/transactions/?cursor=bm9wZQ")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,199 @@
+import re
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .categorization import apply_rules
+from .importers import SubtypeClassifier, TransactionImporter
+from .models import (
+    Budget,
+    CategorizationRule,
+    Transaction,
+    TransactionTombstone,
+)
+from .tests_importers import ImporterTestMixin, make_csv
+
+# A plan line reading the whole transaction table, with or without an index
+FULL_SCAN = re.compile(r"^SCAN (\"?)Tracker_transaction\b\1", re.IGNORECASE)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite")
+class QueryPlanTestCase(ImporterTestMixin, TestCase):
+    """Hot transaction queries must seek in an index, never scan the table"""
+
+    def setUp(self):
+        super().setUp()
+        created_at = datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc)
+        for day, (subtype, amount, note, isin) in enumerate(
+            [
+                (self.buy_subtype, "-500", "Kauf", "IE00B4L5Y983"),
+                (self.sell_subtype, "250", "Verkauf", "IE00B4L5Y983"),
+                (self.outflow_subtype, "-42.50", "REWE Markt", ""),
+            ]
+        ):
+            Transaction.objects.create(
+                user=self.user,
+                bank_account=self.bank_account,
+                transaction_subtype=subtype,
+                amount=Decimal(amount),
+                created_at=created_at + timedelta(days=day),
+                note=note,
+                isin=isin,
+                quantity=Decimal("2") if isin else None,
+            )
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, sql, params=()):
+        plan = self.explain(sql, params)
+        scans = [line for line in plan if FULL_SCAN.match(line)]
+        self.assertEqual(scans, [], f"{sql}\n" + "\n".join(plan))
+        return plan
+
+    def assertUsesIndex(self, queryset, index_name):
+        """The queryset's plan seeks in ``index_name``"""
+        plan = self.assertNoFullScan(*queryset.query.sql_with_params())
+        self.assertTrue(
+            any(f"INDEX {index_name} " in line for line in plan), "\n".join(plan)
+        )
+
+    def assertQueriesIndexed(self, func):
+        """Every transaction query run by ``func`` seeks in an index"""
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        selects = [
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith("SELECT")
+            and "tracker_transaction" in query["sql"].lower()
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(sql=sql):
+                self.assertNoFullScan(sql)
+
+    def test_importer_lookups(self):
+        """Classifier maps and the duplicate check stay on indexes"""
+        lines = [
+            "2024-04-01;Kauf;-100.00;Kauf;IE00B4L5Y983;1;1;0",
+            "2024-04-02;Lastschrift;-9.99;Spotify;;;0;0",
+        ]
+        importer = TransactionImporter(self.user, self.bank_account)
+
+        self.assertQueriesIndexed(
+            lambda: importer.import_csv(SimpleUploadedFile("t.csv", make_csv(lines)))
+        )
+        self.assertUsesIndex(
+            Transaction.objects.filter(
+                user=self.user,
+                bank_account=self.bank_account,
+                fingerprint__in=["a", "b"],
+            ).exclude(fingerprint=""),
+            "unique_transaction_fingerprint_per_account",
+        )
+
+    def test_classifier_maps(self):
+        """The per-import maps read only the user's transactions"""
+        self.assertQueriesIndexed(
+            lambda: (
+                SubtypeClassifier.load_isin_subtype_ids(self.user),
+                SubtypeClassifier.load_note_subtype_ids(self.user),
+            )
+        )
+
+    def test_bulk_updates(self):
+        """Bulk subtype updates seek by (user, note) and (user, isin, amount)"""
+        self.assertUsesIndex(
+            Transaction.objects.filter(user=self.user, note="REWE Markt"),
+            "transaction_user_note_idx",
+        )
+        self.assertUsesIndex(
+            Transaction.objects.filter(
+                user=self.user, isin="IE00B4L5Y983", amount__gt=0
+            ),
+            "transaction_isin_amount_idx",
+        )
+
+    def test_portfolio(self):
+        """Holdings group by (user, isin), charts read one ISIN in date order"""
+        holdings = (
+            Transaction.objects.filter(user=self.user, isin__isnull=False)
+            .exclude(isin="")
+            .values("isin")
+            .annotate(
+                net_quantity=Sum("quantity"), total_invested=Sum(F("amount") * -1)
+            )
+        )
+        self.assertNoFullScan(*holdings.query.sql_with_params())
+        self.assertUsesIndex(
+            Transaction.objects.filter(user=self.user, isin="IE00B4L5Y983").order_by(
+                "created_at"
+            ),
+            "transaction_isin_date_idx",
+        )
+        self.assertQueriesIndexed(
+            lambda: Transaction.objects.filter(
+                user=self.user, isin="IE00B4L5Y983"
+            ).aggregate(total=Sum("quantity"))
+        )
+
+    def test_budget_spent_amount(self):
+        """Budgets seek the period in (user, created_at)"""
+        budget = Budget.objects.create(
+            user=self.user, name="Food", limit_amount=Decimal("300")
+        )
+        budget.transaction_subtypes.add(self.outflow_subtype)
+
+        self.assertQueriesIndexed(budget.get_spent_amount)
+        self.assertUsesIndex(
+            Transaction.objects.filter(
+                user=self.user,
+                created_at__gte=budget.get_current_period_start(),
+                created_at__lt=budget.get_current_period_end(),
+            ),
+            "transaction_user_created_idx",
+        )
+
+    def test_apply_rules(self):
+        """Rules read distinct notes and update by (user, note)"""
+        CategorizationRule.objects.create(
+            user=self.user, pattern="rewe", transaction_subtype=self.custom_subtype
+        )
+        self.assertQueriesIndexed(lambda: apply_rules(self.user))
+
+    def test_changes(self):
+        """Delta syncs seek the changed rows and tombstones by version"""
+        self.assertUsesIndex(
+            Transaction.objects.filter(user=self.user, version__gt=2),
+            "transaction_version_idx",
+        )
+        self.assertUsesIndex(
+            TransactionTombstone.objects.filter(user=self.user, version__gt=2),
+            "tombstone_version_idx",
+        )
+
+    def test_transaction_list(self):
+        """List pages, filters and cursors seek in the list indexes"""
+        self.client.login(username="testuser", password="testpass123")
+
+        def browse():
+            first = self.client.get("/api/transactions/?page_size=1").json()
+            self.client.get(first["next"])
+            for query in [
+                f"bank_account={self.bank_account.id}",
+                f"transaction_subtype={self.buy_subtype.id}",
+                "isin=IE00B4L5Y983",
+                "start_date=2024-03-02&end_date=2024-03-02",
+            ]:
+                self.client.get(f"/api/transactions/?{query}")
+
+        self.assertQueriesIndexed(browse)
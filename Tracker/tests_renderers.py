@@ -0,0 +1,149 @@
+import gzip
+import json
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from .middleware import COMPRESSORS, CompressionMiddleware, negotiate_encoding
+from .models import Transaction
+from .renderers import FastJSONRenderer, JsonResponse, dumps, orjson
+from .tests_importers import ImporterTestMixin
+
+
+class RendererTestCase(SimpleTestCase):
+    """Test cases for the JSON encoder behind the API responses"""
+
+    data = {
+        "amount": Decimal("-42.50"),
+        "created_at": datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        "note": "Café \u2028 Kuchen",
+        "history": [[1714555815000, 80.25], [1714642215000, None]],
+        "ids": {1: "Giro"},
+    }
+
+    def test_dumps_matches_json(self):
+        """Both encoders write the same document"""
+        self.assertEqual(
+            json.loads(dumps(self.data)),
+            json.loads(JsonResponse(self.data, json_dumps_params={}).content),
+        )
+        self.assertEqual(json.loads(dumps(self.data))["amount"], "-42.50")
+        self.assertEqual(
+            json.loads(dumps(self.data))["created_at"], "2024-05-01T09:30:15.123Z"
+        )
+        self.assertEqual(dumps({"big": 2**70}), b'{"big":1180591620717411303424}')
+
+    @unittest.skipUnless(orjson, "orjson is not installed")
+    def test_non_finite_floats(self):
+        """orjson writes NaN as null, which JSON.parse accepts"""
+        self.assertEqual(dumps([float("nan")]), b"[null]")
+
+    def test_drf_renderer(self):
+        """Same bytes as DRF's renderer, indented output is left to it"""
+        renderer, fast = JSONRenderer(), FastJSONRenderer()
+
+        self.assertEqual(fast.render(self.data), renderer.render(self.data))
+        self.assertIn(b"\\u2028", fast.render(self.data))
+        self.assertEqual(
+            fast.render(self.data, "application/json; indent=2"),
+            renderer.render(self.data, "application/json; indent=2"),
+        )
+        self.assertEqual(fast.render(None), b"")
+
+    def test_json_response(self):
+        """A drop-in for django.http.JsonResponse"""
+        response = JsonResponse({"holdings": []}, status=201)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, b'{"holdings":[]}')
+        with self.assertRaises(TypeError):
+            JsonResponse([1, 2])
+
+    def test_negotiate_encoding(self):
+        """The client's q-values win, ties go to the server's preference"""
+        codings = ["br", "gzip"]
+        for header, expected in [
+            ("gzip, deflate, br", "br"),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("*", "br"),
+            ("*;q=0.1, gzip;q=0", "br"),
+            ("identity", None),
+            ("", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(negotiate_encoding(header, codings), expected)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=500)
+class CompressionTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the negotiated response compression"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        Transaction.objects.bulk_create(
+            Transaction(
+                user=self.user,
+                bank_account=self.bank_account,
+                transaction_subtype=self.outflow_subtype,
+                amount=Decimal(-i),
+                note=f"Kaffee {i}",
+            )
+            for i in range(20)
+        )
+
+    def test_large_responses_are_compressed(self):
+        """Lists above the threshold are gzipped for clients accepting it"""
+        plain = self.client.get("/api/transactions/?all=true")
+        response = self.client.get(
+            "/api/transactions/?all=true", HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertTrue(response["ETag"].startswith("W/"))
+
+        revalidated = self.client.get(
+            "/api/transactions/?all=true",
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_small_and_refused(self):
+        """Small responses and refused codings are sent as they are"""
+        small = self.client.get("/api/bankaccounts/", HTTP_ACCEPT_ENCODING="gzip")
+        refused = self.client.get(
+            "/api/transactions/?all=true", HTTP_ACCEPT_ENCODING="gzip;q=0"
+        )
+
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(len(refused.json()), 20)
+
+    def test_csrf_responses_are_not_brotli_compressed(self):
+        """Responses that may carry a CSRF token are only gzipped"""
+        middleware = CompressionMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br, gzip;q=0.5")
+        plain, with_token = HttpResponse(b"a" * 1000), HttpResponse(b"a" * 1000)
+        with_token.set_cookie(settings.CSRF_COOKIE_NAME, "token")
+
+        with patch.dict(COMPRESSORS, {"br": lambda content: b"br"}):
+            plain = middleware.process_response(request, plain)
+            with_token = middleware.process_response(request, with_token)
+
+        self.assertEqual(plain["Content-Encoding"], "br")
+        self.assertEqual(with_token["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(with_token.content), b"a" * 1000)
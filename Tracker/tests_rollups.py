@@ -0,0 +1,201 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .categorization import apply_rules
+from .filters import TransactionFilter
+from .importers import TransactionImporter
+from .models import CategorizationRule, MonthlyRollup, Transaction
+from .tests_importers import ImporterTestMixin, make_csv
+
+
+def aware(value):
+    return timezone.make_aware(datetime.fromisoformat(value))
+
+
+class MonthlyRollupTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the incrementally maintained monthly rollups"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="testuser", password="testpass123")
+        self.rent = self.create("2024-05-01 00:00", "-900", note="Miete")
+        self.create("2024-05-31 23:59", "-45.50", note="Kaffee", fee="0.50")
+        self.create("2024-06-15", "2500", subtype=self.inflow_subtype, tax="12.25")
+
+    def create(self, created_at, amount, subtype=None, **fields):
+        return Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            transaction_subtype=subtype or self.outflow_subtype,
+            amount=Decimal(amount),
+            created_at=aware(created_at),
+            note=fields.pop("note", ""),
+            **{name: Decimal(value) for name, value in fields.items()},
+        )
+
+    def rollups(self):
+        return set(
+            MonthlyRollup.objects.values_list(
+                "transaction_subtype_id", "month", "amount", "count", "fees", "taxes"
+            )
+        )
+
+    def assertRollupsCurrent(self):
+        rollups = self.rollups()
+        MonthlyRollup.objects.rebuild()
+        self.assertEqual(rollups, self.rollups())
+
+    def test_save_and_delete(self):
+        """Creates, edits that move rows between months, and deletes"""
+        self.assertEqual(
+            self.rollups(),
+            {
+                (
+                    self.outflow_subtype.id,
+                    date(2024, 5, 1),
+                    Decimal("-945.50"),
+                    2,
+                    Decimal("0.50"),
+                    Decimal("0.00"),
+                ),
+                (
+                    self.inflow_subtype.id,
+                    date(2024, 6, 1),
+                    Decimal("2500.00"),
+                    1,
+                    Decimal("0.00"),
+                    Decimal("12.25"),
+                ),
+            },
+        )
+
+        self.rent.created_at = aware("2024-04-30 23:00")
+        self.rent.amount = Decimal("-950")
+        self.rent.save()
+        self.assertRollupsCurrent()
+
+        self.rent.note = "Miete April"
+        self.rent.save(update_fields=["note"])
+        self.rent.delete()
+        self.assertRollupsCurrent()
+        self.assertFalse(MonthlyRollup.objects.filter(month=date(2024, 4, 1)))
+
+    def test_unique_without_account(self):
+        """Rollups without an account are unique per subtype and month too"""
+        fields = {
+            "user": self.user,
+            "transaction_subtype": self.outflow_subtype,
+            "month": date(2024, 5, 1),
+        }
+        MonthlyRollup.objects.create(**fields)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MonthlyRollup.objects.create(**fields)
+
+    def test_bulk_writes(self):
+        """Imports, bulk subtype updates, batches, rules and queryset deletes"""
+        lines = [f"2024-0{month}-10;Tx;-{month}.00;Abo;;;0;0" for month in (5, 7)]
+        TransactionImporter(self.user, self.bank_account).import_csv(
+            SimpleUploadedFile("t.csv", make_csv(lines))
+        )
+        self.assertRollupsCurrent()
+
+        self.client.patch(
+            "/api/transactions/bulk_update_by_note/",
+            {"note": "Abo", "transaction_subtype": self.custom_subtype.id},
+        )
+        self.assertRollupsCurrent()
+
+        self.client.post(
+            "/api/transactions/batch/",
+            [{"op": "update", "id": self.rent.id, "data": {"amount": "-1000"}}],
+            format="json",
+        )
+        self.assertRollupsCurrent()
+
+        CategorizationRule.objects.create(
+            user=self.user,
+            match_type="prefix",
+            pattern="Kaffee",
+            transaction_subtype=self.custom_subtype,
+        )
+        apply_rules(self.user)
+        self.assertRollupsCurrent()
+
+        Transaction.objects.filter(note="Abo").delete()
+        self.assertRollupsCurrent()
+        self.assertFalse(MonthlyRollup.objects.filter(month=date(2024, 7, 1)))
+
+    def test_rebuild_command(self):
+        """Drift from writes past the models is repaired"""
+        rollups = self.rollups()
+        MonthlyRollup.objects.filter(month=date(2024, 5, 1)).update(amount=0, count=9)
+        out = StringIO()
+
+        call_command("rebuild_rollups", "--user", "testuser", stdout=out)
+
+        self.assertEqual(self.rollups(), rollups)
+        self.assertIn("Rebuilt 2 monthly rollups", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("rebuild_rollups", "--user", "nobody", stdout=out)
+
+    def test_sum_amount(self):
+        """Whole months come from the rollups, the days around them do not"""
+        self.create("2024-07-02", "-10")
+        # Stale on purpose, a whole-month read shows it
+        MonthlyRollup.objects.filter(month=date(2024, 6, 1)).update(amount=1)
+
+        def sum_amount(start, end, **filters):
+            return MonthlyRollup.objects.sum_amount(
+                self.user, aware(start), aware(end), **filters
+            )
+
+        self.assertEqual(sum_amount("2024-05-01", "2024-07-01"), Decimal("-944.50"))
+        self.assertEqual(sum_amount("2024-05-15", "2024-07-03"), Decimal("-54.50"))
+        self.assertEqual(sum_amount("2024-06-16", "2024-06-30"), 0)
+        self.assertEqual(
+            sum_amount(
+                "2024-04-01",
+                "2024-08-01",
+                transaction_subtype__transaction_type__expense_factor=-1,
+            ),
+            Decimal("-955.50"),
+        )
+
+    def test_filter_rollups(self):
+        """Only filters the rollups can answer exactly are applied to them"""
+        rollups = MonthlyRollup.objects.filter(user=self.user)
+
+        def filtered(query):
+            return TransactionFilter(QueryDict(query)).filter_rollups(rollups)
+
+        self.assertEqual(filtered("start_date=2024-06-01").count(), 1)
+        self.assertEqual(filtered("end_date=2024-05-31").count(), 1)
+        self.assertEqual(
+            filtered(f"transaction_subtype={self.inflow_subtype.id}").count(), 1
+        )
+        for query in ["start_date=2024-06-02", "end_date=2024-06-29", "note=Miete"]:
+            with self.subTest(query=query):
+                self.assertIsNone(filtered(query))
+
+    def test_summary_from_rollups(self):
+        """The analytics summary reads subtype totals from the rollups"""
+        expected = self.client.get(
+            "/api/analytics/summary", {"note": "", "min_amount": "-100000"}
+        ).json()
+        MonthlyRollup.objects.update(count=7)
+
+        summary = self.client.get("/api/analytics/summary").json()
+
+        self.assertEqual(summary["amount"], expected["amount"])
+        self.assertEqual(summary["periods"], expected["periods"])
+        self.assertEqual(summary["count"], 14)
+        self.assertEqual(expected["count"], 3)
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import BankAccount, Transaction
+from .serializers import TransactionListWriter, TransactionSerializer
+from .tests_importers import ImporterTestMixin
+
+
+class TransactionListTestCase(ImporterTestMixin, APITestCase):
+    """Test cases for the values-based transaction list mode"""
+
+    def setUp(self):
+        super().setUp()
+        other_user = User.objects.create_user(username="other", password="x")
+        self.foreign_account = BankAccount.objects.create(
+            user=other_user, name="Shared"
+        )
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.bank_account,
+            transaction_subtype=self.buy_subtype,
+            amount=Decimal("-1234.5"),
+            created_at=datetime(2024, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+            note="Kauf",
+            isin="US0378331005",
+            quantity=Decimal("2.25"),
+            fee=Decimal("1"),
+            tax=None,
+        )
+        Transaction.objects.create(
+            user=self.user,
+            bank_account=self.foreign_account,
+            transaction_subtype=self.inflow_subtype,
+            amount=Decimal("0"),
+            created_at=datetime(2024, 3, 31, 23, 0, tzinfo=timezone.utc),
+            note="",
+        )
+        self.client.login(username="testuser", password="testpass123")
+
+    def expected(self):
+        queryset = Transaction.objects.filter(user=self.user).order_by(
+            "created_at", "id"
+        )
+        return [dict(row) for row in TransactionSerializer(queryset, many=True).data]
+
+    def test_matches_model_serializer(self):
+        """Paged and full lists render exactly like TransactionSerializer"""
+        for timezone_name in ["UTC", "Europe/Berlin"]:
+            with self.subTest(timezone=timezone_name), override_settings(
+                TIME_ZONE=timezone_name
+            ):
+                expected = self.expected()
+                page = self.client.get("/api/transactions/").json()["results"]
+                full = self.client.get("/api/transactions/?all=true").json()
+
+                self.assertEqual(page, expected)
+                self.assertEqual(full, expected)
+
+    def test_sparse_fieldset(self):
+        """?fields= limits the rendered fields, the cursor still works"""
+        response = self.client.get(
+            "/api/transactions/?fields=amount,bank_account_name&page_size=1"
+        )
+
+        body = response.json()
+        self.assertEqual(
+            body["results"],
+            [{"amount": "-1234.50", "bank_account_name": "Test Account"}],
+        )
+        second = self.client.get(body["next"]).json()
+        self.assertEqual(
+            second["results"], [{"amount": "0.00", "bank_account_name": "Shared"}]
+        )
+
+    def test_unknown_field(self):
+        """Unknown fields are rejected instead of silently dropped"""
+        response = self.client.get("/api/transactions/?fields=amount,password")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("password", response.json()["error"])
+
+    def test_browsable_api_uses_serializer(self):
+        """HTML requests still go through the regular serializer"""
+        response = self.client.get("/api/transactions/", HTTP_ACCEPT="text/html")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Kauf", response.content.decode())
+
+    def test_writer_accepts_raw_values(self):
+        """Raw SQLite values format like converted ones"""
+        writer = TransactionListWriter("created_at,amount,quantity")
+        created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        converted = [(created_at, 1, Decimal("12.50"), None)]
+        raw = [("2024-01-02 03:04:05", 1, 12.5, None)]
+
+        self.assertEqual(
+            writer.to_representation(converted, {}),
+            writer.to_representation(raw, {}),
+        )
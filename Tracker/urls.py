@@ -9,6 +9,21 @@ urlpatterns = [
     path("api/logout", views.logout_view, name="logout"),
     path("api/user", views.user, name="user"),
     path("api/register", views.register, name="register"),
+    path(
+        "api/transactions/export",
+        views.export_transactions,
+        name="export_transactions",
+    ),
+    path(
+        "api/analytics/summary",
+        views.AnalyticsSummaryView.as_view(),
+        name="analytics_summary",
+    ),
+    path(
+        "api/analytics/cashflow",
+        views.CashflowView.as_view(),
+        name="analytics_cashflow",
+    ),
     path("api/upload-csv/", CSVUploadView.as_view(), name="upload-csv"),
     path("api/portfolio/", views.portfolio_view, name="portfolio"),
     path("api/save-symbol/", views.save_symbol, name="save_symbol"),
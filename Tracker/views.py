@@ -8,6 +8,11 @@ from Tracker.models import (
     UserProvidedSymbol,
     BankAccount,
     Budget,
+    CategorizationRule,
+    ImportJob,
+    MonthlyRollup,
+    SyncVersion,
+    TransactionTombstone,
 )
 from .serializers import (
     GroupSerializer,
@@ -18,18 +23,33 @@ from .serializers import (
     CSVUploadSerializer,
     BankAccountSerializer,
     BudgetSerializer,
+    CategorizationRuleSerializer,
+    ImportJobSerializer,
+    TransactionListWriter,
 )
-from datetime import datetime
-from django.utils import timezone
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from .models import Transaction
-from .services import LedgerService
-import io
-import csv
-from django.http import JsonResponse
+from .services import LedgerService, TransactionBatch
+from .analytics import CashflowSeries, TransactionSummary
+from .balances import BalanceHistory
+from .categorization import apply_rules
+from .pagination import KeysetPagination
+from .etags import ConditionalListMixin
+from .exports import TransactionExport
+from .filters import TransactionFilter
+from .jobs import enqueue_import_job
+from .importers import bundle_uploads, plan_archive_import
+from .previews import ImportPreview
+from .renderers import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from django.views.decorators.csrf import ensure_csrf_cookie
 import json
 from django.views.decorators.http import require_http_methods
@@ -39,36 +59,17 @@ from django.db import models
 from django.db.models import Sum, F, Case, When
 from .stocks import get_history, fetch_multiple_prices, get_symbol_and_industry
 import asyncio
+import re
+from datetime import timedelta
+
+# Same test as Django's GZipMiddleware
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
 
 
 class CSVUploadView(APIView):
     serializer_class = CSVUploadSerializer
     parser_classes = [MultiPartParser, FormParser]
 
-    def get_transaction_subtype(self, is_stock: bool, amount: float):
-        try:
-            if not is_stock:  # ISIN empty
-                if amount < 0:
-                    return TransactionSubType.objects.get(
-                        name="Outflow"
-                    )  # Regular expense
-                else:
-                    return TransactionSubType.objects.get(
-                        name="Inflow"
-                    )  # Regular income
-            else:  # ISIN present
-                if amount < 0:
-                    return TransactionSubType.objects.get(
-                        name="Stock/ETF/Bond Purchase"
-                    )  # Savings for stocks
-                else:
-                    return TransactionSubType.objects.get(
-                        name="Investment Returns"
-                    )  # Income from Stocks
-        except TransactionSubType.DoesNotExist:
-            # Fallback to "Not assigned" subtype if specific ones don't exist
-            return TransactionSubType.objects.get(name="Not assigned")
-
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -80,175 +81,64 @@ class CSVUploadView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        csv_file = serializer.validated_data["file"]
-        bank_account = serializer.validated_data["bank_account"]
+        uploads = serializer.validated_data["uploads"]
+        bank_account = serializer.validated_data.get("bank_account")
+        batch_size = serializer.validated_data.get("batch_size")
 
         # Ensure the bank account belongs to the user
-        if bank_account.user != request.user:
+        if bank_account and bank_account.user != request.user:
             return Response(
                 {"error": "Bank account does not belong to user"},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Process CSV based on account type
-        if bank_account.account_type == "trade_republic":
-            created_count = self.process_trade_republic_csv(
-                request.user, csv_file, bank_account
-            )
-        elif bank_account.account_type == "volksbank":
-            created_count = self.process_volksbank_csv(
-                request.user, csv_file, bank_account
-            )
-        else:
-            # Default processing for accounts without specific type
-            created_count = self.process_default_csv(
-                request.user, csv_file, bank_account
-            )
+        upload = uploads[0]
+        is_archive = serializer.validated_data["is_archive"]
+        plan = None
+        if is_archive:
+            if len(uploads) > 1:
+                upload = bundle_uploads(uploads)
+            # Reject archives with unmapped files before queueing them
+            try:
+                plan = plan_archive_import(upload, request.user, bank_account)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if serializer.validated_data["preview"]:
+            # Dry run: report what the import would do and write nothing
+            preview = ImportPreview(request.user)
+            try:
+                if is_archive:
+                    preview.add_archive(upload, plan)
+                else:
+                    preview.add_csv(upload, bank_account)
+            except (ValueError, TransactionSubType.DoesNotExist) as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(preview.as_dict(), status=status.HTTP_200_OK)
+
+        # Parsing and inserting happens off the request path
+        job = enqueue_import_job(request.user, bank_account, upload, batch_size)
 
         return Response(
-            {"status": f"Imported {created_count} rows"}, status=status.HTTP_201_CREATED
+            ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
         )
 
-    def process_trade_republic_csv(self, user, csv_file, bank_account):
-        """Process Trade Republic CSV format"""
-        data = csv_file.read().decode("utf-8")
-        io_string = io.StringIO(data)
-        reader = csv.reader(io_string, delimiter=";")
-
-        # Skip header row manually
-        next(reader, None)
-
-        created_count = 0
-        for row in reader:
-            if not row:  # skip empty lines
-                continue
-
-            # Trade Republic specific processing
-            # Assuming format: Date;Type;Amount;Note;ISIN;Quantity;Fee;Tax
-            isin = row[4] if len(row) > 4 and row[4] else ""
-            is_stock = bool(isin)
-            amount = float(row[2]) if row[2] else float(0.0)
-            note = row[3] if len(row) > 3 and row[3] else ""
-
-            transaction_subtype = self.get_transaction_subtype(is_stock, amount)
-
-            # For stock transactions, check for existing transaction with same ISIN
-            if is_stock and isin:
-                amount_lookup = "amount__gt" if amount > 0 else "amount__lt"
-                existing_transaction = (
-                    Transaction.objects.filter(
-                        user=user, isin=isin, **{amount_lookup: 0}
-                    )
-                    .exclude(transaction_subtype__isnull=True)
-                    .first()
-                )
-                if existing_transaction:
-                    transaction_subtype = existing_transaction.transaction_subtype
-            elif note:
-                existing_transaction = (
-                    Transaction.objects.filter(user=user, note=note)
-                    .exclude(transaction_subtype__isnull=True)
-                    .first()
-                )
-                if existing_transaction:
-                    transaction_subtype = existing_transaction.transaction_subtype
-
-            datetime_from_iso = datetime.fromisoformat(row[0])
-            creation_datetime = timezone.make_aware(datetime_from_iso)
-
-            def safe_float(value):
-                try:
-                    return float(value) if value else 0.0
-                except (ValueError, TypeError):
-                    return 0.0
-
-            Transaction.objects.create(
-                user=user,
-                bank_account=bank_account,
-                created_at=creation_datetime,
-                transaction_subtype=transaction_subtype,
-                amount=amount,
-                note=note,
-                isin=row[4] if len(row) > 4 and row[4] else "",
-                quantity=safe_float(row[5] if len(row) > 5 else None),
-                fee=safe_float(row[6] if len(row) > 6 else None),
-                tax=safe_float(row[7] if len(row) > 7 else None),
-            )
-            created_count += 1
-
-        return created_count
-
-    def process_volksbank_csv(self, user, csv_file, bank_account):
-        """Process Volksbank CSV format"""
-        # For now, use the same logic as Trade Republic
-        # This can be customized based on Volksbank's specific CSV format
-        return self.process_trade_republic_csv(user, csv_file, bank_account)
-
-    def process_default_csv(self, user, csv_file, bank_account):
-        """Process CSV for accounts without specific type"""
-        data = csv_file.read().decode("utf-8")
-        io_string = io.StringIO(data)
-        reader = csv.reader(io_string, delimiter=";")
-
-        # Skip header row manually
-        next(reader, None)
-
-        created_count = 0
-        for row in reader:
-            if not row:  # skip empty lines
-                continue
-
-            isin = row[4] if len(row) > 4 and row[4] else ""
-            is_stock = bool(isin)
-            amount = float(row[2]) if row[2] else float(0.0)
-            note = row[3] if len(row) > 3 and row[3] else ""
-
-            transaction_subtype = self.get_transaction_subtype(is_stock, amount)
-
-            if is_stock and isin:
-                amount_lookup = "amount__gt" if amount > 0 else "amount__lt"
-                existing_transaction = (
-                    Transaction.objects.filter(
-                        user=user, isin=isin, **{amount_lookup: 0}
-                    )
-                    .exclude(transaction_subtype__isnull=True)
-                    .first()
-                )
-                if existing_transaction:
-                    transaction_subtype = existing_transaction.transaction_subtype
-            elif note:
-                existing_transaction = (
-                    Transaction.objects.filter(user=user, note=note)
-                    .exclude(transaction_subtype__isnull=True)
-                    .first()
-                )
-                if existing_transaction:
-                    transaction_subtype = existing_transaction.transaction_subtype
-
-            datetime_from_iso = datetime.fromisoformat(row[0])
-            creation_datetime = timezone.make_aware(datetime_from_iso)
-
-            def safe_float(value):
-                try:
-                    return float(value) if value else 0.0
-                except (ValueError, TypeError):
-                    return 0.0
-
-            Transaction.objects.create(
-                user=user,
-                bank_account=bank_account,
-                created_at=creation_datetime,
-                transaction_subtype=transaction_subtype,
-                amount=amount,
-                note=note,
-                isin=row[4] if len(row) > 4 and row[4] else "",
-                quantity=safe_float(row[5] if len(row) > 5 else None),
-                fee=safe_float(row[6] if len(row) > 6 else None),
-                tax=safe_float(row[7] if len(row) > 7 else None),
-            )
-            created_count += 1
 
-        return created_count
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that reports the progress of CSV import jobs.
+    """
+
+    queryset = ImportJob.objects.all().order_by("-created_at")
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            ImportJob.objects.filter(user=self.request.user)
+            .select_related("bank_account")
+            .order_by("-created_at")
+        )
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -271,7 +161,7 @@ class GroupViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class TransactionSubtypeViewSet(viewsets.ModelViewSet):
+class TransactionSubtypeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Subtypes of Transactions to be edited
     """
@@ -281,30 +171,187 @@ class TransactionSubtypeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Subtypes of Transactions to be edited
     """
 
-    queryset = Transaction.objects.all().order_by("created_at")
+    queryset = Transaction.objects.all().order_by("created_at", "id")
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Lists are paged with a (created_at, id) cursor, ?all=true returns all
+    pagination_class = KeysetPagination
+    # Changed rows per response of the changes action
+    changes_page_size = 1000
+    changes_max_page_size = 10000
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_list_response(self, request, *args, **kwargs):
+        # The browsable API keeps the regular serializer
+        if request.accepted_renderer.format != "json":
+            return super().get_list_response(request, *args, **kwargs)
+
+        try:
+            writer = TransactionListWriter(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            *writer.columns
+        )
+        page = self.paginate_queryset(queryset)
+        account_names = dict(
+            BankAccount.objects.filter(user=request.user).values_list("id", "name")
+        )
+        if page is None:
+            data = writer.to_representation(writer.fetch_raw(queryset), account_names)
+        else:
+            data = self.get_paginated_response(
+                writer.to_representation(page, account_names)
+            ).data
+        return HttpResponse(writer.render(data), content_type="application/json")
+
     def get_queryset(self):
-        queryset = Transaction.objects.filter(user=self.request.user).order_by(
-            "created_at"
+        queryset = (
+            Transaction.objects.filter(user=self.request.user)
+            .select_related("bank_account")
+            .order_by("created_at", "id")
         )
 
-        # Filter by transaction_subtype if provided
-        subtype_id = self.request.query_params.get("transaction_subtype", None)
-        if subtype_id is not None:
-            queryset = queryset.filter(transaction_subtype=subtype_id)
+        # Date, account, subtype, ISIN, amount and note filters
+        if self.action == "list":
+            queryset = TransactionFilter(self.request.query_params).filter_queryset(
+                queryset
+            )
 
         return queryset
 
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        """
+        Transactions changed or deleted after ``?since=<version>``.
+
+        ``upserts`` are the changed rows matching the list filters, rendered
+        like the list; ``deletions`` are the ids to drop, deleted rows and
+        changed rows that no longer match the filters. ``since=0`` starts
+        from an empty list, so its first page has no deletions.
+
+        At most ``page_size`` changed rows are sent per response, taken in
+        ``(version, id)`` order. While more are left, ``next`` links to the
+        rest; ``version`` is always safe to pass as ``since`` of a later
+        call, it may only send some rows again.
+        """
+        try:
+            since = int(request.query_params.get("since", 0))
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"since": "Enter a version number."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        after = request.query_params.get("after")
+        if after is not None:
+            try:
+                after = tuple(int(part) for part in after.split("."))
+                if len(after) != 2:
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {"after": "Use the link in next."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        try:
+            page_size = int(
+                request.query_params.get("page_size", self.changes_page_size)
+            )
+        except ValueError:
+            page_size = self.changes_page_size
+        if page_size <= 0:
+            page_size = self.changes_page_size
+        page_size = min(page_size, self.changes_max_page_size)
+        try:
+            writer = TransactionListWriter(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read before the rows: a change committing in between is sent again
+        # with the next call instead of being skipped
+        version = SyncVersion.objects.current_version(request.user.id)
+        changed = self.get_queryset().filter(version__gt=since)
+        tombstones = TransactionTombstone.objects.filter(
+            user=request.user, version__gt=since
+        )
+        if after is not None:
+            changed = changed.filter(
+                models.Q(version__gt=after[0])
+                | models.Q(version=after[0], id__gt=after[1]),
+                version__gte=after[0],
+            )
+            tombstones = tombstones.filter(version__gt=after[0])
+
+        # The last row of this page and whether one follows it
+        edge = list(
+            changed.order_by("version", "id").values_list("version", "id")[
+                page_size - 1 : page_size + 1
+            ]
+        )
+        next_link = None
+        if len(edge) > 1:
+            last_version, last_id = edge[0]
+            changed = changed.filter(
+                models.Q(version__lt=last_version)
+                | models.Q(version=last_version, id__lte=last_id),
+                version__lte=last_version,
+            )
+            tombstones = tombstones.filter(version__lt=last_version)
+            # Later rows may still share the last row's version
+            version = last_version - 1
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "after", f"{last_version}.{last_id}"
+            )
+
+        upserts = TransactionFilter(request.query_params).filter_queryset(changed)
+        deletions = []
+        # A first sync has nothing to delete, later pages of it may
+        if since or after is not None:
+            deletions = list(tombstones.values_list("transaction_id", flat=True))
+            deletions += changed.exclude(id__in=upserts.values("id")).values_list(
+                "id", flat=True
+            )
+
+        account_names = dict(
+            BankAccount.objects.filter(user=request.user).values_list("id", "name")
+        )
+        rows = writer.fetch_raw(upserts.values_list(*writer.columns))
+        data = {
+            "version": version,
+            "next": next_link,
+            "upserts": writer.to_representation(rows, account_names),
+            "deletions": deletions,
+        }
+        return HttpResponse(writer.render(data), content_type="application/json")
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        Apply a list of create, update and delete operations atomically.
+
+        See TransactionBatch for the format. Returns one result per
+        operation in request order, or a 400 with the invalid operations'
+        errors and nothing written.
+        """
+        batch = TransactionBatch(request.user, request.data)
+        if not batch.is_valid():
+            if batch.error:
+                body = {"error": batch.error}
+            else:
+                body = {"results": batch.results}
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": batch.save()}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["patch"])
     def bulk_update_by_note(self, request):
         note = request.data.get("note")
@@ -364,7 +411,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return Response({"updated_count": updated_count}, status=status.HTTP_200_OK)
 
 
-class BankAccountViewSet(viewsets.ModelViewSet):
+class BankAccountViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Bank Accounts to be viewed or edited.
     """
@@ -379,8 +426,27 @@ class BankAccountViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return BankAccount.objects.filter(user=self.request.user).order_by("name")
 
+    @action(detail=True, methods=["get"], url_path="balance-history")
+    def balance_history(self, request, pk=None):
+        """
+        The balance after every day between ``start_date`` and ``end_date``,
+        downsampled with ``?interval=auto|day|week|month|quarter|year``.
+        """
+        account = self.get_object()
+        transaction_filter = TransactionFilter(request.query_params)
+        start = transaction_filter.get_datetime("start_date")
+        end = transaction_filter.get_datetime("end_date", end_of_day=True)
+        history = BalanceHistory(
+            account,
+            start=start and timezone.localdate(start),
+            # The end bound is exclusive
+            end=end and timezone.localdate(end - timedelta(microseconds=1)),
+            interval=request.query_params.get("interval", "auto"),
+        )
+        return Response(history.as_dict())
+
 
-class TransactionTypeViewSet(viewsets.ModelViewSet):
+class TransactionTypeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Transaction Types (Income/Expense categories) to be viewed or edited.
     """
@@ -390,7 +456,7 @@ class TransactionTypeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Budgets to be viewed or edited.
     """
@@ -405,6 +471,96 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Budget.objects.filter(user=self.request.user).order_by("name")
 
+    def get_etag_parts(self, request):
+        # Spent amounts are for the current period, which moves with the date
+        return [timezone.localdate()]
+
+
+class CategorizationRuleViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint that allows categorization rules to be viewed or edited.
+    """
+
+    queryset = CategorizationRule.objects.all().order_by("priority", "id")
+    serializer_class = CategorizationRuleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def get_queryset(self):
+        return (
+            CategorizationRule.objects.filter(user=self.request.user)
+            .select_related("transaction_subtype")
+            .order_by("priority", "id")
+        )
+
+    @action(detail=False, methods=["post"])
+    def apply(self, request):
+        """Re-categorize the user's existing transactions by their rules."""
+        updated_count = apply_rules(request.user)
+        return Response({"updated_count": updated_count}, status=status.HTTP_200_OK)
+
+
+class AnalyticsSummaryView(ConditionalListMixin, APIView):
+    """
+    Dashboard totals by subtype, type and ``?period=day|week|month``.
+
+    Takes the filters of the transaction list and is validated with the
+    same ETags.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    def get_list_response(self, request, *args, **kwargs):
+        transaction_filter = TransactionFilter(request.query_params)
+        summary = TransactionSummary(
+            transaction_filter.filter_queryset(
+                Transaction.objects.filter(user=request.user)
+            ),
+            request.query_params.get("period", "month"),
+            rollups=transaction_filter.filter_rollups(
+                MonthlyRollup.objects.filter(user=request.user)
+            ),
+        )
+        return Response(summary.as_dict())
+
+
+class CashflowView(ConditionalListMixin, APIView):
+    """
+    Income, expense and net series per ``?granularity=`` period, optionally
+    ``?split=account|subtype``, as columnar arrays.
+
+    Takes the filters of the transaction list; ``start_date`` and
+    ``end_date`` also bound the zero-filled periods. Results are cached until
+    the user's data changes.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    def get_list_response(self, request, *args, **kwargs):
+        transaction_filter = TransactionFilter(request.query_params)
+        start = transaction_filter.get_datetime("start_date")
+        end = transaction_filter.get_datetime("end_date", end_of_day=True)
+        series = CashflowSeries(
+            transaction_filter.filter_queryset(
+                Transaction.objects.filter(user=request.user)
+            ),
+            request.query_params.get("granularity", "month"),
+            split=request.query_params.get("split") or None,
+            start=start and timezone.localdate(start),
+            # The end bound is exclusive
+            end=end and timezone.localdate(end - timedelta(microseconds=1)),
+        )
+        key_parts = sorted(request.query_params.lists())
+        return Response(series.cached_as_dict(request.user.id, key_parts))
+
 
 @require_http_methods(["GET"])
 @ensure_csrf_cookie
@@ -581,6 +737,50 @@ def portfolio_view(request):
     )
 
 
+@require_http_methods(["GET"])
+def export_transactions(request):
+    """
+    Stream the user's transactions as ``?format=csv`` (default) or ``ndjson``.
+
+    Takes the filters of the transaction list and its ``?fields=``. Rows
+    are read and written in chunks, and gzipped on the fly for clients
+    that accept it.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    queryset = Transaction.objects.filter(user=request.user).order_by(
+        "created_at", "id"
+    )
+    account_names = dict(
+        BankAccount.objects.filter(user=request.user).values_list("id", "name")
+    )
+    try:
+        export = TransactionExport(
+            TransactionFilter(request.GET).filter_queryset(queryset),
+            request.GET.get("format", "csv"),
+            fields=request.GET.get("fields"),
+            account_names=account_names,
+        )
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    content = iter(export)
+    gzipped = ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", ""))
+    if gzipped:
+        content = compress_sequence(content)
+    response = StreamingHttpResponse(content, content_type=export.content_type)
+    response["Content-Disposition"] = f'attachment; filename="{export.filename}"'
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
 @ensure_csrf_cookie
 @require_http_methods(["GET"])
 def set_csrf_token(request):